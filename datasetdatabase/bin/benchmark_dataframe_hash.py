@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+
+"""
+Benchmark the DataFrameIntrospector hashing schemes against each other on a generated feature table.
+"""
+
+# standard
+import argparse
+import time
+
+# installed
+from datasetdatabase.introspect import DataFrameIntrospector
+import numpy as np
+import pandas as pd
+
+
+class Args(object):
+    def __init__(self):
+        self.__parse()
+
+    def __parse(self):
+        p = argparse.ArgumentParser(description="Benchmark the DataFrame hashing schemes on a generated feature table.",
+                                    formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+        # Add arguments
+        p.add_argument("--rows", "-r", dest="rows", action="store", type=int, default=10000,
+                       help="The number of rows in the generated dataframe.")
+        p.add_argument("--numeric-columns", "-n", dest="numeric_columns", action="store", type=int, default=40,
+                       help="The number of float columns in the generated dataframe.")
+        p.add_argument("--object-columns", "-o", dest="object_columns", action="store", type=int, default=10,
+                       help="The number of string columns in the generated dataframe.")
+        p.add_argument("--iterations", "-i", dest="iterations", action="store", type=int, default=3,
+                       help="The number of times to hash with each scheme.")
+
+        p.parse_args(namespace=self)
+
+
+def generate_dataframe(args: Args) -> pd.DataFrame:
+    # numeric features
+    data = {"feature_{}".format(i): np.random.rand(args.rows) for i in range(args.numeric_columns)}
+
+    # string metadata
+    for i in range(args.object_columns):
+        data["meta_{}".format(i)] = ["cell_{}_{}".format(i, j) for j in range(args.rows)]
+
+    return pd.DataFrame(data)
+
+
+def time_hash(introspector: DataFrameIntrospector, version: int, iterations: int) -> float:
+    # set scheme
+    introspector.hash_version = version
+
+    # time both digests like a dataset init does
+    durations = []
+    for i in range(iterations):
+        start = time.time()
+        introspector.get_object_hashes()
+        durations.append(time.time() - start)
+
+    return sum(durations) / len(durations)
+
+
+def main():
+    # collect args
+    args = Args()
+
+    # create introspector
+    introspector = DataFrameIntrospector(generate_dataframe(args))
+    cells = introspector.obj.shape[0] * introspector.obj.shape[1]
+    print("Hashing {} cells, {} iterations per scheme...".format(cells, args.iterations))
+
+    # run
+    legacy = time_hash(introspector, 1, args.iterations)
+    current = time_hash(introspector, 2, args.iterations)
+
+    # report
+    print("version 1: {:.4f} seconds".format(legacy))
+    print("version 2: {:.4f} seconds".format(current))
+    print("speedup: {:.1f}x".format(legacy / current))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,18 @@
 #!/usr/bin/env python
 
 # installed
+from concurrent.futures import Future, ThreadPoolExecutor
 from pandas import read_csv as pd_read_csv
-from typing import Union, Dict, List
+from pandas import Timestamp as pd_Timestamp
+from typing import Union, Dict, Iterator, List, Tuple
 from datetime import datetime
+from functools import partial
 import _pickle as pickle
 import subprocess
+import threading
 import inspect
+import socket
 import pathlib
-import hashlib
 import orator
 import types
 import json
@@ -18,12 +22,22 @@ import os
 # self
 from .introspect import ObjectIntrospector
 from .introspect import RECONSTRUCTOR_MAP
+from .introspect import ITER_RECONSTRUCTOR_MAP
 from .introspect import INTROSPECTOR_MAP
 from .introspect import Introspector
+from .introspect import DataFrameIntrospector
+from .introspect import ChunkedDataFrameIntrospector, DataFrameChunks
+from .introspect.dataframe import DEFAULT_FILE_CHUNKSIZE
 
 from .schema import FMSInterface
 from .schema import SchemaVersion
 from .utils import checks, tools
+from .utils.cache import DatasetCache, DEFAULT_CACHE_SIZE
+from .utils.cache import MemoryCache, AUTO_MEMORY_CACHE_SIZE
+from .utils.cache import snapshot
+from .utils.cache import resolve_memory_cache_size
+from .utils.cache import IotaCache, DEFAULT_IOTA_CACHE_SIZE
+from .utils.connections import ConnectionPool, orator_config, is_shareable
 
 from .version import VERSION
 
@@ -32,6 +46,9 @@ REQUIRED_CONFIG_ITEMS = ("driver", "database")
 MISSING_REQUIRED_ITEMS = "Config must have {i}."\
                          .format(i=REQUIRED_CONFIG_ITEMS)
 MALFORMED_LOCAL_LINK = "Local databases must have suffix '.db'"
+PROCESS_LIMIT_VARIABLE = "DSDB_PROCESS_LIMIT"
+SCHEMA_OUT_OF_DATE = "Database schema is out of date, missing columns: {c}. "\
+    "Connect with build=True to migrate it."
 
 INVALID_DS_INFO = "This set of attributes could not be found in the linked db."
 NO_DS_INFO = "There is no dataset info attached to this dataset object."
@@ -41,13 +58,36 @@ MISSING_PARAMETER = "Must provide at least one of the following: {p}"
 VERSION_LOOKUP = ["__version__", "__VERSION__", "VERSION", "version"]
 UNKNOWN_DATASET_HASH = "Dataset hash changed.\n\tOriginal: {o}\n\tCurrent: {c}"
 
+HASH_POLICIES = ("trust", "lazy", "background", "rehash")
+UNKNOWN_HASH_POLICY = "Hash policy must be one of: {p}"\
+                      .format(p=HASH_POLICIES)
+IMMUTABLE_HANDLE = "Hashed object handles cannot be changed."
+HASH_VERIFIER = ThreadPoolExecutor(max_workers=1)
+
 GENERIC_TYPES = Union[bytes, str, int, float, None, datetime]
 MISSING_INIT = "Must provide either an object or a DatasetInfo object."
 TOO_MANY_RETURN_VALUES = "Too many values returned from query expecting {n}."
 DATASET_NOT_FOUND = "Dataset not found using keyword arguments:\n\t{kw}"
+# seconds without a checkpoint after which an ingest of another host is
+# considered stopped
+INGEST_TIMEOUT = 30 * 60
+# ingests running in this process keyed by database and DatasetId
+ACTIVE_INGESTS = set()
+ACTIVE_INGESTS_LOCK = threading.Lock()
+INGEST_IN_PROGRESS = "Dataset {id} is still being ingested by {o}. Wait for it "\
+    "to complete, or for it to stop for {t} seconds before ingesting again."
 NONAPPROVED_PURGE = "Cannot purge a dataset that was used as an input."
 
 MISSING_DATASET_INFO = "Dataset info attribute missing. No link to database."
+UNSUPPORTED_SUBSET = "Cannot pull a subset by {p} using the introspector: {i}"
+UNSUPPORTED_ITER = "Cannot iterate over datasets using the introspector: {i}"
+INVALID_CHUNKSIZE = "Chunksize must be a positive integer."
+
+DATASET_ORDERS = ("DatasetId", "Name", "Created")
+UNKNOWN_DATASET_ORDER = "Datasets can only be ordered by one of: {o}"\
+                        .format(o=DATASET_ORDERS)
+DEFAULT_PAGE_SIZE = 100
+INVALID_PAGE_SIZE = "Page size must be a positive integer."
 
 UNKNOWN_EXTENSION = "Unsure how to read dataset from the passed path.\n\t{p}"
 
@@ -61,6 +101,10 @@ class DatabaseConfig(object):
     DatabaseConstructor in the process of connecting or building. A minimum
     requirements config needs just "driver" and "database" attributes.
 
+    Optionally a "cache_dir" attribute enables a local on-disk cache of
+    reconstructed datasets and "cache_size" caps its size in bytes. Both are
+    removed from the connection config.
+
 
     #### Example
     ```
@@ -120,7 +164,10 @@ class DatabaseConfig(object):
         valid_config = all(k in config for k in REQUIRED_CONFIG_ITEMS)
         assert valid_config, MISSING_REQUIRED_ITEMS
 
-        # passed enforcement
+        # passed enforcement, cache items are not connection items
+        config = dict(config)
+        self.cache_dir = config.pop("cache_dir", None)
+        self.cache_size = config.pop("cache_size", DEFAULT_CACHE_SIZE)
         self._config = config
 
         # assign name
@@ -206,7 +253,8 @@ class DatabaseConstructor(object):
         self._schema = schema
         self._fms = fms
         self._tables = []
-        self._db = orator.DatabaseManager(dict(self.config))
+        self._db = orator.DatabaseManager(
+            orator_config(self.config.name, self.config.config))
         self._orator_schema = orator.Schema(self.db)
 
     @property
@@ -312,13 +360,40 @@ class DatabaseConstructor(object):
             self.fms.create_File(self.orator_schema)
             self._tables.append(self.fms.table_name)
 
+    def migrate(self):
+        """
+        Bring the tables of an already existing database up to date with the
+        SchemaVersion passed in the DatabaseConstructor initialization by
+        running each of the schema's migrations in order. Migrations only
+        change what is missing so they are safe to run more than once.
+
+
+        #### Example
+        ```
+        >>> constructor.migrate()
+
+        ```
+
+
+        #### Parameters
+
+        #### Returns
+
+        #### Errors
+
+        """
+
+        # run all migrations in version
+        for migration, func in self.schema.migrations.items():
+            func(self.orator_schema)
+
     def build(self):
         """
         Connect to a database and build the tables found in the SchemaVersion
         passed to the DatabaseConstructor initialization.
 
-        This is mainly a wrapper around the prepare_connection and
-        create_schema functions that additionally returns the
+        This is mainly a wrapper around the prepare_connection, create_schema,
+        and migrate functions that additionally returns the
         orator.DatabaseManager object created.
 
 
@@ -347,6 +422,9 @@ class DatabaseConstructor(object):
         # create schema
         self.create_schema()
 
+        # update existing tables
+        self.migrate()
+
         return self.db
 
     def _drop_schema(self):
@@ -427,8 +505,52 @@ class DatabaseConstructor(object):
             names.remove("migrations")
 
         self._tables = names
+
+        # writes need the columns added by migrations
+        missing = self.missing_columns()
+        assert len(missing) == 0, SCHEMA_OUT_OF_DATE.format(c=missing)
+
         return self.db
 
+    def missing_columns(self) -> List[str]:
+        """
+        Find the columns added by the SchemaVersion migrations that the tables
+        of the connected database do not have yet. Column migrations are named
+        "Table.Column". Tables the database does not have at all are not
+        checked.
+
+
+        #### Example
+        ```
+        >>> constructor.missing_columns()
+        ["Dataset.HashVersion", "Iota.ValueHash"]
+
+        ```
+
+
+        #### Parameters
+
+        #### Returns
+        ##### missing: List[str]
+        The "Table.Column" name of every missing column.
+
+
+        #### Errors
+
+        """
+
+        missing = []
+        for migration in self.schema.migrations:
+            if "." not in migration:
+                continue
+
+            table, column = migration.split(".")
+            if self.orator_schema.has_table(table) and \
+                    not self.orator_schema.has_column(table, column):
+                missing.append(migration)
+
+        return missing
+
 
 class DatasetDatabase(object):
     """
@@ -477,8 +599,49 @@ class DatasetDatabase(object):
 
     ##### processing_limit: int, None = None
     How many processes should the system max out at when ingesting or
-    getting a dataset. If None provided, os.cpu_count() is used as
-    default.
+    getting a dataset. Pooled ingests write blocks from this many threads,
+    each with its own database connection, and pipelined ingests and
+    parallel unpickling use this many processes. If None provided, the
+    DSDB_PROCESS_LIMIT environment variable is used, or os.cpu_count() when
+    it is not set.
+
+    ##### parallel_unpickle: bool = False
+    Should reconstructs unpickle large fetched Iota values in a pool of
+    processing_limit processes. Useful for datasets with large per cell
+    objects such as arrays or nested lists, small fetches are always
+    unpickled serially.
+
+    ##### pipeline_ingest: bool = False
+    Should ingests pickle and hash blocks of rows in a pool of
+    processing_limit processes while the database writes happen on the
+    ingest threads. Useful for large datasets where building the rows costs
+    more than writing them.
+
+    ##### pooled_ingest: bool, None = None
+    Should ingests write blocks from processing_limit threads, each with its
+    own pooled database connection. SQLite only allows a single writer so
+    its writes would still happen one at a time. If None provided, pooled
+    writes are used for every driver but sqlite.
+
+    ##### hash_policy: str = "trust"
+    How datasets pulled from this database should treat the hashes stored
+    with them. "trust" uses the stored MD5 and SHA256 as is, "lazy" verifies
+    them the first time the dataset is changed, "background" verifies them
+    in a background thread, and "rehash" hashes the pulled object
+    immediately.
+
+    ##### memory_cache_size: int, str, None = AUTO_MEMORY_CACHE_SIZE
+    How many bytes of pulled datasets to keep in memory for the rest of the
+    session. Repeated pulls of a cached dataset by id do not touch the
+    database and hand out copies of the cached object. If None provided, no
+    datasets are kept in memory. By default ("auto") one gigabyte is kept
+    when pandas copies on write, where dataframe copies share memory until
+    changed, and nothing is kept otherwise.
+
+    ##### iota_cache_size: int, None = DEFAULT_IOTA_CACHE_SIZE
+    Approximately how many bytes of unpickled immutable Iota values to share
+    between reconstructs. Versions of a dataset share most Iota so only the
+    missing values are fetched. If None provided, no values are shared.
 
 
     #### Returns
@@ -486,6 +649,8 @@ class DatasetDatabase(object):
 
 
     #### Errors
+    ##### AssertionError
+    Unknown hash policy.
 
     """
 
@@ -501,7 +666,13 @@ class DatasetDatabase(object):
                  constructor: Union[DatabaseConstructor, None] = None,
                  build: bool = False,
                  recent_size: int = 5,
-                 processing_limit: Union[int, None] = None):
+                 processing_limit: Union[int, None] = None,
+                 parallel_unpickle: bool = False,
+                 pipeline_ingest: bool = False,
+                 pooled_ingest: Union[bool, None] = None,
+                 hash_policy: str = "trust",
+                 memory_cache_size: Union[int, str, None] = AUTO_MEMORY_CACHE_SIZE,
+                 iota_cache_size: Union[int, None] = DEFAULT_IOTA_CACHE_SIZE):
         # enforce types
         checks.check_types(config, [
             DatabaseConfig,
@@ -515,13 +686,24 @@ class DatasetDatabase(object):
         checks.check_types(build, bool)
         checks.check_types(recent_size, int)
         checks.check_types(processing_limit, [int, type(None)])
-
-        # handle processing limit
+        checks.check_types(parallel_unpickle, bool)
+        checks.check_types(pipeline_ingest, bool)
+        checks.check_types(pooled_ingest, [bool, type(None)])
+        checks.check_types(hash_policy, str)
+        checks.check_types(memory_cache_size, [int, str, type(None)])
+        checks.check_types(iota_cache_size, [int, type(None)])
+
+        # enforce hash policy
+        assert hash_policy in HASH_POLICIES, UNKNOWN_HASH_POLICY
+
+        # handle processing limit, the environment sets a default for every
+        # database of the session
         if processing_limit is None:
-            processing_limit = os.cpu_count()
-
-        # update os environ
-        os.environ["DSDB_PROCESS_LIMIT"] = str(processing_limit)
+            processing_limit = int(os.environ.get(PROCESS_LIMIT_VARIABLE,
+                                                  os.cpu_count()))
+        self.processing_limit = processing_limit
+        self.parallel_unpickle = parallel_unpickle
+        self.pipeline_ingest = pipeline_ingest
 
         # assume local
         if config is None:
@@ -531,14 +713,45 @@ class DatasetDatabase(object):
         if isinstance(config, (str, dict, pathlib.Path)):
             config = DatabaseConfig(config)
 
+        # sqlite has a single writer so pooled writes only add threads there
+        if pooled_ingest is None:
+            pooled_ingest = config.config["driver"] != "sqlite"
+        self.pooled_ingest = pooled_ingest
+
         # state basic items
         self._config = config
         self._user = checks.check_user(user)
         self.recent_size = recent_size
+        self.hash_policy = hash_policy
+
+        # create session cache
+        memory_cache_size = resolve_memory_cache_size(memory_cache_size)
+        if memory_cache_size is not None:
+            self._memory_cache = MemoryCache(memory_cache_size)
+        else:
+            self._memory_cache = None
+        self._dataset_infos = {}
+
+        # create iota value cache
+        if iota_cache_size is not None:
+            self._iota_cache = IotaCache(iota_cache_size)
+        else:
+            self._iota_cache = None
+
+        # create dataset cache
+        if self.config.cache_dir is not None:
+            self._cache = DatasetCache(self.config.cache_dir,
+                                       self.config.cache_size)
+        else:
+            self._cache = None
+
+        # connection pool for ingest threads
+        self._connections = None
 
         # create constructor
         if constructor is None:
-            self._constructor = DatabaseConstructor(self.config)
+            constructor = DatabaseConstructor(self.config)
+        self._constructor = constructor
 
         # connect
         if build:
@@ -561,6 +774,44 @@ class DatasetDatabase(object):
     def user_info(self):
         return self._user_info
 
+    @property
+    def cache(self):
+        return self._cache
+
+    @property
+    def memory_cache(self):
+        return self._memory_cache
+
+    @property
+    def iota_cache(self):
+        return self._iota_cache
+
+    @property
+    def connections(self):
+        # one pooled connection per ingest thread, created on first use
+        if self._connections is None and self.pooled_ingest and \
+                self.processing_limit > 1 and \
+                is_shareable(self.config.config):
+            self._connections = ConnectionPool(self.config.name,
+                                               self.config.config,
+                                               self.processing_limit)
+
+        return self._connections
+
+    @property
+    def unpickle_processes(self):
+        if self.parallel_unpickle:
+            return self.processing_limit
+
+        return None
+
+    @property
+    def ingest_processes(self):
+        if self.pipeline_ingest:
+            return self.processing_limit
+
+        return None
+
     @property
     def constructor(self):
         return self._constructor
@@ -626,27 +877,14 @@ class DatasetDatabase(object):
         # if valid set user
         self._user = user
 
-        # attempt get
-        user_info = self.get_items_from_table("User", ["Name", "=", user])
-
-        # not found
-        if len(user_info) == 0:
-            user_info = self._insert_to_table("User", {
-                 "Name": user,
-                 "Description": description,
-                 "Created": datetime.utcnow()
-                })
-
-            self._user_info = user_info
-            return self.user_info
-
-        # found
-        if len(user_info) == 1:
-            self._user_info = user_info[0]
-            return self.user_info
+        # get or create
+        self._user_info = self._insert_to_table("User", {
+             "Name": user,
+             "Description": description,
+             "Created": datetime.utcnow()
+            })
 
-        # database structure error
-        raise ValueError(TOO_MANY_RETURN_VALUES.format(n=1))
+        return self.user_info
 
     def get_or_create_algorithm(self,
                                 algorithm: Union[
@@ -771,25 +1009,12 @@ class DatasetDatabase(object):
         version = str(version)
 
         # get or create alg
-        alg_info = self.get_items_from_table("Algorithm", [
-            ["Name", "=", name], ["Version", "=", version]])
-
-        # found
-        if len(alg_info) == 1:
-            return alg_info[0]
-        # new
-        elif len(alg_info) == 0:
-            alg_info = self._insert_to_table("Algorithm", {
-                "Name": name,
-                "Description": description,
-                "Version": version,
-                "Created": datetime.utcnow()
-            })
-            return alg_info
-
-        # database structure error
-        else:
-            raise ValueError(TOO_MANY_RETURN_VALUES.format(n=1))
+        return self._insert_to_table("Algorithm", {
+            "Name": name,
+            "Description": description,
+            "Version": version,
+            "Created": datetime.utcnow()
+        })
 
     def process(self,
                 algorithm: Union[types.MethodType, types.FunctionType],
@@ -804,7 +1029,8 @@ class DatasetDatabase(object):
                 run_description: Union[str, None] = None,
                 algorithm_parameters: dict = {},
                 output_dataset_name: Union[str, None] = None,
-                output_dataset_description: Union[str, None] = None):
+                output_dataset_description: Union[str, None] = None,
+                resume: bool = False):
         """
         This is largely the core function of the database as most other
         functions in some way are passed through this function as to retain
@@ -883,6 +1109,11 @@ class DatasetDatabase(object):
         ##### output_dataset_description: str, None = None
         A description for the produced dataset.
 
+        ##### resume: bool = False
+        If the produced dataset was partially ingested before, continue from
+        the last committed block instead of ingesting it again. Failed
+        ingests are kept so that they can be resumed later.
+
 
         #### Returns
         ##### output: Dataset
@@ -915,6 +1146,7 @@ class DatasetDatabase(object):
         checks.check_types(algorithm_parameters, dict)
         checks.check_types(output_dataset_name, [str, type(None)])
         checks.check_types(output_dataset_description, [str, type(None)])
+        checks.check_types(resume, bool)
 
         # must provide input dataset info
         dataset_lookups = [input_dataset, input_dataset_info,
@@ -923,21 +1155,20 @@ class DatasetDatabase(object):
             MISSING_PARAMETER.format(p=dataset_lookups)
 
         # convert dataset to workable type
+        found_ds = None
         if input_dataset is not None:
             # check hash
-            found_ds = self.get_items_from_table(
-                "Dataset", [["MD5", "=", input_dataset.md5],
-                            ["SHA256", "=", input_dataset.sha256]])
+            found_ds = self._find_dataset(input_dataset)
 
-            # found
-            if len(found_ds) == 1:
+            # found, datasets whose ingest never completed are not linked
+            if len(found_ds) == 1 and \
+                    self._ingest_complete(found_ds[0]["DatasetId"]):
                 ds_info = found_ds[0]
-                ds_info["OriginDb"] = self
-                input_dataset._info = DatasetInfo(**ds_info)
+                input_dataset._info = DatasetInfo._from_row(ds_info, self)
                 input = input_dataset
 
             # not found
-            elif len(found_ds) == 0:
+            elif len(found_ds) <= 1:
                 input = input_dataset
 
             # database structure error
@@ -991,13 +1222,22 @@ class DatasetDatabase(object):
         if algorithm_name != "dsdb.DatasetDatabase.upload_dataset":
             print("Dataset processing has ended...")
 
-        # handle returned dataset
+        # handle returned dataset, hashed handles are ingested as is
         if isinstance(output, Dataset):
             output = output.ds
 
+        # an uploaded input is stored as the output, it was already looked up
+        if not isinstance(output, _HashedObject) or input_dataset is None or \
+                (output.md5, output.sha256) != \
+                (input_dataset.md5, input_dataset.sha256) or \
+                output_dataset_name != input_dataset.name:
+            found_ds = None
+
         # ingest output
         output = self._create_dataset(
             output,
+            resume=resume,
+            found_ds=found_ds,
             name=output_dataset_name,
             description=output_dataset_description)
 
@@ -1029,71 +1269,315 @@ class DatasetDatabase(object):
         return output
 
     def _create_dataset(self,
-                        dataset: Union["Dataset", object],
+                        dataset: Union["Dataset", "_HashedObject", object],
+                        resume: bool = False,
+                        found_ds: Union[List[dict], None] = None,
                         **kwargs) -> "DatasetInfo":
         # Hidden create dataset method used by the database to actually enforce
         # datasets are unique and exist. Additionally this is the function that
         # starts the dataset deconstruction and subsequent creation of a new
         # DatasetInfo block. Once both are complete the created dataset is
-        # returned.
+        # returned. Incomplete ingests are resumed when asked for and the
+        # introspector supports it, otherwise they are purged and started over.
+        # Rows already found for the same dataset can be passed to skip the
+        # lookup.
 
         # enforce types
-        checks.check_types(dataset, [Dataset, object])
+        checks.check_types(dataset, [Dataset, _HashedObject, object])
+        checks.check_types(resume, bool)
 
-        # convert dataset
+        # convert dataset, a hashed handle keeps its hashes
         if not isinstance(dataset, Dataset):
             dataset = Dataset(dataset, **kwargs)
 
         # check hash
-        found_ds = self.get_items_from_table(
-            "Dataset", [["MD5", "=", dataset.md5],
-                        ["SHA256", "=", dataset.sha256]])
+        if found_ds is None:
+            found_ds = self._find_dataset(dataset)
+
+        # introspectors that commit in blocks can continue a failed ingest
+        resumable = resume and self._resumable(dataset.introspector)
 
         # found
+        start = None
         if len(found_ds) == 1:
             ds_info = found_ds[0]
-            ds_info["OriginDb"] = self
-            ds_info = DatasetInfo(**ds_info)
+            ds_info = DatasetInfo._from_row(ds_info, self)
+
+            # an ingest that never completed is resumed or ingested again once
+            # it is no longer running and this process has taken it over
+            ingest = self._get_ingest(ds_info.id)
+            if ingest is None or ingest["Complete"]:
+                print("Input dataset already exists in database.", ds_info.id)
+                return self._attach_info(dataset, ds_info)
+            elif self._ingest_alive(ingest) or not self._claim_ingest(ingest):
+                raise ValueError(INGEST_IN_PROGRESS.format(
+                    id=ds_info.id, o=ingest["Owner"], t=INGEST_TIMEOUT))
+            elif resumable:
+                print("Resuming incomplete dataset ingest.", ds_info.id)
+                if ingest["LastLabel"] is None:
+                    start = 0
+                else:
+                    start = ingest["LastLabel"] + 1
+            else:
+                print("Input dataset ingest was incomplete, ingesting again.",
+                      ds_info.id)
+                self._purge_dataset(id=ds_info.id)
+                with ACTIVE_INGESTS_LOCK:
+                    ACTIVE_INGESTS.discard(self._ingest_key(ds_info.id))
 
-            print("Input dataset already exists in database.", ds_info.id)
-            return Dataset(dataset=dataset.ds, ds_info=ds_info)
+        # database structure error
+        elif len(found_ds) > 1:
+            raise ValueError(TOO_MANY_RETURN_VALUES.format(n=1))
 
-        # not found
-        elif len(found_ds) == 0:
-            introspector_module = str(type(dataset.introspector))
-            begin = len("<class '")
-            end = introspector_module.index("'>")
-            introspector_module = introspector_module[begin: end]
+        # create dataset and mark the ingest as started
+        if start is None:
             ds_info = {"Name": dataset.name,
                        "Description": dataset.description,
-                       "Introspector": introspector_module,
+                       "Introspector": _introspector_module(
+                           dataset.introspector),
                        "MD5": dataset.md5,
                        "SHA256": dataset.sha256,
+                       "HashVersion": dataset.hash_version,
                        "Created": dataset.created}
-            ds_info["DatasetId"] = self.db.table("Dataset")\
-                .insert_get_id(ds_info, sequence=("DatasetId"))
-            ds_info["OriginDb"] = self
+            with self.db.transaction():
+                ds_info["DatasetId"] = self.db.table("Dataset")\
+                    .insert_get_id(ds_info, sequence=("DatasetId"))
+                self._begin_ingest(ds_info["DatasetId"])
 
-            ds_info = DatasetInfo(**ds_info)
+            ds_info = DatasetInfo._from_row(ds_info, self)
 
-        # database structure error
+        # the ingest was marked running in this process when it was begun or
+        # claimed
+        try:
+            self._deconstruct_dataset(dataset, ds_info, start, resumable)
+        finally:
+            with ACTIVE_INGESTS_LOCK:
+                ACTIVE_INGESTS.discard(self._ingest_key(ds_info.id))
+
+        # attach info to a dataset
+        return self._attach_info(dataset, ds_info)
+
+    def _deconstruct_dataset(self,
+                             dataset: "Dataset",
+                             ds_info: "DatasetInfo",
+                             start: Union[int, None],
+                             resumable: bool):
+        # Hidden function to deconstruct a dataset whose row and ingest were
+        # created or taken over by this process and to mark it complete.
+
+        # record progress with every committed block
+        params = {}
+        if self._resumable(dataset.introspector):
+            params["checkpoint"] = partial(self._checkpoint_ingest, ds_info.id)
+            params["start"] = start or 0
+
+        # introspectors that write from many threads get a connection each
+        # and those that can build rows in worker processes get a pool size
+        deconstruct_params = inspect.signature(
+            dataset.introspector.deconstruct).parameters
+        if "connections" in deconstruct_params:
+            params["connections"] = self.connections
+        if "processes" in deconstruct_params:
+            params["processes"] = self.ingest_processes
+
+        # deconstruct, introspectors commit as they go so a failed ingest is
+        # removed instead of left half built unless it can be resumed
+        try:
+            dataset.introspector.deconstruct(db=self.db, ds_info=ds_info, fms=self.constructor.fms, **params)
+        except Exception:
+            if not resumable:
+                self._purge_dataset(id=ds_info.id)
+            raise
+
+        # store preview stats and mark the ingest complete
+        with self.db.transaction():
+            self._write_dataset_stats(ds_info)
+            self._complete_ingest(ds_info.id)
+
+    def _find_dataset(self, dataset: "Dataset") -> List[dict]:
+        # Hidden function to find the stored rows of a dataset by its hashes.
+        # Names are unique, so when the current hashes match nothing only the
+        # row stored under the same name can hold the dataset with an older
+        # hash version. The object is hashed once more, with that row's
+        # version, only for such a conflict.
+        found_ds = self.get_items_from_table(
+            "Dataset", [["MD5", "=", dataset.md5],
+                        ["SHA256", "=", dataset.sha256]])
+        if len(found_ds) > 0:
+            return found_ds
+
+        # no name conflict
+        named = self.get_items_from_table(
+            "Dataset", [["Name", "=", dataset.name]])
+        if len(named) != 1:
+            return []
+
+        # null versions were hashed with version 1
+        row = named[0]
+        version = row["HashVersion"] or 1
+        introspector = dataset.introspector
+        if version == dataset.hash_version or row["Introspector"] != \
+                _introspector_module(introspector):
+            return []
+
+        # rehash with the stored version, skip versions it cannot produce
+        current = introspector.hash_version
+        introspector.hash_version = version
+        try:
+            hashes = tuple(introspector.get_object_hashes())
+        except ValueError:
+            return []
+        finally:
+            introspector.hash_version = current
+
+        if hashes == (row["MD5"], row["SHA256"]):
+            return [row]
+
+        return []
+
+    def _attach_info(self, dataset: "Dataset", ds_info: "DatasetInfo"):
+        # Hidden function to attach the DatasetInfo of an ingested dataset.
+        # Chunked files keep their introspector so that the file is never read
+        # into memory, their stored dataframe is pulled with get_dataset.
+        if isinstance(dataset.introspector, ChunkedDataFrameIntrospector):
+            return Dataset(dataset=_HashedObject(dataset.introspector,
+                                                 dataset.md5,
+                                                 dataset.sha256),
+                           ds_info=ds_info,
+                           hash_policy="trust")
+
+        return Dataset(dataset=dataset.ds, ds_info=ds_info,
+                       hash_policy="trust")
+
+    def _begin_ingest(self, dataset_id: int):
+        # Hidden function to record that a dataset is being ingested. Databases
+        # created before the DatasetIngest table existed do not track ingests.
+        # Called inside the transaction that creates the dataset so other
+        # uploads of this process see it running as soon as it exists.
+        if "DatasetIngest" not in self.constructor.tables:
+            return
+
+        with ACTIVE_INGESTS_LOCK:
+            ACTIVE_INGESTS.add(self._ingest_key(dataset_id))
+
+        created = datetime.utcnow()
+        self.db.table("DatasetIngest").insert({
+            "DatasetId": dataset_id,
+            "Complete": False,
+            "Owner": _ingest_owner(),
+            "Heartbeat": created,
+            "Created": created
+        })
+
+    def _checkpoint_ingest(self,
+                           dataset_id: int,
+                           label: int,
+                           db: Union[orator.DatabaseManager, None] = None):
+        # Hidden function to record the last label of the committed blocks.
+        # Called by introspectors with the connection they committed on, every
+        # checkpoint also shows the ingest is still running.
+        if db is None:
+            db = self.db
+
+        db.table("DatasetIngest")\
+            .where("DatasetId", "=", dataset_id)\
+            .update(LastLabel=label, Heartbeat=datetime.utcnow())
+
+    def _complete_ingest(self, dataset_id: int):
+        # Hidden function to mark the ingest of a dataset as complete.
+        if "DatasetIngest" not in self.constructor.tables:
+            return
+
+        self.db.table("DatasetIngest")\
+            .where("DatasetId", "=", dataset_id)\
+            .update(Complete=True, Completed=datetime.utcnow())
+
+    def _get_ingest(self, dataset_id: int) -> Union[dict, None]:
+        # Hidden function to get the ingest row of a dataset. Datasets without
+        # one were ingested before ingests were tracked and are complete.
+        if "DatasetIngest" not in self.constructor.tables:
+            return None
+
+        found = self.get_items_from_table(
+            "DatasetIngest", ["DatasetId", "=", dataset_id])
+        if len(found) == 0:
+            return None
+
+        return found[0]
+
+    def _ingest_key(self, dataset_id: int) -> tuple:
+        # Hidden function to key the ingests running in this process.
+        return (self.config.config.get("host"),
+                self.config.config["database"],
+                dataset_id)
+
+    def _ingest_alive(self, ingest: dict) -> bool:
+        # Hidden function to check if an incomplete ingest is still being
+        # written. Ingests of this process are tracked in memory, those of
+        # other processes on this host by their pid, and any other by how
+        # recently they checkpointed.
+        owner = ingest.get("Owner")
+        if owner is not None:
+            host, pid = owner.rsplit(":", 1)
+            if owner == _ingest_owner():
+                with ACTIVE_INGESTS_LOCK:
+                    return self._ingest_key(ingest["DatasetId"]) in \
+                        ACTIVE_INGESTS
+            if host == socket.gethostname() and os.name == "posix":
+                return _pid_exists(int(pid))
+
+        # ingests tracked before heartbeats existed use their creation time
+        heartbeat = ingest.get("Heartbeat") or ingest["Created"]
+        heartbeat = pd_Timestamp(heartbeat).to_pydatetime()
+        age = datetime.utcnow() - heartbeat
+        return age.total_seconds() < INGEST_TIMEOUT
+
+    def _claim_ingest(self, ingest: dict) -> bool:
+        # Hidden function to take over a stopped ingest. Only succeeds if no
+        # other upload took it over since it was read.
+        with ACTIVE_INGESTS_LOCK:
+            ACTIVE_INGESTS.add(self._ingest_key(ingest["DatasetId"]))
+
+        query = self.db.table("DatasetIngest")\
+            .where("DatasetIngestId", "=", ingest["DatasetIngestId"])
+        if ingest.get("Heartbeat") is None:
+            query = query.where_null("Heartbeat")
         else:
-            raise ValueError(TOO_MANY_RETURN_VALUES.format(n=1))
+            query = query.where("Heartbeat", "=", ingest["Heartbeat"])
 
-        # deconstruct
-        dataset.introspector.deconstruct(db=self.db, ds_info=ds_info, fms=self.constructor.fms)
+        updated = query.update(Owner=_ingest_owner(),
+                               Heartbeat=datetime.utcnow())
+        if updated != 1:
+            with ACTIVE_INGESTS_LOCK:
+                ACTIVE_INGESTS.discard(self._ingest_key(ingest["DatasetId"]))
+            return False
 
-        # attach info to a dataset
-        return Dataset(dataset=dataset.ds, ds_info=ds_info)
+        return True
+
+    def _ingest_complete(self, dataset_id: int) -> bool:
+        # Hidden function to check if the ingest of a dataset completed.
+        ingest = self._get_ingest(dataset_id)
+        return ingest is None or bool(ingest["Complete"])
+
+    def _resumable(self, introspector: Introspector) -> bool:
+        # Hidden function to check if an introspector can record and continue
+        # from ingest checkpoints.
+        params = inspect.signature(introspector.deconstruct).parameters
+        return "DatasetIngest" in self.constructor.tables and \
+            "start" in params and "checkpoint" in params
 
     def _upload_dataset(self, dataset, **params):
         # Hidden upload dataset function used by the process method to simply
         # pass the non linked dataset to the output which will then be stored
-        # as a linked dataset.
+        # as a linked dataset. The hashes were verified by upload_dataset so
+        # the output is a hashed handle that is not hashed again.
 
-        return dataset
+        return _HashedObject(dataset.introspector, dataset.md5, dataset.sha256)
 
-    def upload_dataset(self, dataset: "Dataset", **kwargs) -> "DatasetInfo":
+    def upload_dataset(self,
+                       dataset: "Dataset",
+                       resume: bool = False,
+                       **kwargs) -> "DatasetInfo":
         """
         Upload a dataset to the database. Simply put it prepares a dataset for
         ingestion and passes parameters to the process function to properly
@@ -1116,6 +1600,11 @@ class DatasetDatabase(object):
         ##### dataset: Dataset
         The dataset object ready for ingestion to a database.
 
+        ##### resume: bool = False
+        If an earlier upload of the same dataset did not complete, continue
+        from its last committed block instead of uploading it again. Failed
+        uploads are kept so that they can be resumed later.
+
 
         #### Returns
         ##### dataset: Dataset
@@ -1134,14 +1623,28 @@ class DatasetDatabase(object):
 
         # enforce types
         checks.check_types(dataset, Dataset)
+        checks.check_types(resume, bool)
 
         # enforce no change since create
-        curr_md5 = dataset.introspector.get_object_hash()
-        md5_match = curr_md5 == dataset.md5
-        assert md5_match, UNKNOWN_DATASET_HASH.format(
-            o=dataset.md5, c=curr_md5)
+        curr_hashes = tuple(dataset.introspector.get_object_hashes())
+        hashes_match = curr_hashes == (dataset.md5, dataset.sha256)
+        assert hashes_match, UNKNOWN_DATASET_HASH.format(
+            o=(dataset.md5, dataset.sha256), c=curr_hashes)
+
+        # update introspector after create
+        current_introspector = dataset.introspector
+        current_annotations = dataset.annotations
+        uploaded = self.process(**self._upload_params(dataset, resume))
+        uploaded._introspector = current_introspector
+        uploaded._introspector._validated = True
+        uploaded._annotations = current_annotations
+        uploaded.update_annotations()
+
+        return uploaded
 
-        # create basic params
+    def _upload_params(self, dataset: "Dataset", resume: bool) -> dict:
+        # Hidden function to create the process parameters that record an
+        # upload as a run of the upload dataset algorithm.
         create_params = {}
         create_params["algorithm"] = self._upload_dataset
         create_params["input_dataset"] = dataset
@@ -1150,24 +1653,104 @@ class DatasetDatabase(object):
         create_params["algorithm_version"] = VERSION
         create_params["output_dataset_name"] = dataset.name
         create_params["output_dataset_description"] = dataset.description
+        create_params["resume"] = resume
 
-        # update introspector after create
-        current_introspector = dataset.introspector
-        current_annotations = dataset.annotations
-        uploaded = self.process(**create_params)
-        uploaded._introspector = current_introspector
-        uploaded._introspector._validated = True
-        uploaded._annotations = current_annotations
-        uploaded.update_annotations()
+        return create_params
 
-        return uploaded
+    def upload_file(self,
+                    path: Union[str, pathlib.Path],
+                    name: Union[str, None] = None,
+                    description: Union[str, None] = None,
+                    chunksize: int = DEFAULT_FILE_CHUNKSIZE,
+                    resume: bool = False,
+                    **kwargs) -> "Dataset":
+        """
+        Upload a csv file too large to hold in memory as a dataframe dataset.
+        The file is read twice, a chunk at a time, once to hash it and once to
+        deconstruct it, so memory use is bounded by the chunksize instead of
+        the size of the file. Row labels continue across chunks so the stored
+        dataset is the same dataframe a single read of the file would give.
+        Like upload_dataset, if the dataset already exists in the database it
+        is not stored again.
+
+        The dataset is hashed with hash version 3, the hashes of consecutive
+        row segments chained in order, which does not depend on the chunksize.
+        Because every chunk is read on its own, column types are inferred per
+        chunk; pass a dtype mapping to pin them.
+
+
+        #### Example
+        ```
+        >>> db.upload_file("/path/to/manifest.csv", name="manifest", chunksize=50000)
+
+        ```
+
+
+        #### Parameters
+        ##### path: str, pathlib.Path
+        The csv file to upload.
+
+        ##### name: str, None = None
+        A name for the dataset.
+
+        ##### description: str, None = None
+        A description for the dataset.
+
+        ##### chunksize: int = DEFAULT_FILE_CHUNKSIZE
+        About how many rows to read and deconstruct at a time.
+
+        ##### resume: bool = False
+        If an earlier upload of the same file did not complete, continue
+        from its last committed block instead of uploading it again.
+
+        ##### **kwargs
+        Any other keyword arguments are passed to pandas.read_csv.
+
+
+        #### Returns
+        ##### dataset: Dataset
+        A dataset with the DatasetInfo block attached. Its ds is the chunked
+        file handle, pull the stored dataframe with get_dataset or
+        iter_dataset.
+
+
+        #### Errors
+        ##### AssertionError
+        The chunksize is not a positive number of rows.
+
+        """
+
+        # enforce types
+        checks.check_types(path, [str, pathlib.Path])
+        checks.check_types(name, [str, type(None)])
+        checks.check_types(description, [str, type(None)])
+        checks.check_types(chunksize, int)
+        checks.check_types(resume, bool)
+
+        # hash the file a segment at a time
+        chunks = DataFrameChunks(path, chunksize=chunksize, **kwargs)
+        introspector = ChunkedDataFrameIntrospector(chunks)
+        md5, sha256 = introspector.get_object_hashes()
+
+        # the hashed handle is never hashed again
+        dataset = Dataset(_HashedObject(introspector, md5, sha256),
+                          name=name,
+                          description=description)
+
+        return self.process(**self._upload_params(dataset, resume))
 
     def get_dataset(self,
                     name: Union[str, None] = None,
-                    id: Union[int, None] = None) -> "Dataset":
+                    id: Union[int, None] = None,
+                    hash_policy: Union[str, None] = None,
+                    columns: Union[List[str], None] = None,
+                    rows: Union[range, List[int], None] = None) -> "Dataset":
         """
         Pull and reconstruct a dataset from the database. Must provided either
-        a dataset name or a dataset id to retrieve the dataset.
+        a dataset name or a dataset id to retrieve the dataset. Optionally only
+        a subset of columns and rows are pulled, in which case only the
+        selected values are fetched and unpickled. If the DatabaseConfig has a
+        cache_dir, full datasets are read from the local cache when present.
 
 
         #### Example
@@ -1175,6 +1758,10 @@ class DatasetDatabase(object):
         >>> db.get_dataset("Label Free Images")
         {info: ...}
 
+        >>> db.get_dataset("Label Free Images", columns=["Cell", "Volume"],
+        >>>                rows=range(100))
+        {info: ...}
+
         >>> db.get_dataset("This dataset doesn't exist")
         ValueError: Dataset not found using parameters...
 
@@ -1188,6 +1775,22 @@ class DatasetDatabase(object):
         ##### id: int, None = None
         The id of the dataset you want to reconstruct.
 
+        ##### hash_policy: str, None = None
+        How the reconstructed dataset should treat the hashes stored in the
+        database. If None provided, the database hash_policy is used.
+
+        ##### columns: List[str], None = None
+        Which columns (or dictionary keys) to pull. If None provided, all
+        columns are pulled.
+
+        ##### rows: range, List[int], None = None
+        Which row labels to pull, either as a range or as a list. The pulled
+        rows are indexed by these labels. If None provided, all rows are
+        pulled.
+
+        Subsets are hashed when pulled as they no longer match the hashes
+        stored for the full dataset.
+
 
         #### Returns
         ##### dataset: Dataset
@@ -1205,11 +1808,187 @@ class DatasetDatabase(object):
         Malformed database error, too many values returned from a query
         expecting a single value or no value to return.
 
+        ##### ValueError
+        The dataset introspector cannot pull the requested subset.
+
         """
 
         # enforce types
         checks.check_types(name, [str, type(None)])
         checks.check_types(id, [int, type(None)])
+        checks.check_types(hash_policy, [str, type(None)])
+        checks.check_types(columns, [list, type(None)])
+        checks.check_types(rows, [range, list, type(None)])
+
+        # get ds_info, datasets cached this session are known by id
+        if id is not None and id in self._dataset_infos:
+            ds_info = self._dataset_infos[id]
+        else:
+            ds_info = self._get_dataset_info(name, id)
+
+        # collect subset parameters
+        reconstructor = RECONSTRUCTOR_MAP[ds_info.introspector]
+        subset = {}
+        if columns is not None:
+            subset["columns"] = columns
+        if rows is not None:
+            subset["rows"] = rows
+
+        # enforce reconstructor can pull subset
+        accepted = inspect.signature(reconstructor).parameters
+        for param in subset:
+            if param not in accepted:
+                raise ValueError(UNSUPPORTED_SUBSET.format(
+                    p=param, i=ds_info.introspector))
+
+        # cached datasets skip reconstruction, subsets are never cached
+        obj = None
+        if len(subset) == 0:
+            obj = self._get_cached_dataset(ds_info)
+
+        # reconstruct object
+        if obj is None:
+            obj = reconstructor(db=self.db, ds_info=ds_info, fms=self.constructor.fms, **subset)
+
+            # store for the next pull
+            if len(subset) == 0:
+                self._cache_dataset(ds_info, obj, local=True)
+
+        # subsets do not match the stored hashes
+        if len(subset) > 0:
+            hash_policy = "rehash"
+
+        dataset = Dataset(dataset=obj, ds_info=ds_info, hash_policy=hash_policy)
+
+        # the introspector renumbers rows, a row subset keeps its labels
+        if "rows" in subset:
+            dataset.introspector._obj.index = obj.index
+
+        return dataset
+
+    def iter_dataset(self,
+                     name: Union[str, None] = None,
+                     id: Union[int, None] = None,
+                     chunksize: int = 10000,
+                     columns: Union[List[str], None] = None) -> Iterator:
+        """
+        Iterate over a dataset from the database in chunks ordered by row
+        label. Rows are streamed from an incremental cursor (server side for
+        PostgreSQL) so datasets larger than memory can be processed one chunk
+        at a time. Must provided either a dataset name or a dataset id.
+
+
+        #### Example
+        ```
+        >>> for chunk in db.iter_dataset("Label Free Images", chunksize=500):
+        >>>     process(chunk)
+
+        ```
+
+
+        #### Parameters
+        ##### name: str, None = None
+        The name of the dataset you want to iterate over.
+
+        ##### id: int, None = None
+        The id of the dataset you want to iterate over.
+
+        ##### chunksize: int = 10000
+        How many rows each chunk should hold. The last chunk may hold fewer.
+
+        ##### columns: List[str], None = None
+        Which columns to pull. If None provided, all columns are pulled.
+
+
+        #### Returns
+        ##### chunks: Iterator[pandas.DataFrame]
+        DataFrame chunks indexed by their original row labels.
+
+
+        #### Errors
+        ##### AssertionError
+        Missing parameter, must provided either id or name.
+
+        ##### AssertionError
+        Chunksize must be a positive integer.
+
+        ##### ValueError
+        Dataset not found using the provided id or name.
+
+        ##### ValueError
+        The dataset introspector cannot be iterated over.
+
+        """
+
+        # enforce types
+        checks.check_types(name, [str, type(None)])
+        checks.check_types(id, [int, type(None)])
+        checks.check_types(chunksize, int)
+        checks.check_types(columns, [list, type(None)])
+
+        # enforce chunksize
+        assert chunksize > 0, INVALID_CHUNKSIZE
+
+        # get ds_info
+        ds_info = self._get_dataset_info(name, id)
+
+        # enforce introspector can be iterated over
+        if ds_info.introspector not in ITER_RECONSTRUCTOR_MAP:
+            raise ValueError(UNSUPPORTED_ITER.format(i=ds_info.introspector))
+
+        # stream chunks
+        return ITER_RECONSTRUCTOR_MAP[ds_info.introspector](
+            db=self.db, ds_info=ds_info, fms=self.constructor.fms,
+            chunksize=chunksize, columns=columns)
+
+    def _get_cached_dataset(self, ds_info: "DatasetInfo") -> Union[object, None]:
+        # Hidden function to read a full dataset object from the session
+        # memory cache and then from the local disk cache. Returns None when
+        # the dataset is not cached.
+
+        # session
+        if self.memory_cache is not None:
+            obj = self.memory_cache.get(ds_info.id)
+            if obj is not None:
+                return obj
+
+        # local
+        if self.cache is not None:
+            obj = self.cache.get(ds_info.id, ds_info.sha256)
+            if obj is not None:
+                self._cache_dataset(ds_info, obj, local=False)
+                return obj
+
+        return None
+
+    def _cache_dataset(self, ds_info: "DatasetInfo", obj: object, local: bool):
+        # Hidden function to store a full dataset object in the session memory
+        # cache and optionally the local disk cache.
+
+        # session
+        if self.memory_cache is not None:
+            self.memory_cache.put(ds_info.id, obj)
+            self._dataset_infos[ds_info.id] = ds_info
+
+        # local
+        if local and self.cache is not None:
+            self.cache.put(ds_info.id, ds_info.sha256, obj)
+
+    def _uncache_dataset(self, dataset_id: int, sha256: str):
+        # Hidden function to remove a dataset from the session memory cache,
+        # the session DatasetInfo lookup, and the local disk cache.
+        if self.memory_cache is not None:
+            self.memory_cache.remove(dataset_id)
+        self._dataset_infos.pop(dataset_id, None)
+
+        if self.cache is not None:
+            self.cache.remove(dataset_id, sha256)
+
+    def _get_dataset_info(self,
+                          name: Union[str, None] = None,
+                          id: Union[int, None] = None) -> "DatasetInfo":
+        # Hidden function to find the single DatasetInfo matching the passed
+        # name or id. Shared by the functions that read datasets.
 
         # must pass parameter
         assert any(i is not None for i in [id, name]), \
@@ -1226,8 +2005,7 @@ class DatasetDatabase(object):
         # found
         if len(found_ds) == 1:
             ds_info = found_ds[0]
-            ds_info["OriginDb"] = self
-            ds_info = DatasetInfo(**ds_info)
+            return DatasetInfo._from_row(ds_info, self)
 
         # not found
         elif len(found_ds) == 0:
@@ -1237,17 +2015,15 @@ class DatasetDatabase(object):
         else:
             raise ValueError(TOO_MANY_RETURN_VALUES.format(n=1))
 
-        # reconstruct object
-        obj = RECONSTRUCTOR_MAP[ds_info.introspector](db=self.db, ds_info=ds_info, fms=self.constructor.fms)
-
-        return Dataset(dataset=obj, ds_info=ds_info)
-
     def preview(self,
                 name: Union[str, None] = None,
                 id: Union[int, None] = None) -> "Dataset":
         """
         Pull and create summary info about a dataset from the database. Must
         provided either a dataset name or a dataset id to retrieve the dataset.
+        The preview is built from the stats row stored at ingest when present,
+        otherwise from a fixed number of aggregate queries, so previewing does
+        not scale with the size of the dataset.
 
 
         #### Example
@@ -1272,8 +2048,8 @@ class DatasetDatabase(object):
         #### Returns
         ##### preview: Dataset
         A dictionary with summary info about a dataset that contains things
-        like the DatasetInfo block, the shape, columns/ keys, and any
-        annotations.
+        like the DatasetInfo block, the shape, columns/ keys, the stored byte
+        size when known, and any annotations.
 
 
         #### Errors
@@ -1298,59 +2074,53 @@ class DatasetDatabase(object):
             MISSING_PARAMETER.format(p=["id", "name"])
 
         # get ds_info
-        if id is not None:
-            found_ds = self.get_items_from_table(
-                "Dataset", ["DatasetId", "=", id])
-        else:
-            found_ds = self.get_items_from_table(
-                "Dataset", ["Name", "=", name])
-
-        # found
-        if len(found_ds) == 1:
-            ds_info = found_ds[0]
-            ds_info["OriginDb"] = self
-            ds_info = DatasetInfo(**ds_info)
+        ds_info = self._get_dataset_info(name, id)
 
-        # not found
-        elif len(found_ds) == 0:
-            raise ValueError(DATASET_NOT_FOUND.format(kw=locals()))
-
-        # database structure error
+        # stats written at ingest, otherwise aggregate queries
+        stats = self._get_dataset_stats(ds_info.id)
+        if stats is not None:
+            n_rows, keys = stats["Rows"], json.loads(stats["Keys"])
         else:
-            raise ValueError(TOO_MANY_RETURN_VALUES.format(n=1))
-
-        # get groups
-        groups = self.get_items_from_table(
-            "GroupDataset", ["DatasetId", "=", ds_info.id])
-
-        # get first group
-        iota_groups = self.get_items_from_table(
-            "IotaGroup", ["GroupId", "=", groups[0]["GroupId"]])
-
-        # shape
-        shape = (len(groups), len(iota_groups))
-
-        # keys
-        keys = []
-        for ig in iota_groups:
-            keys.append(self.get_items_from_table(
-                "Iota", ["IotaId", "=", ig["IotaId"]])[0]["Key"])
-
-        # annotations
-        annotation_datasets = self.get_items_from_table(
-            "AnnotationDataset", ["DatasetId", "=", ds_info.id])
+            n_rows, keys = tools.get_dataset_shape(self.db, ds_info.id)
 
         # annotations
-        annotations = []
-        for ad in annotation_datasets:
-            annotations.append(self.get_items_from_table(
-                "Annotation", ["AnnotationId", "=", ad["AnnotationId"]])[0])
+        annotations = tools.get_dataset_annotations(self.db, ds_info.id)
 
         return {"info": ds_info,
-                "shape": shape,
+                "shape": (n_rows, len(keys)),
                 "keys": keys,
+                "byte_size": None if stats is None else stats["ByteSize"],
                 "annotations": annotations}
 
+    def _get_dataset_stats(self, dataset_id: int) -> Union[dict, None]:
+        # Hidden function to get the stats row written at ingest. Databases
+        # created before the DatasetStats table existed have none.
+        if "DatasetStats" not in self.constructor.tables:
+            return None
+
+        found = self.get_items_from_table(
+            "DatasetStats", ["DatasetId", "=", dataset_id])
+        if len(found) == 0:
+            return None
+
+        return found[0]
+
+    def _write_dataset_stats(self, ds_info: "DatasetInfo"):
+        # Hidden function to store the row count, keys, and stored byte size of
+        # a freshly deconstructed dataset so that previews do not need to
+        # aggregate over every row.
+        if "DatasetStats" not in self.constructor.tables:
+            return
+
+        n_rows, keys = tools.get_dataset_shape(self.db, ds_info.id)
+        tools.insert_to_db_table(self.db, "DatasetStats", {
+            "DatasetId": ds_info.id,
+            "Rows": n_rows,
+            "Keys": json.dumps(keys),
+            "ByteSize": tools.get_dataset_byte_size(self.db, ds_info.id),
+            "Created": datetime.utcnow()
+        })
+
     def get_items_from_table(self,
                              table: str,
                              conditions: List[
@@ -1414,7 +2184,9 @@ class DatasetDatabase(object):
         # Hidden insert to table function used to insert values to tables.
         # Given a table name as a string and a dictionary with the items to
         # insert as key = column name, and value = value, will insert the row
-        # into the table. Additionally it returns this created row.
+        # into the table. Additionally it returns this created row. If the row
+        # already exists by the tables unique key, the existing row is
+        # returned instead.
 
         # enforce types
         checks.check_types(table, str)
@@ -1450,13 +2222,136 @@ class DatasetDatabase(object):
         # get all runs
         runs = self.get_items_from_table(
             "RunOutput", ["DatasetId", "=", id])
+        found_ds = self.get_items_from_table("Dataset", ["DatasetId", "=", id])
 
         # deletes
-        self.db.table("GroupDataset").where("DatasetId", "=", id).delete()
-        self.db.table("RunOutput").where("DatasetId", "=", id).delete()
-        for run in runs:
-            self.db.table("Run").where("RunId", "=", run["RunId"]).delete()
-        self.db.table("Dataset").where("DatasetId", "=", id).delete()
+        with self.db.transaction():
+            self.db.table("GroupDataset").where("DatasetId", "=", id).delete()
+            self.db.table("AnnotationDataset")\
+                .where("DatasetId", "=", id).delete()
+            for table in ["DatasetStats", "DatasetIngest"]:
+                if table in self.constructor.tables:
+                    self.db.table(table).where("DatasetId", "=", id).delete()
+            self.db.table("RunOutput").where("DatasetId", "=", id).delete()
+            for run in runs:
+                self.db.table("Run").where("RunId", "=", run["RunId"]).delete()
+            self.db.table("Dataset").where("DatasetId", "=", id).delete()
+
+        # forget every cached copy
+        if len(found_ds) > 0:
+            self._uncache_dataset(id, found_ds[0]["SHA256"])
+
+    def list_datasets(self,
+                      filters: List[
+                        Union[
+                            List[GENERIC_TYPES],
+                            GENERIC_TYPES
+                        ]
+                      ] = [],
+                      order: str = "DatasetId",
+                      page_size: int = DEFAULT_PAGE_SIZE,
+                      cursor: Union[tuple, None] = None
+                      ) -> Tuple[List["DatasetRecord"], Union[tuple, None]]:
+        """
+        List a page of the datasets stored in the database as compact
+        DatasetRecords. Pages are found by keyset pagination, each page starts
+        right after the cursor returned with the previous page, so every page
+        costs a single indexed query no matter how deep into the catalog it
+        is. Records are not validated against the database.
+
+
+        #### Example
+        ```
+        >>> records, cursor = db.list_datasets(page_size=2)
+        >>> records
+        [<DatasetRecord [1, "deba767d-..."]>, <DatasetRecord [2, "QCB"]>]
+
+        >>> db.list_datasets(page_size=2, cursor=cursor)
+        ([<DatasetRecord [3, "QCB_features_new"]>], None)
+
+        >>> db.list_datasets([["Name", "like", "QCB%"]], order="-Created")
+        ([<DatasetRecord [3, "QCB_features_new"]>, ...], None)
+
+        ```
+
+
+        #### Parameters
+        ##### filters: List[Union[List[GENERIC_TYPES], GENERIC_TYPES]] = []
+        A list or a list of lists of where conditions on the Dataset table in
+        the same format as get_items_from_table.
+
+        ##### order: str = "DatasetId"
+        Which column to order the datasets by, one of DATASET_ORDERS. Prefix
+        with "-" to order descending. Ties are broken by DatasetId.
+
+        ##### page_size: int = DEFAULT_PAGE_SIZE
+        The maximum number of records to return.
+
+        ##### cursor: tuple, None = None
+        The cursor returned with the previous page. If None provided, the
+        first page is returned.
+
+
+        #### Returns
+        ##### records: List[DatasetRecord]
+        The datasets on this page.
+
+        ##### cursor: tuple, None
+        The cursor to pass to get the next page. None when this is the last
+        page.
+
+
+        #### Errors
+        ##### AssertionError
+        Unknown order column or page size is not positive.
+
+        """
+
+        # enforce types
+        checks.check_types(filters, list)
+        checks.check_types(order, str)
+        checks.check_types(page_size, int)
+        checks.check_types(cursor, [tuple, type(None)])
+
+        # parse order
+        column = order.lstrip("-")
+        descending = order.startswith("-")
+        assert column in DATASET_ORDERS, UNKNOWN_DATASET_ORDER
+        assert page_size > 0, INVALID_PAGE_SIZE
+
+        # filter
+        query = self.db.table("Dataset").select(*DatasetRecord.COLUMNS)
+        if len(filters) > 0:
+            query = tools.where_conditions(query, filters)
+
+        # continue after the last row of the previous page
+        after = "<" if descending else ">"
+        if cursor is not None:
+            value, last_id = cursor
+            if column == "DatasetId":
+                query = query.where("DatasetId", after, last_id)
+            else:
+                query = query.where(
+                    query.new_query()
+                         .where(column, after, value)
+                         .or_where(query.new_query()
+                                        .where(column, "=", value)
+                                        .where("DatasetId", after, last_id)))
+
+        # order with a unique tie break so pages never overlap
+        direction = "desc" if descending else "asc"
+        query = query.order_by(column, direction)
+        if column != "DatasetId":
+            query = query.order_by("DatasetId", direction)
+
+        # one extra row tells if there is a next page
+        rows = [dict(row) for row in query.limit(page_size + 1).get()]
+        next_cursor = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            next_cursor = (rows[-1][column], rows[-1]["DatasetId"])
+
+        return [DatasetRecord(row) for row in rows], next_cursor
 
     @property
     def recent(self):
@@ -1548,6 +2443,16 @@ class DatasetInfo(object):
     ##### Description: str, None = None
     The description for the dataset.
 
+    ##### HashVersion: int, None = None
+    The hashing scheme version used to produce the MD5 and SHA256. If None
+    provided, the dataset was hashed before versions were recorded and
+    version 1 is assumed.
+
+    ##### validate: bool = True
+    Should the attributes be checked against the linked database. Database
+    functions build their DatasetInfo from rows they just read or wrote and
+    skip this query.
+
 
     #### Returns
     ##### self
@@ -1567,7 +2472,9 @@ class DatasetInfo(object):
                  SHA256: str,
                  Created: Union[datetime, str],
                  OriginDb: DatasetDatabase,
-                 Description: Union[str, None] = None):
+                 Description: Union[str, None] = None,
+                 HashVersion: Union[int, None] = None,
+                 validate: bool = True):
         # enforce types
         checks.check_types(DatasetId, int)
         checks.check_types(Name, [str, type(None)])
@@ -1577,10 +2484,14 @@ class DatasetInfo(object):
         checks.check_types(SHA256, str)
         checks.check_types(Created, [datetime, str])
         checks.check_types(OriginDb, DatasetDatabase)
+        checks.check_types(HashVersion, [int, type(None)])
+        checks.check_types(validate, bool)
 
         # convert types
         if isinstance(Created, str):
             Created = datetime.strptime(Created, DATETIME_PARSE)
+        if HashVersion is None:
+            HashVersion = 1
 
         # set attributes
         self._id = DatasetId
@@ -1591,9 +2502,18 @@ class DatasetInfo(object):
         self._sha256 = SHA256
         self._created = Created
         self._origin = OriginDb
+        self._hash_version = HashVersion
 
         # validate attributes
-        self._validate_info()
+        if validate:
+            self._validate_info()
+
+    @classmethod
+    def _from_row(cls, row: Dict[str, GENERIC_TYPES], origin: DatasetDatabase):
+        # Hidden constructor for rows that were just read from or written to
+        # the Dataset table of the origin database. They are known to exist so
+        # they are not validated again.
+        return cls(**row, OriginDb=origin, validate=False)
 
     @property
     def id(self):
@@ -1627,6 +2547,10 @@ class DatasetInfo(object):
     def origin(self):
         return self._origin
 
+    @property
+    def hash_version(self):
+        return self._hash_version
+
     def _validate_info(self):
         # Hidden function used to validate that all the attributes passed do
         # actually exist and are the same in database.
@@ -1651,6 +2575,104 @@ class DatasetInfo(object):
         return str(self)
 
 
+class DatasetRecord(object):
+    """
+    Compact read only metadata record of a stored dataset returned when
+    listing datasets. Unlike a DatasetInfo a record is not validated against
+    the database and holds no link to it.
+    """
+
+    COLUMNS = ("DatasetId", "Name", "Description", "Introspector", "MD5",
+               "SHA256", "HashVersion", "Created")
+
+    __slots__ = ("id", "name", "description", "introspector", "md5",
+                 "sha256", "hash_version", "created")
+
+    def __init__(self, row: Dict[str, GENERIC_TYPES]):
+        # convert types
+        created = row["Created"]
+        if isinstance(created, str):
+            created = datetime.strptime(created, DATETIME_PARSE)
+
+        # set attributes
+        self.id = row["DatasetId"]
+        self.name = row["Name"]
+        self.description = row["Description"]
+        self.introspector = row["Introspector"]
+        self.md5 = row["MD5"]
+        self.sha256 = row["SHA256"]
+        self.hash_version = row["HashVersion"] or 1
+        self.created = created
+
+    def __str__(self):
+        return "<DatasetRecord [{}, {}]>".format(self.id, repr(self.name))
+
+    def __repr__(self):
+        return str(self)
+
+
+def _ingest_owner() -> str:
+    # the host and process writing an ingest
+    return "{}:{}".format(socket.gethostname(), os.getpid())
+
+
+def _pid_exists(pid: int) -> bool:
+    # signal 0 only checks that the process exists
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+    return True
+
+
+def _introspector_module(introspector: Introspector) -> str:
+    # the module path stored in the Dataset Introspector column, chunked files
+    # are stored as the dataframes they hold
+    introspector_type = type(introspector)
+    if isinstance(introspector, ChunkedDataFrameIntrospector):
+        introspector_type = DataFrameIntrospector
+
+    introspector_module = str(introspector_type)
+    begin = len("<class '")
+    end = introspector_module.index("'>")
+    return introspector_module[begin: end]
+
+
+class _HashedObject(object):
+    # Hidden immutable handle pairing an introspector with the hashes already
+    # computed for its object. Passed through the process pipeline so that an
+    # upload only hashes the object once.
+
+    __slots__ = ("_introspector", "_md5", "_sha256")
+
+    def __init__(self, introspector: Introspector, md5: str, sha256: str):
+        object.__setattr__(self, "_introspector", introspector)
+        object.__setattr__(self, "_md5", md5)
+        object.__setattr__(self, "_sha256", sha256)
+
+    @property
+    def introspector(self):
+        return self._introspector
+
+    @property
+    def obj(self):
+        return self.introspector.obj
+
+    @property
+    def md5(self):
+        return self._md5
+
+    @property
+    def sha256(self):
+        return self._sha256
+
+    def __setattr__(self, name, value):
+        raise AttributeError(IMMUTABLE_HANDLE)
+
+
 class Dataset(object):
     """
     Create a Dataset.
@@ -1707,6 +2729,17 @@ class Dataset(object):
     Iota and Groups. If None is provided, an introspector is determined by type
     but you can optionally force an introspector to be used.
 
+    ##### hash_policy: str, None = None
+    Only used when both a dataset and a DatasetInfo are provided. "trust" uses
+    the hashes stored in the DatasetInfo, "lazy" verifies them against the
+    dataset before the first change made through this object, "background"
+    starts that verification in a background thread right away, and "rehash"
+    hashes the dataset immediately. Lazy and background verification hash a
+    private copy of the dataset, when that copy can not be made for free
+    (pandas without copy on write, or a non pandas dataset) the stored hashes
+    are verified immediately instead. If None provided, the hash_policy of
+    the DatasetInfo origin database is used.
+
 
     #### Returns
     ##### self
@@ -1716,6 +2749,9 @@ class Dataset(object):
     ##### AssertionError
     Must pass one or both of the following, dataset or ds_info.
 
+    ##### AssertionError
+    Unknown hash policy.
+
     """
 
     def __init__(self,
@@ -1723,7 +2759,8 @@ class Dataset(object):
                  ds_info: Union[DatasetInfo, None] = None,
                  name: Union[str, None] = None,
                  description: Union[str, None] = None,
-                 introspector: Union[Introspector, str, None] = None):
+                 introspector: Union[Introspector, str, None] = None,
+                 hash_policy: Union[str, None] = None):
 
         # enforce types
         checks.check_types(dataset, [object, type(None)])
@@ -1731,19 +2768,37 @@ class Dataset(object):
         checks.check_types(name, [str, type(None)])
         checks.check_types(description, [str, type(None)])
         checks.check_types(introspector, [Introspector, str, type(None)])
+        checks.check_types(hash_policy, [str, type(None)])
 
         # must provide dataset or ds_info
         assert dataset is not None or ds_info is not None, MISSING_INIT
 
+        # handle hash policy
+        if hash_policy is None:
+            if ds_info is None:
+                hash_policy = "rehash"
+            else:
+                hash_policy = ds_info.origin.hash_policy
+
+        # enforce hash policy
+        assert hash_policy in HASH_POLICIES, UNKNOWN_HASH_POLICY
+
         # read dataset
         if isinstance(dataset, (str, pathlib.Path)):
             dataset = read_dataset(dataset).ds
 
+        # unpack hashed handle
+        hashed = None
+        if isinstance(dataset, _HashedObject):
+            hashed = dataset
+            dataset = hashed.obj
+            introspector = hashed.introspector
+
         # info
         self._info = ds_info
 
-        # introspector
-        if self.info is None:
+        # introspector, a hashed handle keeps its own
+        if self.info is None or hashed is not None:
             if introspector is None:
                 t_ds = type(dataset)
                 if t_ds in INTROSPECTOR_MAP:
@@ -1759,9 +2814,36 @@ class Dataset(object):
         if isinstance(self.introspector, str):
             self._introspector = INTROSPECTOR_MAP[self.introspector](dataset)
 
+        # hash with the same scheme the stored hashes used
+        if self.info is not None:
+            self._introspector.hash_version = self.info.hash_version
+
         # update hashes
-        self._md5 = self.introspector.get_object_hash()
-        self._sha256 = self.introspector.get_object_hash(hashlib.sha256)
+        self._pending_hashes = None
+        if hashed is not None:
+            self._md5, self._sha256 = hashed.md5, hashed.sha256
+        elif self.info is None or hash_policy == "rehash":
+            self._md5, self._sha256 = self.introspector.get_object_hashes()
+        else:
+            self._md5, self._sha256 = self.info.md5, self.info.sha256
+
+            # schedule verification of the stored hashes against a private
+            # copy, the caller may change the object while it is hashed
+            if self.introspector.obj is not None and \
+                    hash_policy in ("lazy", "background"):
+                private = snapshot(self.introspector.obj)
+                if private is None:
+                    # no free copy, verify before handing the object out
+                    self._pending_hashes = self.introspector.get_object_hashes
+                    self._verify_hashes()
+                else:
+                    hasher = type(self.introspector)(private)
+                    hasher.hash_version = self.introspector.hash_version
+                    if hash_policy == "lazy":
+                        self._pending_hashes = hasher.get_object_hashes
+                    else:
+                        self._pending_hashes = HASH_VERIFIER.submit(
+                            hasher.get_object_hashes)
 
         # unpack based on info
         # name
@@ -1778,17 +2860,11 @@ class Dataset(object):
         else:
             self.description = self.info.description
 
-        # annotations
+        # annotations, stored annotations are loaded on first access
         if self.info is None:
             self._annotations = []
         else:
-            annotation_dataset = self.info.origin.get_items_from_table(
-                "AnnotationDataset", ["DatasetId", "=", self.info.id])
-            annotations = []
-            for ad in annotation_dataset:
-                annotations += self.info.origin.get_items_from_table(
-                    "Annotation", ["AnnotationId", "=", ad["AnnotationId"]])
-            self._annotations = annotations
+            self._annotations = None
 
         # created
         if self.info is None:
@@ -1828,8 +2904,17 @@ class Dataset(object):
     def sha256(self):
         return self._sha256
 
+    @property
+    def hash_version(self):
+        return self.introspector.hash_version
+
     @property
     def annotations(self):
+        # get annotations if not loaded
+        if self._annotations is None:
+            self._annotations = tools.get_dataset_annotations(
+                self.info.origin.db, self.info.id)
+
         return self._annotations
 
     @property
@@ -1880,15 +2965,19 @@ class Dataset(object):
 
 
         #### Errors
+        ##### ValueError
+        The dataset no longer matches the hashes stored in the database.
 
         """
 
+        # verify stored hashes before change
+        self._verify_hashes()
+
         # validate obj
         self.introspector.validate(**kwargs)
 
         # update hashes
-        self._md5 = self.introspector.get_object_hash()
-        self._sha256 = self.introspector.get_object_hash(hashlib.sha256)
+        self._md5, self._sha256 = self.introspector.get_object_hashes()
 
     def store_files(self, **kwargs):
         """
@@ -1934,6 +3023,9 @@ class Dataset(object):
         if self.info is None:
             raise AttributeError(MISSING_DATASET_INFO)
 
+        # verify stored hashes before change
+        self._verify_hashes()
+
         # prep params
         params = {"db": self.info.origin.constructor.db,
                   "fms": self.info.origin.constructor.fms,
@@ -1947,7 +3039,7 @@ class Dataset(object):
                    output_dataset_description=self.description,
                    algorithm_parameters=params)
 
-    def upload_to(self, database: DatasetDatabase):
+    def upload_to(self, database: DatasetDatabase, resume: bool = False):
         """
         Upload the dataset to a database. This is a wrapper around the
         database.uplaod_dataset functionality that in-itself is a wrapper
@@ -1970,6 +3062,9 @@ class Dataset(object):
         ##### database: DatasetDatabase
         The target database to upload to.
 
+        ##### resume: bool = False
+        Continue an earlier upload of this dataset that did not complete.
+
 
         #### Returns
 
@@ -1979,9 +3074,10 @@ class Dataset(object):
         """
         # enforce types
         checks.check_types(database, DatasetDatabase)
+        checks.check_types(resume, bool)
 
         # run upload
-        ds = database.upload_dataset(self)
+        ds = database.upload_dataset(self, resume=resume)
 
         # reassign self
         self._reassign_self(ds)
@@ -2081,6 +3177,9 @@ class Dataset(object):
         Too many datasets found with the same MD5 and SHA256, indicating
         something is drastically wrong with the database.
 
+        ##### ValueError
+        The dataset no longer matches the hashes stored in the database.
+
         """
 
         # enforce types
@@ -2095,6 +3194,9 @@ class Dataset(object):
         checks.check_types(output_dataset_name, [str, type(None)])
         checks.check_types(output_dataset_description, [str, type(None)])
 
+        # verify stored hashes before change
+        self._verify_hashes()
+
         # database already in info
         if database is None:
             if self.info is None:
@@ -2145,9 +3247,32 @@ class Dataset(object):
         self._introspector = ds.introspector
         self.name = ds.name
         self.description = ds.description
-        self._annotations = ds.annotations
+        self._annotations = ds._annotations
         self._md5 = ds.md5
-        self._sha256 = ds.md5
+        self._sha256 = ds.sha256
+        self._pending_hashes = ds._pending_hashes
+
+    def _verify_hashes(self):
+        # Hidden function to check a dataset pulled with a lazy or background
+        # hash policy against the hashes stored in the database. Runs at most
+        # once, before the first operation that may change the dataset.
+
+        # nothing to verify
+        if self._pending_hashes is None:
+            return
+
+        # collect current hashes
+        pending = self._pending_hashes
+        self._pending_hashes = None
+        if isinstance(pending, Future):
+            hashes = pending.result()
+        else:
+            hashes = pending()
+
+        # enforce no change since pull
+        stored = (self.md5, self.sha256)
+        if tuple(hashes) != stored:
+            raise ValueError(UNKNOWN_DATASET_HASH.format(o=stored, c=hashes))
 
     @property
     def graph(self):
@@ -2214,7 +3339,7 @@ class Dataset(object):
         checks.check_types(annotation, str)
 
         # add new annotation
-        self._annotations.append(
+        self.annotations.append(
             {"Value": annotation,
              "UserId": self.info.origin.user_info["UserId"],
              "Created": datetime.utcnow()})
@@ -2227,7 +3352,7 @@ class Dataset(object):
         """
         Update the annotations in the database with the ones stored on the
         dataset. Useful when collaborating and you believe your dataset is out
-        of sync.
+        of sync. All new annotations are written in a single transaction.
 
         No object is returned, the current object is updated to reflect the
         changes made (if any).
@@ -2249,16 +3374,14 @@ class Dataset(object):
 
         """
 
-        # upload annotations missing ids
-        for annotation in self.annotations:
-            if "AnnotationId" not in annotation:
-                anno_info = self.info.origin._insert_to_table(
-                    "Annotation", annotation)
-                self.info.origin._insert_to_table("AnnotationDataset", {
-                    "AnnotationId": anno_info["AnnotationId"],
-                    "DatasetId": self.info.id,
-                    "Created": datetime.utcnow()
-                })
+        # annotations that were never loaded have nothing new to upload
+        if self._annotations is None:
+            return
+
+        # upload annotations missing ids in a single transaction
+        missing = [a for a in self._annotations if "AnnotationId" not in a]
+        if len(missing) > 0:
+            tools.insert_annotations(self.info.origin.db, self.info.id, missing)
 
     def save(self, path: Union[str, pathlib.Path]) -> pathlib.Path:
         """
@@ -2347,10 +3470,11 @@ def _read_dataset(path: pathlib.Path) -> Dataset:
     database = DatasetDatabase(saved["config"], user=saved["user"])
     ds_info = database.get_items_from_table(
         "Dataset", ["DatasetId", "=", saved["id"]])[0]
-    ds_info["OriginDb"] = database
-    ds_info = DatasetInfo(**ds_info)
+    ds_info = DatasetInfo._from_row(ds_info, database)
 
-    return Dataset(dataset=saved["obj"], ds_info=ds_info)
+    # the saved object did not come from the database, hash it
+    return Dataset(dataset=saved["obj"], ds_info=ds_info,
+                   hash_policy="rehash")
 
 
 EXTENSION_MAP = {".csv": _read_csv,
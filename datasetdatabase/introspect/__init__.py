@@ -8,7 +8,9 @@ from .introspector import Introspector
 from .dictionary import DictionaryIntrospector
 from .dictionary import reconstruct as reconstruct_dictionary
 from .dataframe import DataFrameIntrospector
+from .dataframe import ChunkedDataFrameIntrospector, DataFrameChunks
 from .dataframe import reconstruct as reconstruct_dataframe
+from .dataframe import iter_reconstruct as iter_reconstruct_dataframe
 from .object import ObjectIntrospector
 from .object import reconstruct as reconstruct_object
 
@@ -24,6 +26,7 @@ INTROSPECTOR_MAP = {
     OBJECT_MODULE: ObjectIntrospector,
     pd.DataFrame: DataFrameIntrospector,
     DATAFRAME_MODULE: DataFrameIntrospector,
+    DataFrameChunks: ChunkedDataFrameIntrospector,
     dict: DictionaryIntrospector,
     DICTIONARY_MODULE: DictionaryIntrospector
 }
@@ -33,3 +36,7 @@ RECONSTRUCTOR_MAP = {
     DATAFRAME_MODULE: reconstruct_dataframe,
     DICTIONARY_MODULE: reconstruct_dictionary
 }
+
+ITER_RECONSTRUCTOR_MAP = {
+    DATAFRAME_MODULE: iter_reconstruct_dataframe
+}
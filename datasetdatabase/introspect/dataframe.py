@@ -2,21 +2,53 @@
 
 # installed
 from multiprocessing.dummy import Pool
-from typing import Dict, List, Union
+from collections import deque
+from typing import Callable, Dict, Iterator, List, Union
 from datetime import datetime
 from functools import partial
+import pathlib
+import copy
 import _pickle as pickle
 import pandas as pd
+import numpy as np
+import multiprocessing
 import hashlib
 import orator
+import threading
+import queue
 import types
-import os
 
 # self
 from ..schema.filemanagers import FMSInterface
 from ..utils import checks, tools, ProgressBar
+from ..utils.cache import IotaCache, is_immutable
+from ..utils.connections import ConnectionPool
 from .introspector import Introspector
 
+# globals
+DEFAULT_BLOCK_SIZE = 500
+DEFAULT_CHUNKSIZE = 10000
+
+# values are streamed unless at least this fraction of a dataset is cached
+IOTA_CACHE_MIN_COVERAGE = 0.5
+
+# how many prepared blocks may wait on each worker process and writer thread
+PIPELINE_BLOCKS_PER_PROCESS = 2
+PIPELINE_BLOCKS_PER_WRITER = 2
+
+# version 1 pickles every cell, version 2 hashes column buffers
+HASH_VERSION = 2
+HASH_BATCH_SIZE = 10000
+BUFFER_HASHED_KINDS = "biufcmM"
+UNKNOWN_HASH_VERSION = "Unknown dataframe hash version: {v}"
+
+# version 3 chains the version 2 hashes of fixed size row segments so that a
+# file can be hashed one segment at a time
+CHUNKED_HASH_VERSION = 3
+HASH_SEGMENT_ROWS = 10000
+DEFAULT_FILE_CHUNKSIZE = 100000
+INVALID_CHUNKSIZE = "Chunksize must be a positive number of rows."
+
 
 class DataFrameIntrospector(Introspector):
     """
@@ -45,6 +77,8 @@ class DataFrameIntrospector(Introspector):
 
     """
 
+    hash_version = HASH_VERSION
+
     def __init__(self, obj: pd.DataFrame):
         # enforce types
         checks.check_types(obj, pd.DataFrame)
@@ -72,11 +106,8 @@ class DataFrameIntrospector(Introspector):
 
     def get_object_hash(self, alg: types.BuiltinMethodType = hashlib.md5):
         """
-        Get a unique and reproducible hash from the dataframe. DataFrame
-        hashing can be a bit tricky so this function is rather memory intensive
-        because it copies the bytes of every key-value pair in the dataframe
-        but this is in my opinion the best way to ensure a reproducible hash of
-        a dataset.
+        Get a unique and reproducible hash from the dataframe. This is a
+        wrapper around get_object_hashes for a single hashing algorithm.
 
         #### Example
         ```
@@ -100,19 +131,80 @@ class DataFrameIntrospector(Introspector):
 
 
         #### Errors
+        ##### ValueError
+        The introspector hash_version is not a known hashing scheme.
+
+        """
+
+        return self.get_object_hashes([alg])[0]
+
+    def get_object_hashes(
+        self,
+        algs: List[types.BuiltinMethodType] = tools.DEFAULT_HASH_ALGS
+    ) -> List[str]:
+        """
+        Get unique and reproducible hashes from the dataframe for several
+        hashing algorithms at once. The dataframe is only serialized a single
+        time and every algorithm is fed from that one stream.
+
+        The hashes are computed with the scheme stored in the introspector's
+        hash_version attribute. Version 2 (the default) hashes a column at a
+        time: numeric columns are hashed directly from their underlying
+        buffers and all other columns are hashed from batches of pickled
+        values. Version 1 pickles every key-value pair in the dataframe and is
+        kept so that datasets hashed before version 2 stay comparable. Version
+        3 chains the version 2 hashes of every HASH_SEGMENT_ROWS rows, in
+        order, and is used by datasets streamed from files.
+
+        #### Example
+        ```
+        >>> df_introspector.get_object_hashes()
+        ["asdf123asd3fhas2423dfhjkasd8f92178hb5sdf",
+         "8hkasdr823hklasdf7832balkjsdf73lkasdjhf73blkakljs892hksdf9"]
+
+        ```
+
+
+        #### Parameters
+        ##### algs: List[types.BuiltinMethodType] = DEFAULT_HASH_ALGS
+        The hashing algorithms provided by hashlib, md5 and sha256 by default.
+
+
+        #### Returns
+        ##### hashes: List[str]
+        The hexdigest of the object hash for each algorithm, in order.
+
+
+        #### Errors
+        ##### ValueError
+        The introspector hash_version is not a known hashing scheme.
 
         """
 
-        # create array
-        barray = []
+        # current scheme
+        if self.hash_version == 2:
+            return _get_column_hashes(self.obj, algs=algs)
+
+        # segmented scheme
+        if self.hash_version == CHUNKED_HASH_VERSION:
+            segments = (self.obj.iloc[i: i + HASH_SEGMENT_ROWS]
+                        for i in range(0, len(self.obj), HASH_SEGMENT_ROWS))
+            return _get_segment_hashes(segments, algs=algs)
+
+        # legacy scheme
+        if self.hash_version == 1:
+            # create array
+            barray = []
+
+            # fill array with byte values of every key-value pair
+            for i, row in self.obj.iterrows():
+                for key, val in row.items():
+                    barray.append(pickle.dumps({key: val}))
 
-        # fill array with byte values of every key-value pair
-        for i, row in self.obj.iterrows():
-            for key, val in row.items():
-                barray.append(pickle.dumps({key: val}))
+            # return hexdigests of array
+            return tools.get_object_hashes(barray, algs=algs)
 
-        # return hexdigest of array
-        return tools.get_object_hash(barray, alg=alg)
+        raise ValueError(UNKNOWN_HASH_VERSION.format(v=self.hash_version))
 
     def _format_dataset(self, type_map=None):
         # enforce types
@@ -284,36 +376,103 @@ class DataFrameIntrospector(Introspector):
         if filepath_columns is not None:
             self.enforce_files_exist_from_columns(filepath_columns)
 
-    def deconstruct(self, db: orator.DatabaseManager, ds_info: "DatasetInfo", fms: FMSInterface):
+    def deconstruct(
+        self,
+        db: orator.DatabaseManager,
+        ds_info: "DatasetInfo",
+        fms: FMSInterface,
+        block_size: Union[int, None] = DEFAULT_BLOCK_SIZE,
+        start: int = 0,
+        checkpoint: Union[Callable[..., None], None] = None,
+        connections: Union[ConnectionPool, None] = None,
+        processes: Union[int, None] = None
+    ):
+        """
+        Teardown the dataframe into Iota, Group, GroupDataset, and IotaGroup
+        rows and insert them to the database.
+
+        By default rows are written in blocks, every Iota, Group, GroupDataset,
+        and IotaGroup row for a block of dataframe rows is gathered and written
+        with multi-row inserts so that ingest cost scales with the number of
+        blocks instead of the number of cells. Each block is committed in its
+        own transaction so a failure never leaves a partially written block.
+        When a connection pool is passed, blocks are written from one thread
+        per pooled connection.
+
+        When processes are passed, ingest is pipelined. Worker processes pickle
+        and hash the Iota of each block while the writer threads insert the
+        blocks that are ready, so building rows and writing them overlap. Only
+        the Group MD5s, which hash the database assigned IotaIds, are left to
+        the writers.
+
+
+        #### Parameters
+        ##### db: orator.DatabaseManager
+        The database to insert the rows to.
+
+        ##### ds_info: DatasetInfo
+        The dataset info block for the dataset being deconstructed.
+
+        ##### fms: FMSInterface
+        The file management system attached to the database.
+
+        ##### block_size: int, None = DEFAULT_BLOCK_SIZE
+        How many dataframe rows to write and commit per block. If None
+        provided, every row is written one cell at a time and committed on
+        its own.
+
+        ##### start: int = 0
+        The row label to start from. Rows before it were committed by an
+        earlier ingest of the same dataset and are skipped.
+
+        ##### checkpoint: Callable[..., None], None = None
+        Called with the last row label of the committed blocks and the
+        connection they were committed on. Blocks written one at a time are
+        checkpointed inside their own transaction. Blocks written from many
+        threads are checkpointed after they commit, and only up to the first
+        block still being written. Rewriting a block is safe because every
+        insert is a get or create.
+
+        ##### connections: ConnectionPool, None = None
+        A pool of connections to write blocks from concurrently. If None
+        provided, blocks are written one at a time on the passed db.
+
+        ##### processes: int, None = None
+        How many worker processes to prepare blocks in. If None provided, or
+        rows are written one at a time, blocks are prepared by the writers.
+
+
+        #### Returns
+
+
+        #### Errors
+
+        """
+
+        # enforce types
+        checks.check_types(block_size, [int, type(None)])
+        checks.check_types(start, int)
+        checks.check_types(processes, [int, type(None)])
+
         # create bar
-        bar = ProgressBar(len(self.obj))
+        bar = ProgressBar(len(self.obj) - start)
 
         # begin teardown
         print("Tearing down object...")
 
-        # create func
-        func = partial(_deconstruct_Group,
-                       database=db,
-                       ds_info=ds_info,
-                       progress_bar=bar)
-
-        # get safe thread count
-        if "DSDB_PROCESS_LIMIT" in os.environ:
-            n_threads = int(os.environ["DSDB_PROCESS_LIMIT"])
-        else:
-            n_threads = os.cpu_count()
-
         # insert row labels
         indices = pd.Series(range(len(self.obj)))
         rows = self.obj.assign(__DSDB_GROUP_LABEL__=indices)
 
-        # pre build rows
-        rows = rows.to_dict("records")
+        # pre build rows, skipping committed rows
+        rows = rows.iloc[start:].to_dict("records")
 
-        # create pool
-        with Pool(n_threads) as pool:
-            # map pool
-            pool.map(func, rows)
+        # write rows
+        _deconstruct_rows(db, ds_info, rows, bar,
+                          block_size=block_size,
+                          checkpoint=checkpoint,
+                          connections=connections,
+                          processes=processes)
 
     def package(self):
         package = {}
@@ -322,6 +481,395 @@ class DataFrameIntrospector(Introspector):
         return package
 
 
+class DataFrameChunks(object):
+    """
+    Re-readable handle to a csv file that is read a chunk of rows at a time.
+
+    Iterating the handle reads the file from the start and yields dataframes
+    of about chunksize rows, so only a single chunk is ever held in memory.
+    Chunks are built from whole hash segments of HASH_SEGMENT_ROWS rows, the
+    chunksize is rounded up to the next whole segment. Like
+    DataFrameIntrospector, every chunk has its columns sorted and a fresh
+    index.
+
+
+    #### Example
+    ```
+    >>> chunks = DataFrameChunks("/path/to/manifest.csv", chunksize=50000)
+    >>> for chunk in chunks:
+    >>>     print(len(chunk))
+    50000
+    50000
+    ...
+
+    ```
+
+
+    #### Parameters
+    ##### path: str, pathlib.Path
+    The csv file to read.
+
+    ##### chunksize: int = DEFAULT_FILE_CHUNKSIZE
+    About how many rows to read at a time.
+
+    ##### **kwargs
+    Any other keyword arguments are passed to pandas.read_csv.
+
+
+    #### Returns
+    ##### self
+
+
+    #### Errors
+    ##### AssertionError
+    The chunksize is not a positive number of rows.
+
+    """
+
+    def __init__(self,
+                 path: Union[str, pathlib.Path],
+                 chunksize: int = DEFAULT_FILE_CHUNKSIZE,
+                 **kwargs):
+        # enforce types
+        checks.check_types(path, [str, pathlib.Path])
+        checks.check_types(chunksize, int)
+
+        # enforce size
+        assert chunksize > 0, INVALID_CHUNKSIZE
+
+        self.path = pathlib.Path(path).expanduser().resolve()
+        self.chunksize = chunksize
+        self.read_kwargs = kwargs
+        self._n_rows = None
+
+    @property
+    def n_rows(self) -> int:
+        # counted by the first full read of the file
+        if self._n_rows is None:
+            for segment in self.iter_segments():
+                pass
+
+        return self._n_rows
+
+    def iter_segments(self) -> Iterator[pd.DataFrame]:
+        """
+        Read the file one hash segment of HASH_SEGMENT_ROWS rows at a time.
+        """
+        # readers are only context managers from pandas 1.2
+        n_rows = 0
+        reader = pd.read_csv(self.path,
+                             chunksize=HASH_SEGMENT_ROWS,
+                             **self.read_kwargs)
+        try:
+            for segment in reader:
+                n_rows += len(segment)
+                yield DataFrameIntrospector(segment).obj
+        finally:
+            reader.close()
+
+        self._n_rows = n_rows
+
+    def __iter__(self) -> Iterator[pd.DataFrame]:
+        segments = []
+        n_rows = 0
+        for segment in self.iter_segments():
+            segments.append(segment)
+            n_rows += len(segment)
+
+            # emit full chunk
+            if n_rows >= self.chunksize:
+                yield pd.concat(segments, ignore_index=True)
+                segments = []
+                n_rows = 0
+
+        # emit last partial chunk
+        if len(segments) > 0:
+            yield pd.concat(segments, ignore_index=True)
+
+    def __str__(self):
+        return "<DataFrameChunks [{}, {} rows per chunk]>".format(self.path, self.chunksize)
+
+    def __repr__(self):
+        return str(self)
+
+
+class ChunkedDataFrameIntrospector(DataFrameIntrospector):
+    """
+    Introspector for dataframes too large to hold in memory. Hash and
+    deconstruct a DataFrameChunks handle one chunk at a time.
+
+    Datasets are hashed with hash version 3, which reads the file a single
+    segment at a time and does not depend on the chunksize, and are
+    deconstructed with row labels that continue across chunks. Once stored
+    they are regular dataframe datasets and are reconstructed by the
+    DataFrameIntrospector.
+
+
+    #### Example
+    ```
+    >>> ChunkedDataFrameIntrospector(DataFrameChunks("/path/to/manifest.csv"))
+    <class datasetdatabase.introspect.dataframe.ChunkedDataFrameIntrospector>
+
+    ```
+
+
+    #### Parameters
+    ##### obj: DataFrameChunks
+    The chunked file you want to store in a dataset database.
+
+
+    #### Returns
+    ##### self
+
+
+    #### Errors
+
+    """
+
+    hash_version = CHUNKED_HASH_VERSION
+
+    def __init__(self, obj: DataFrameChunks):
+        # enforce types
+        checks.check_types(obj, DataFrameChunks)
+
+        # store obj, chunks are never validated as a whole
+        self._obj = obj
+        self._validated = {"types": {}, "values": {}, "files": False}
+        self.filepath_columns = None
+
+    def get_object_hashes(
+        self,
+        algs: List[types.BuiltinMethodType] = tools.DEFAULT_HASH_ALGS
+    ) -> List[str]:
+        """
+        Get unique and reproducible hashes from the file for several hashing
+        algorithms at once. The file is read a single segment at a time and
+        the hashes match the hash version 3 hashes of the whole dataframe.
+
+
+        #### Parameters
+        ##### algs: List[types.BuiltinMethodType] = DEFAULT_HASH_ALGS
+        The hashing algorithms provided by hashlib, md5 and sha256 by default.
+
+
+        #### Returns
+        ##### hashes: List[str]
+        The hexdigest of the object hash for each algorithm, in order.
+
+
+        #### Errors
+        ##### ValueError
+        The introspector hash_version is not a known hashing scheme.
+
+        """
+
+        if self.hash_version != CHUNKED_HASH_VERSION:
+            raise ValueError(UNKNOWN_HASH_VERSION.format(v=self.hash_version))
+
+        return _get_segment_hashes(self.obj.iter_segments(), algs=algs)
+
+    def validate(self, **kwargs):
+        # chunks are read one at a time so there is nothing to validate yet
+        return
+
+    def deconstruct(
+        self,
+        db: orator.DatabaseManager,
+        ds_info: "DatasetInfo",
+        fms: FMSInterface,
+        block_size: Union[int, None] = DEFAULT_BLOCK_SIZE,
+        start: int = 0,
+        checkpoint: Union[Callable[..., None], None] = None,
+        connections: Union[ConnectionPool, None] = None,
+        processes: Union[int, None] = None
+    ):
+        """
+        Teardown the file a chunk at a time into Iota, Group, GroupDataset,
+        and IotaGroup rows and insert them to the database. Every chunk is
+        written exactly like a DataFrameIntrospector deconstruct with row
+        labels continued from the previous chunk, see
+        DataFrameIntrospector.deconstruct for the parameters. Chunks entirely
+        before start are read but not written.
+        """
+
+        # enforce types
+        checks.check_types(block_size, [int, type(None)])
+        checks.check_types(start, int)
+        checks.check_types(processes, [int, type(None)])
+
+        # create bar
+        bar = ProgressBar(max(self.obj.n_rows - start, 0))
+
+        # begin teardown
+        print("Tearing down object...")
+
+        offset = 0
+        for chunk in self.obj:
+            end = offset + len(chunk)
+
+            # skip committed chunks
+            if end > start:
+                # insert row labels continued from the previous chunk
+                rows = chunk.assign(__DSDB_GROUP_LABEL__=np.arange(offset, end))
+
+                # pre build rows, skipping committed rows
+                rows = rows.iloc[max(start - offset, 0):].to_dict("records")
+
+                # write rows
+                _deconstruct_rows(db, ds_info, rows, bar,
+                                  block_size=block_size,
+                                  checkpoint=checkpoint,
+                                  connections=connections,
+                                  processes=processes)
+
+            offset = end
+
+
+def _update_column_hash(hasher, column: pd.Series):
+    # numeric columns are hashed straight from their buffer, the buffer of
+    # int64 zeros is the same as float64 zeros and a tz aware buffer is the
+    # same as a naive one so the dtype, with its timezone, is hashed first
+    values = column.values
+    if isinstance(values, np.ndarray) and \
+            values.dtype.kind in BUFFER_HASHED_KINDS:
+        hasher.update(str(column.dtype).encode())
+        hasher.update(np.ascontiguousarray(values).view(np.uint8))
+        return
+
+    # categories are part of a categorical even when no value uses them
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        hasher.update(pickle.dumps((list(column.dtype.categories),
+                                    column.dtype.ordered)))
+
+    # all other columns are hashed from batches of pickled values
+    for i in range(0, len(values), HASH_BATCH_SIZE):
+        batch = values[i: i + HASH_BATCH_SIZE]
+        hasher.update(b"".join(pickle.dumps(v) for v in batch))
+
+
+def _get_column_hashes(obj: pd.DataFrame,
+    algs: List[types.BuiltinMethodType] = tools.DEFAULT_HASH_ALGS) -> List[str]:
+    # each column is hashed on its own and the column name and digest pairs
+    # are hashed together in column order
+    hasher = tools.MultiHash(algs)
+    for key in obj.columns:
+        column_hasher = tools.MultiHash(algs)
+        _update_column_hash(column_hasher, obj[key])
+        hasher.update(pickle.dumps(key))
+        for alg_hasher, digest in zip(hasher.hashers,
+                                      column_hasher.digests()):
+            alg_hasher.update(digest)
+
+    return hasher.hexdigests()
+
+
+def _get_segment_hashes(segments: Iterator[pd.DataFrame],
+    algs: List[types.BuiltinMethodType] = tools.DEFAULT_HASH_ALGS) -> List[str]:
+    # the column hashes of each segment are hashed together in row order
+    hasher = tools.MultiHash(algs)
+    for segment in segments:
+        for alg_hasher, digest in zip(hasher.hashers,
+                                      _get_column_hashes(segment, algs)):
+            alg_hasher.update(digest.encode())
+
+    return hasher.hexdigests()
+
+
+def _deconstruct_rows(db, ds_info, rows, bar,
+                      block_size=DEFAULT_BLOCK_SIZE,
+                      checkpoint=None,
+                      connections=None,
+                      processes=None):
+    # write pre built and labeled rows, see DataFrameIntrospector.deconstruct
+    # for the parameters
+    # create func and tasks
+    if block_size is None:
+        func = partial(_deconstruct_Group,
+                       ds_info=ds_info,
+                       progress_bar=bar)
+        tasks = rows
+        labels = [int(row["__DSDB_GROUP_LABEL__"]) for row in rows]
+    else:
+        func = partial(_deconstruct_Block,
+                       ds_info=ds_info,
+                       progress_bar=bar)
+        tasks = [rows[i: i + block_size]
+                 for i in range(0, len(rows), block_size)]
+        labels = [int(task[-1]["__DSDB_GROUP_LABEL__"]) for task in tasks]
+
+    # blocks that share the connection are committed one at a time
+    serial = connections is None or connections.size == 1
+    pipelined = block_size is not None and processes is not None and \
+        processes > 1
+    if serial and not pipelined:
+        for task, label in zip(tasks, labels):
+            with db.transaction():
+                func(task, database=db)
+                if checkpoint is not None:
+                    checkpoint(label, db)
+
+        return
+
+    # otherwise every thread writes blocks on its own connection
+    written = set()
+    frontier = [0]
+    lock = threading.Lock()
+
+    def write(i, block=None, func=func):
+        if block is None:
+            block = tasks[i]
+
+        # a single writer receives blocks in order
+        if serial:
+            with db.transaction():
+                func(block, database=db)
+                if checkpoint is not None:
+                    checkpoint(labels[i], db)
+
+            return
+
+        with connections.transaction() as worker_db:
+            func(block, database=worker_db)
+
+        # advance past every block committed in order
+        with lock:
+            written.add(i)
+            previous = frontier[0]
+            while frontier[0] in written:
+                frontier[0] += 1
+
+            if checkpoint is not None and frontier[0] > previous:
+                with connections.connection() as worker_db:
+                    checkpoint(labels[frontier[0] - 1], worker_db)
+
+    # prepare blocks in worker processes and write them as they finish
+    if pipelined:
+        _pipeline_Blocks(
+            tasks=tasks,
+            processes=processes,
+            writers=1 if serial else connections.size,
+            write=partial(write,
+                          func=partial(_write_Block,
+                                       ds_info=ds_info,
+                                       progress_bar=bar)))
+        return
+
+    # blocks are pickled and hashed before their transaction is taken, so
+    # only the inserts wait on the sqlite write lock
+    def prepare_and_write(i):
+        if block_size is None:
+            return write(i)
+
+        write(i,
+              block=_prepare_Block(tasks[i], datetime.utcnow()),
+              func=partial(_write_Block, ds_info=ds_info, progress_bar=bar))
+
+    # create pool
+    with Pool(connections.size) as pool:
+        # map pool
+        pool.map(prepare_and_write, range(len(tasks)))
+
+
 def _deconstruct_Group(row, database, ds_info, progress_bar):
     # all iota are created at the same time
     created = datetime.utcnow()
@@ -377,36 +925,341 @@ def _deconstruct_Group(row, database, ds_info, progress_bar):
     progress_bar.increment()
 
 
+def _deconstruct_Block(rows, database, ds_info, progress_bar):
+    # all iota are created at the same time
+    block = _prepare_Block(rows, datetime.utcnow())
+    _write_Block(block, database, ds_info, progress_bar)
+
+
+def _prepare_Block(rows, created):
+    # the cpu bound half of a block, pickles and hashes every iota and needs
+    # no database so it can run in a worker process
+    labels = [str(row["__DSDB_GROUP_LABEL__"]) for row in rows]
+
+    # generate iota for every row
+    iota = [[tools._add_value_hash("Iota", {"Key": k,
+                                           "Value": pickle.dumps(v),
+                                           "Created": created})
+             for k, v in row.items() if k != "__DSDB_GROUP_LABEL__"]
+            for row in rows]
+
+    return created, labels, iota
+
+
+def _pipeline_Blocks(tasks, processes, writers, write):
+    # worker processes prepare blocks in order while writer threads commit
+    # them, the queue between them is bounded so that prepared blocks never
+    # pile up faster than they are written
+    ready = queue.Queue(maxsize=writers * PIPELINE_BLOCKS_PER_WRITER)
+    errors = []
+
+    def consume():
+        while True:
+            item = ready.get()
+            if item is None:
+                return
+
+            # after a failure blocks are dropped so the producer never stalls
+            if len(errors) > 0:
+                continue
+
+            try:
+                write(*item)
+            except Exception as e:
+                errors.append(e)
+
+    # workers are forked before any writer thread exists, forking while a
+    # thread holds a lock can deadlock the child
+    with multiprocessing.Pool(processes) as pool:
+        # start writers
+        threads = [threading.Thread(target=consume) for i in range(writers)]
+        for thread in threads:
+            thread.start()
+
+        try:
+            # keep a bounded number of blocks in flight, in order, each worker
+            # only receives the rows of the block it prepares
+            pending = deque()
+            for i, rows in enumerate(tasks):
+                if len(errors) > 0:
+                    break
+
+                pending.append((i, pool.apply_async(
+                    _prepare_Block, (rows, datetime.utcnow()))))
+                if len(pending) >= processes * PIPELINE_BLOCKS_PER_PROCESS:
+                    i, result = pending.popleft()
+                    ready.put((i, result.get()))
+
+            # hand over the rest
+            while len(pending) > 0 and len(errors) == 0:
+                i, result = pending.popleft()
+                ready.put((i, result.get()))
+        finally:
+            # stop writers
+            for thread in threads:
+                ready.put(None)
+            for thread in threads:
+                thread.join()
+
+    # raise the first write failure
+    if len(errors) > 0:
+        raise errors[0]
+
+
+def _write_Block(block, database, ds_info, progress_bar):
+    # the database half of a block
+    created, labels, iota = block
+
+    # insert all iota in the block at once
+    found_iota = tools.insert_many_to_db_table(
+        database, "Iota", [i for row in iota for i in row])
+
+    # regroup iota ids by row
+    iota_ids = []
+    start = 0
+    for row in iota:
+        end = start + len(row)
+        iota_ids.append([i["IotaId"] for i in found_iota[start:end]])
+        start = end
+
+    # create groups
+    groups = [{"MD5": tools.get_object_hash(to_hash),
+               "Created": created} for to_hash in iota_ids]
+
+    # insert groups
+    groups = tools.insert_many_to_db_table(database, "Group", groups)
+
+    # create group_datasets
+    group_datasets = [{"GroupId": group["GroupId"],
+                       "DatasetId": ds_info.id,
+                       "Label": label,
+                       "Created": created}
+                      for group, label in zip(groups, labels)]
+
+    # insert group_datasets
+    tools.insert_many_to_db_table(database, "GroupDataset", group_datasets)
+
+    # create iota_group joins
+    iota_groups = [{"IotaId": iota_id,
+                    "GroupId": group["GroupId"],
+                    "Created": created}
+                   for group, ids in zip(groups, iota_ids)
+                   for iota_id in ids]
+
+    # insert iota_group joins
+    tools.insert_many_to_db_table(database, "IotaGroup", iota_groups)
+
+    # update progress
+    progress_bar.increment(len(labels))
+
+
 def reconstruct(
     db: orator.DatabaseManager,
     ds_info: "DatasetInfo",
-    fms: FMSInterface
+    fms: FMSInterface,
+    columns: Union[List[str], None] = None,
+    rows: Union[range, List[int], None] = None
 ) -> pd.DataFrame:
 
-    # get all iota that match
-    data = [
-        dict(r) for r in db.table("Iota")
-        .join("IotaGroup", "IotaGroup.IotaId", "=", "Iota.IotaId")
-        .join("GroupDataset", "GroupDataset.GroupId", "=", "IotaGroup.GroupId")
-        .join("Dataset", "GroupDataset.DatasetId", "=", "Dataset.DatasetId")
-        .where("Dataset.DatasetId", "=", ds_info.id)
-        .get()
-    ]
-
-    # create dictionary of iota with key being their group label
-    groups = {}
-    for iota in data:
+    # we know that dataframe labels are actually just their index value
+    # so a label range maps straight to positions, a label list needs a lookup
+    start, step, lookup = 0, 1, None
+    if isinstance(rows, range):
+        start, step = rows.start, rows.step
+    elif rows is not None:
+        rows = list(dict.fromkeys(rows))
+        lookup = {label: i for i, label in enumerate(rows)}
+        found = [False] * len(rows)
+
+    # values are streamed with their iota, unless a sample of this dataset
+    # shows most of it cached, then only missing values are fetched after
+    iota_cache = ds_info.origin.iota_cache
+    with_values = True
+    if iota_cache is not None and len(iota_cache) > 0:
+        sample = tools.sample_dataset_iota_ids(db, ds_info.id)
+        with_values = iota_cache.coverage(sample) < IOTA_CACHE_MIN_COVERAGE
+    processes = ds_info.origin.unpickle_processes
+    parallel = processes is not None and processes > 1
+
+    # each iota id is written straight into its column at its position
+    values = {}
+    streamed = {}
+    pending = {}
+    pending_bytes = 0
+    n_rows = 0
+    for iota in tools.iter_dataset_iota(db, ds_info.id, keys=columns, labels=rows, with_values=with_values):
         label = int(iota["Label"])
-        if label not in groups:
-            groups[label] = {}
+        if lookup is None:
+            i = (label - start) // step
+        else:
+            i = lookup[label]
+            found[i] = True
 
-        groups[label][iota["Key"]] = pickle.loads(iota["Value"])
+        column = values.setdefault(iota["Key"], [])
+        if i >= len(column):
+            column.extend([None] * (i + 1 - len(column)))
 
-    # we know that dataframe labels are actually just their index value
-    # so we can append these rows in order by simply looping through a range of their length and getting each one
-    rows = []
-    for i in range(len(groups)):
-        rows.append(groups[i])
+        column[i] = iota["IotaId"]
+        n_rows = max(n_rows, i + 1)
+
+        # unpickle each distinct streamed value once, as it arrives when
+        # serial, otherwise in bounded chunks on the pool
+        iota_id = iota["IotaId"]
+        if not with_values or iota_id in streamed or iota_id in pending:
+            continue
+
+        if not parallel:
+            streamed[iota_id] = pickle.loads(iota["Value"])
+            continue
+
+        pending[iota_id] = iota["Value"]
+        pending_bytes += len(iota["Value"])
+        if pending_bytes >= tools.PARALLEL_UNPICKLE_CHUNK_BYTES:
+            _unpickle_pending(streamed, pending, processes)
+            pending_bytes = 0
+
+    _unpickle_pending(streamed, pending, processes)
 
-    # return frame
-    return pd.DataFrame(rows)
+    # each distinct value is fetched and unpickled once then swapped in
+    _resolve_iota_values(db, values, iota_cache, streamed, processes)
+
+    # index by the original labels
+    if lookup is None:
+        index = pd.RangeIndex(start, start + n_rows * step, step)
+    else:
+        index = pd.Index(rows[:n_rows])
+
+    # drop requested labels that are not in the dataset
+    frame = _build_frame(values, columns, index)
+    if lookup is not None:
+        frame = frame[found[:n_rows]]
+
+    return frame
+
+
+def iter_reconstruct(
+    db: orator.DatabaseManager,
+    ds_info: "DatasetInfo",
+    fms: FMSInterface,
+    chunksize: int = DEFAULT_CHUNKSIZE,
+    columns: Union[List[str], None] = None
+) -> Iterator[pd.DataFrame]:
+
+    processes = ds_info.origin.unpickle_processes
+    parallel = processes is not None and processes > 1
+
+    # iota arrive ordered by label so a chunk is complete once the next starts
+    values = {}
+    labels = []
+    for iota in tools.iter_dataset_iota(db, ds_info.id, keys=columns, ordered=True):
+        label = int(iota["Label"])
+        if len(labels) == 0 or labels[-1] != label:
+            # emit full chunk
+            if len(labels) == chunksize:
+                if parallel:
+                    _unpickle_chunk(values, processes)
+                yield _build_frame(values, columns, pd.Index(labels))
+                values = {}
+                labels = []
+
+            labels.append(label)
+
+        # write value at its position in the chunk, blobs are left for the
+        # pool when unpickling in parallel
+        i = len(labels) - 1
+        column = values.setdefault(iota["Key"], [])
+        if i >= len(column):
+            column.extend([np.nan] * (i + 1 - len(column)))
+
+        if parallel:
+            column[i] = iota["Value"]
+        else:
+            column[i] = pickle.loads(iota["Value"])
+
+    # emit last partial chunk
+    if len(labels) > 0:
+        if parallel:
+            _unpickle_chunk(values, processes)
+        yield _build_frame(values, columns, pd.Index(labels))
+
+
+def _unpickle_pending(
+    streamed: Dict[int, object],
+    pending: Dict[int, bytes],
+    processes: Union[int, None]
+):
+    # unpickle a chunk of held blobs together and release them
+    values = tools.unpickle_many(list(pending.values()), processes)
+    streamed.update(zip(pending, values))
+    pending.clear()
+
+
+def _unpickle_chunk(values: Dict[str, list], processes: Union[int, None]):
+    # unpickle every blob of a chunk at once and write the values back to
+    # their positions, missing cells stay nan
+    positions = [(column, i)
+                 for column in values.values()
+                 for i, blob in enumerate(column)
+                 if isinstance(blob, (bytes, memoryview))]
+    blobs = [column[i] for column, i in positions]
+    for (column, i), value in zip(positions, tools.unpickle_many(blobs, processes)):
+        column[i] = value
+
+
+def _resolve_iota_values(
+    db: orator.DatabaseManager,
+    values: Dict[str, list],
+    iota_cache: Union[IotaCache, None],
+    streamed: Dict[int, object],
+    processes: Union[int, None] = None
+):
+    # collect distinct ids that were not streamed with their values
+    iota_ids = set()
+    for column in values.values():
+        iota_ids.update(column)
+    iota_ids.discard(None)
+    iota_ids.difference_update(streamed)
+
+    # resolve and share values
+    resolved = tools.get_iota_values(db, iota_ids, iota_cache, processes)
+    if iota_cache is not None:
+        iota_cache.put_many(streamed)
+    resolved.update(streamed)
+
+    # swap ids for values in place, repeated mutable values are copied so
+    # that cells never share an object
+    used = set()
+    for column in values.values():
+        for i, iota_id in enumerate(column):
+            if iota_id is None:
+                column[i] = np.nan
+                continue
+
+            value = resolved[iota_id]
+            if iota_id in used and not is_immutable(value):
+                value = copy.deepcopy(value)
+
+            used.add(iota_id)
+            column[i] = value
+
+
+def _build_frame(
+    values: Dict[str, list],
+    columns: Union[List[str], None],
+    index: pd.Index
+) -> pd.DataFrame:
+    # selected columns keep the requested order, otherwise they are sorted
+    # like the introspector does
+    if columns is None:
+        keys = sorted(values)
+    else:
+        keys = [key for key in columns if key in values]
+
+    # convert a column at a time so only one list copy is alive
+    series = {}
+    for key in keys:
+        column = values.pop(key)
+        column.extend([np.nan] * (len(index) - len(column)))
+        series[key] = pd.Series(column, index=index)
+
+    return pd.DataFrame(series, index=index)
@@ -37,13 +37,16 @@ class DictionaryIntrospector(Introspector):
         return self._validated
 
     def get_object_hash(self, alg=hashlib.md5):
+        return self.get_object_hashes([alg])[0]
+
+    def get_object_hashes(self, algs=tools.DEFAULT_HASH_ALGS):
         barray = []
 
         for key, value in self.obj.items():
             pair = {key: value}
             barray.append(pickle.dumps(pair))
 
-        return tools.get_object_hash(barray, alg=alg)
+        return tools.get_object_hashes(barray, algs=algs)
 
     def validate(
         self,
@@ -68,51 +71,53 @@ class DictionaryIntrospector(Introspector):
         # create progress bar
         bar = ProgressBar(len(self.obj.keys()) * 2)
 
-        # generate iota
-        for k, v in self.obj.items():
-            # create iota
-            i = {"Key": k,
-                 "Value": pickle.dumps(v),
-                 "Created": created}
+        # all rows are committed together
+        with db.transaction():
+            # generate iota
+            for k, v in self.obj.items():
+                # create iota
+                i = {"Key": k,
+                     "Value": pickle.dumps(v),
+                     "Created": created}
 
-            # insert iota
-            iota.append(tools.insert_to_db_table(db, "Iota", i))
+                # insert iota
+                iota.append(tools.insert_to_db_table(db, "Iota", i))
 
-            # update progress
-            bar.increment()
+                # update progress
+                bar.increment()
 
-        # create hash target
-        to_hash = [i["IotaId"] for i in iota]
+            # create hash target
+            to_hash = [i["IotaId"] for i in iota]
 
-        # create group
-        group = {"MD5": tools.get_object_hash(to_hash),
-                 "Created": created}
+            # create group
+            group = {"MD5": tools.get_object_hash(to_hash),
+                     "Created": created}
 
-        # insert group
-        group = tools.insert_to_db_table(db, "Group", group)
+            # insert group
+            group = tools.insert_to_db_table(db, "Group", group)
 
-        # create group_dataset
-        group_dataset = {"GroupId": group["GroupId"],
-                         "DatasetId": ds_info.id,
-                         "Label": str(uuid.uuid4()),
-                         "Created": created}
+            # create group_dataset
+            group_dataset = {"GroupId": group["GroupId"],
+                             "DatasetId": ds_info.id,
+                             "Label": str(uuid.uuid4()),
+                             "Created": created}
 
-        # insert group_dataset
-        group_dataset = tools.insert_to_db_table(
-            db, "GroupDataset", group_dataset)
+            # insert group_dataset
+            group_dataset = tools.insert_to_db_table(
+                db, "GroupDataset", group_dataset)
 
-        # generate iota_group joins
-        for i in iota:
-            # create iota_group
-            iota_group = {"IotaId": i["IotaId"],
-                          "GroupId": group["GroupId"],
-                          "Created": created}
+            # generate iota_group joins
+            for i in iota:
+                # create iota_group
+                iota_group = {"IotaId": i["IotaId"],
+                              "GroupId": group["GroupId"],
+                              "Created": created}
 
-            # insert iota_group
-            iota_group = tools.insert_to_db_table(db, "IotaGroup", iota_group)
+                # insert iota_group
+                iota_group = tools.insert_to_db_table(db, "IotaGroup", iota_group)
 
-            # update progress
-            bar.increment()
+                # update progress
+                bar.increment()
 
     def store_files(
         self,
@@ -162,38 +167,13 @@ class DictionaryIntrospector(Introspector):
 def reconstruct(
     db: orator.DatabaseManager,
     ds_info: "DatasetInfo",
-    fms: FMSInterface
+    fms: FMSInterface,
+    columns: Union[List[str], None] = None
 ) -> dict:
-    # create group_datasets
-    group_datasets = tools.get_items_from_db_table(
-        db, "GroupDataset", ["DatasetId", "=", ds_info.id])
-
-    # create items
+    # create items, columns select dictionary keys
+    print("Reconstructing dataset...")
     items = {}
-
-    for group_dataset in group_datasets:
-        # create iota_groups
-        iota_groups = tools.get_items_from_db_table(
-            db, "IotaGroup", ["GroupId", "=", group_dataset["GroupId"]])
-
-        # create groups
-        print("Reconstructing dataset...")
-        bar = ProgressBar(len(iota_groups))
-
-        # create group
-        group = {}
-        for iota_group in iota_groups:
-            # create iota
-            iota = tools.get_items_from_db_table(
-                db, "Iota", ["IotaId", "=", iota_group["IotaId"]])[0]
-
-            # read value and attach to group
-            group[iota["Key"]] = pickle.loads(iota["Value"])
-
-            # update progress
-            bar.increment()
-
-        # attach completed group to items
-        items = {**items, **group}
+    for iota in tools.iter_dataset_iota(db, ds_info.id, keys=columns):
+        items[iota["Key"]] = pickle.loads(iota["Value"])
 
     return items
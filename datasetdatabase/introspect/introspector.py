@@ -1,10 +1,13 @@
 #!/usr/bin/env python
 
 # installed
-from typing import Dict
+from typing import Dict, List
 import orator
 import abc
 
+# self
+from ..utils import tools
+
 
 class Introspector(abc.ABC):
     """
@@ -18,8 +21,14 @@ class Introspector(abc.ABC):
 
     For a more defined example of an Introspector look at the
     DataFrameIntrospector.
+
+    The hash_version attribute names the hashing scheme get_object_hash uses.
+    It is stored alongside every dataset so that an introspector that changes
+    its hashing scheme can still reproduce the hashes of older datasets.
     """
 
+    hash_version = 1
+
     def __init__(self, obj: object):
         self._obj = obj
         self._validated = False
@@ -52,6 +61,15 @@ class Introspector(abc.ABC):
         """
         return hash(self.obj)
 
+    def get_object_hashes(self, algs: List[object] = tools.DEFAULT_HASH_ALGS):
+        """
+        Generate a hash for each of the hashing algorithms passed, returned in
+        the same order. Introspectors should override this so that the object
+        is only serialized once for every digest. By default this falls back
+        to one get_object_hash call per algorithm.
+        """
+        return [self.get_object_hash(alg) for alg in algs]
+
     @abc.abstractmethod
     def validate(self, **kwargs):
         """
@@ -37,6 +37,9 @@ class ObjectIntrospector(Introspector):
     def get_object_hash(self, alg=hashlib.md5):
         return tools.get_object_hash(self.obj, alg=alg)
 
+    def get_object_hashes(self, algs=tools.DEFAULT_HASH_ALGS):
+        return tools.get_object_hashes(self.obj, algs=algs)
+
     def validate(
         self,
         item_validation_map: Union[None, Dict[str, Union[types.ModuleType, types.FunctionType]]] = None
@@ -60,44 +63,46 @@ class ObjectIntrospector(Introspector):
         # begin teardown
         print("Tearing down object...")
 
-        # get file info
-        file_info = fms.get_or_create_object(db, self.obj)
+        # all rows are committed together
+        with db.transaction():
+            # get file info
+            file_info = fms.get_or_create_object(db, self.obj)
 
-        # create iota
-        i = {"Key": "obj",
-             "Value": pickle.dumps(file_info["ReadPath"]),
-             "Created": created}
+            # create iota
+            i = {"Key": "obj",
+                 "Value": pickle.dumps(file_info["ReadPath"]),
+                 "Created": created}
 
-        # insert iota
-        iota = tools.insert_to_db_table(db, "Iota", i)
+            # insert iota
+            iota = tools.insert_to_db_table(db, "Iota", i)
 
-        # create hash target
-        to_hash = iota["IotaId"]
+            # create hash target
+            to_hash = iota["IotaId"]
 
-        # create group
-        group = {"MD5": tools.get_object_hash(to_hash),
-                 "Created": created}
+            # create group
+            group = {"MD5": tools.get_object_hash(to_hash),
+                     "Created": created}
 
-        # insert group
-        group = tools.insert_to_db_table(db, "Group", group)
+            # insert group
+            group = tools.insert_to_db_table(db, "Group", group)
 
-        # create group_dataset
-        group_dataset = {"GroupId": group["GroupId"],
-                         "DatasetId": ds_info.id,
-                         "Label": str(uuid.uuid4()),
-                         "Created": created}
+            # create group_dataset
+            group_dataset = {"GroupId": group["GroupId"],
+                             "DatasetId": ds_info.id,
+                             "Label": str(uuid.uuid4()),
+                             "Created": created}
 
-        # insert group_dataset
-        group_dataset = tools.insert_to_db_table(
-            db, "GroupDataset", group_dataset)
+            # insert group_dataset
+            group_dataset = tools.insert_to_db_table(
+                db, "GroupDataset", group_dataset)
 
-        # create iota_group
-        iota_group = {"IotaId": iota["IotaId"],
-                      "GroupId": group["GroupId"],
-                      "Created": created}
+            # create iota_group
+            iota_group = {"IotaId": iota["IotaId"],
+                          "GroupId": group["GroupId"],
+                          "Created": created}
 
-        # insert iota_group
-        iota_group = tools.insert_to_db_table(db, "IotaGroup", iota_group)
+            # insert iota_group
+            iota_group = tools.insert_to_db_table(db, "IotaGroup", iota_group)
 
     def package(self):
         package = {}
@@ -119,31 +124,14 @@ def reconstruct(
     ds_info: "DatasetInfo",
     fms: FMSInterface
 ) -> object:
-    # create group_datasets
-    group_datasets = tools.get_items_from_db_table(
-        db, "GroupDataset", ["DatasetId", "=", ds_info.id])
-
     # obj
+    print("Reconstructing dataset...")
     obj = None
+    for iota in tools.iter_dataset_iota(db, ds_info.id):
+        # read value and load the stored object
+        read_path = pickle.loads(iota["Value"])
 
-    for group_dataset in group_datasets:
-        # create iota_groups
-        iota_groups = tools.get_items_from_db_table(
-            db, "IotaGroup", ["GroupId", "=", group_dataset["GroupId"]])
-
-        # create groups
-        print("Reconstructing dataset...")
-
-        # create group
-        for iota_group in iota_groups:
-            # create iota
-            iota = tools.get_items_from_db_table(
-                db, "Iota", ["IotaId", "=", iota_group["IotaId"]])[0]
-
-            # read value and attach to group
-            read_path = pickle.loads(iota["Value"])
-
-            with open(read_path, "rb") as read_in:
-                obj = pickle.load(read_in)
+        with open(read_path, "rb") as read_in:
+            obj = pickle.load(read_in)
 
     return obj
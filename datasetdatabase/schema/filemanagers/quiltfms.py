@@ -5,7 +5,6 @@ from datetime import datetime
 from typing import Union
 import importlib
 import pathlib
-import hashlib
 import orator
 import quilt
 import yaml
@@ -162,8 +161,7 @@ class QuiltFMS(FMSInterface):
         checks.check_file_exists(filepath)
 
         # check exists
-        md5 = tools.get_file_hash(filepath)
-        sha256 = tools.get_file_hash(filepath, hashlib.sha256)
+        md5, sha256 = tools.get_file_hashes(filepath)
         file_info = self.get_file(db=db, md5=md5)
 
         # return if found
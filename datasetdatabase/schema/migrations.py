@@ -0,0 +1,176 @@
+#!/usr/bin/env python
+
+# installed
+import orator
+
+# self
+from ..utils import checks
+from ..utils.tools import hash_value
+from .tables import INDEXES, index_name
+
+# globals
+VALUE_HASH_BATCH_SIZE = 1000
+
+
+def add_Dataset_HashVersion(schema: orator.Schema):
+    # enforce types
+    checks.check_types(schema, orator.Schema)
+
+    # datasets created before the column existed were hashed with version 1
+    # and are left null
+    if schema.has_table("Dataset") and \
+            not schema.has_column("Dataset", "HashVersion"):
+        with schema.table("Dataset") as table:
+            table.integer("HashVersion").nullable()
+
+
+def add_DatasetIngest_LastLabel(schema: orator.Schema):
+    # enforce types
+    checks.check_types(schema, orator.Schema)
+
+    # ingests tracked before checkpoints existed start over when resumed
+    if schema.has_table("DatasetIngest") and \
+            not schema.has_column("DatasetIngest", "LastLabel"):
+        with schema.table("DatasetIngest") as table:
+            table.big_integer("LastLabel").nullable()
+
+
+def add_DatasetIngest_Owner(schema: orator.Schema):
+    # enforce types
+    checks.check_types(schema, orator.Schema)
+
+    # ingests tracked before owners existed are judged by their creation time
+    if schema.has_table("DatasetIngest") and \
+            not schema.has_column("DatasetIngest", "Owner"):
+        with schema.table("DatasetIngest") as table:
+            table.string("Owner").nullable()
+
+
+def add_DatasetIngest_Heartbeat(schema: orator.Schema):
+    # enforce types
+    checks.check_types(schema, orator.Schema)
+
+    if schema.has_table("DatasetIngest") and \
+            not schema.has_column("DatasetIngest", "Heartbeat"):
+        with schema.table("DatasetIngest") as table:
+            table.datetime("Heartbeat").nullable()
+
+
+def add_Indexes(schema: orator.Schema):
+    # enforce types
+    checks.check_types(schema, orator.Schema)
+
+    # tables created before the indexes existed get them added in place,
+    # tables that already have them are left as is
+    grammar = schema.db.connection().get_query_grammar()
+    for table, indexes in INDEXES.items():
+        if not schema.has_table(table):
+            continue
+
+        for columns in indexes:
+            schema.db.statement("CREATE INDEX IF NOT EXISTS {} ON {} ({})".format(
+                grammar.wrap(index_name(table, columns)),
+                grammar.wrap_table(table),
+                grammar.columnize(columns)))
+
+
+def add_Iota_ValueHash(schema: orator.Schema):
+    # enforce types
+    checks.check_types(schema, orator.Schema)
+
+    if not schema.has_table("Iota"):
+        return
+
+    # iota created before the column existed are filled below
+    if not schema.has_column("Iota", "ValueHash"):
+        with schema.table("Iota") as table:
+            table.string("ValueHash", 64).nullable()
+
+    _fill_Iota_ValueHash(schema.db)
+
+    # replace the unique key on the raw value with the one on its hash, on
+    # sqlite the old index is dropped along with the rebuilt table
+    db = schema.db
+    grammar = db.connection().get_query_grammar()
+    if db.connection().name == "sqlite":
+        _rebuild_sqlite_Iota(schema)
+        db.statement("DROP INDEX IF EXISTS {}".format(
+            grammar.wrap("iota_key_value_unique")))
+
+    # same name as the unique key of newly created tables
+    db.statement("CREATE UNIQUE INDEX IF NOT EXISTS {} ON {} ({})".format(
+        grammar.wrap("iota_key_valuehash_unique"),
+        grammar.wrap_table("Iota"),
+        grammar.columnize(["Key", "ValueHash"])))
+
+    if db.connection().name == "pgsql":
+        db.statement("ALTER TABLE {} ALTER COLUMN {} SET NOT NULL".format(
+            grammar.wrap_table("Iota"), grammar.wrap("ValueHash")))
+        db.statement("ALTER TABLE {} DROP CONSTRAINT IF EXISTS {}".format(
+            grammar.wrap_table("Iota"), grammar.wrap("iota_key_value_unique")))
+
+
+def _fill_Iota_ValueHash(db: orator.DatabaseManager):
+    # fill missing hashes a batch at a time in id order, each batch is a
+    # single executemany update
+    connection = db.connection()
+    grammar = connection.get_query_grammar()
+    update = "UPDATE {} SET {} = {m} WHERE {} = {m}".format(
+        grammar.wrap_table("Iota"),
+        grammar.wrap("ValueHash"),
+        grammar.wrap("IotaId"),
+        m=grammar.get_marker())
+
+    last = 0
+    while True:
+        rows = db.table("Iota")\
+            .select("IotaId", "Value")\
+            .where_null("ValueHash")\
+            .where("IotaId", ">", last)\
+            .order_by("IotaId")\
+            .limit(VALUE_HASH_BATCH_SIZE)\
+            .get()
+        if len(rows) == 0:
+            break
+
+        with db.transaction():
+            cursor = connection.get_connection().cursor()
+            try:
+                cursor.executemany(update, [(hash_value(row["Value"]),
+                                             row["IotaId"]) for row in rows])
+            finally:
+                cursor.close()
+
+        last = rows[-1]["IotaId"]
+
+
+def _rebuild_sqlite_Iota(schema: orator.Schema):
+    # sqlite can not make a column not null in place, the rows are copied to
+    # a table with the columns of create_Iota that then replaces the old one
+    db = schema.db
+    columns = db.select('PRAGMA table_info("Iota")')
+    if any(c["name"] == "ValueHash" and c["notnull"] for c in columns):
+        return
+
+    # foreign keys only switch off outside of a transaction
+    db.statement("PRAGMA foreign_keys = OFF")
+    try:
+        with db.transaction():
+            with schema.create("Iota_migrated") as table:
+                table.big_increments("IotaId")
+                table.string("Key")
+                table.binary("Value")
+                table.string("ValueHash", 64)
+                table.datetime("Created")
+
+            grammar = db.connection().get_query_grammar()
+            names = grammar.columnize(
+                ["IotaId", "Key", "Value", "ValueHash", "Created"])
+            db.statement("INSERT INTO {} ({c}) SELECT {c} FROM {}".format(
+                grammar.wrap_table("Iota_migrated"),
+                grammar.wrap_table("Iota"),
+                c=names))
+            schema.drop("Iota")
+            schema.rename("Iota_migrated", "Iota")
+    finally:
+        db.statement("PRAGMA foreign_keys = ON")
@@ -3,6 +3,7 @@
 # self
 from ..schemaversion import SchemaVersion
 from ...schema import tables
+from ...schema import migrations
 
 from ...version import VERSION
 
@@ -14,6 +15,8 @@ TABLES = {"User": tables.create_User,
           "IotaGroup": tables.create_IotaGroup,
           "Dataset": tables.create_Dataset,
           "GroupDataset": tables.create_GroupDataset,
+          "DatasetStats": tables.create_DatasetStats,
+          "DatasetIngest": tables.create_DatasetIngest,
           "Annotation": tables.create_Annotation,
           "AnnotationDataset": tables.create_AnnotationDataset,
           "Algorithm": tables.create_Algorithm,
@@ -21,4 +24,12 @@ TABLES = {"User": tables.create_User,
           "RunInput": tables.create_RunInput,
           "RunOutput": tables.create_RunOutput}
 
-MINIMAL = SchemaVersion("MINIMAL", TABLES, VERSION)
+# MIGRATIONS RUN IN ORDER AFTER TABLE CREATION
+MIGRATIONS = {"Dataset.HashVersion": migrations.add_Dataset_HashVersion,
+              "Indexes": migrations.add_Indexes,
+              "Iota.ValueHash": migrations.add_Iota_ValueHash,
+              "DatasetIngest.LastLabel": migrations.add_DatasetIngest_LastLabel,
+              "DatasetIngest.Owner": migrations.add_DatasetIngest_Owner,
+              "DatasetIngest.Heartbeat": migrations.add_DatasetIngest_Heartbeat}
+
+MINIMAL = SchemaVersion("MINIMAL", TABLES, VERSION, MIGRATIONS)
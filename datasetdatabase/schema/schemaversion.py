@@ -12,16 +12,23 @@ class SchemaVersion(object):
     def __init__(self,
         name: str,
         tables: Dict[str, types.ModuleType],
-        version: Union[str, float, List[int]]):
+        version: Union[str, float, List[int]],
+        migrations: Union[Dict[str, types.ModuleType], None] = None):
 
         # enforce types
         checks.check_types(name, str)
         checks.check_types(tables, dict)
         checks.check_types(version, [str, float, list])
+        checks.check_types(migrations, [dict, type(None)])
+
+        # default no migrations
+        if migrations is None:
+            migrations = {}
 
         # store attributes
         self._name = name
         self._tables = tables
+        self._migrations = migrations
 
         if isinstance(version, list):
             version = ".".join(version)
@@ -39,6 +46,11 @@ class SchemaVersion(object):
         return self._tables
 
 
+    @property
+    def migrations(self):
+        return self._migrations
+
+
     @property
     def version(self):
         return self._version
@@ -6,6 +6,43 @@ import orator
 # self
 from ..utils import checks
 
+# globals
+# columns that together identify a row for get or create inserts
+UNIQUE_COLUMNS = {"User": ["Name"],
+                  "Iota": ["Key", "ValueHash"],
+                  "Group": ["MD5"],
+                  "IotaGroup": ["IotaId", "GroupId"],
+                  "GroupDataset": ["GroupId", "DatasetId", "Label"],
+                  "DatasetStats": ["DatasetId"],
+                  "DatasetIngest": ["DatasetId"],
+                  "Algorithm": ["Name", "Version"]}
+
+# unique columns stored as strings, other values are coerced before insert so
+# that they match the rows read back
+STRING_UNIQUE_COLUMNS = {"User": ["Name"],
+                         "Iota": ["Key"],
+                         "GroupDataset": ["Label"],
+                         "Algorithm": ["Name", "Version"]}
+
+# large columns stored with a fixed width sha256 hash column, rows are
+# deduplicated on the hash and the large column only rules out collisions
+HASHED_COLUMNS = {"Iota": ("Value", "ValueHash")}
+
+# columns that reconstruct, preview, purge, recent, and list datasets filter,
+# join, or page on
+INDEXES = {"Dataset": [["Created", "DatasetId"]],
+           "IotaGroup": [["GroupId"]],
+           "GroupDataset": [["DatasetId"]],
+           "AnnotationDataset": [["DatasetId"]],
+           "Run": [["End"]],
+           "RunInput": [["DatasetId"]],
+           "RunOutput": [["DatasetId"]]}
+
+
+def index_name(table: str, columns: list) -> str:
+    # the same name orator gives an index created in a table blueprint
+    return "{}_{}_index".format(table, "_".join(columns)).lower()
+
 
 def create_User(schema: orator.Schema):
     # enforce types
@@ -30,8 +67,9 @@ def create_Iota(schema: orator.Schema):
             table.big_increments("IotaId")
             table.string("Key")
             table.binary("Value")
+            table.string("ValueHash", 64)
             table.datetime("Created")
-            table.unique(["Key", "Value"])
+            table.unique(["Key", "ValueHash"])
 
 
 def create_Group(schema: orator.Schema):
@@ -58,6 +96,7 @@ def create_IotaGroup(schema: orator.Schema):
             table.integer("GroupId").unsigned()
             table.datetime("Created")
             table.unique(["IotaId", "GroupId"])
+            table.index("GroupId")
             table.foreign("IotaId") \
                  .references("IotaId") \
                  .on("Iota")
@@ -79,7 +118,9 @@ def create_Dataset(schema: orator.Schema):
             table.string("Introspector")
             table.string("MD5").unique()
             table.string("SHA256").unique()
+            table.integer("HashVersion").nullable()
             table.datetime("Created")
+            table.index(["Created", "DatasetId"])
 
 
 def create_GroupDataset(schema: orator.Schema):
@@ -95,6 +136,7 @@ def create_GroupDataset(schema: orator.Schema):
             table.string("Label")
             table.datetime("Created")
             table.unique(["GroupId", "DatasetId", "Label"])
+            table.index("DatasetId")
             table.foreign("GroupId") \
                  .references("GroupId") \
                  .on("Group")
@@ -103,6 +145,44 @@ def create_GroupDataset(schema: orator.Schema):
                  .on("Dataset")
 
 
+def create_DatasetStats(schema: orator.Schema):
+    # enforce types
+    checks.check_types(schema, orator.Schema)
+
+    # create table
+    if not schema.has_table("DatasetStats"):
+        with schema.create("DatasetStats") as table:
+            table.increments("DatasetStatsId")
+            table.integer("DatasetId").unsigned().unique()
+            table.big_integer("Rows")
+            table.text("Keys")
+            table.big_integer("ByteSize")
+            table.datetime("Created")
+            table.foreign("DatasetId") \
+                 .references("DatasetId") \
+                 .on("Dataset")
+
+
+def create_DatasetIngest(schema: orator.Schema):
+    # enforce types
+    checks.check_types(schema, orator.Schema)
+
+    # create table
+    if not schema.has_table("DatasetIngest"):
+        with schema.create("DatasetIngest") as table:
+            table.increments("DatasetIngestId")
+            table.integer("DatasetId").unsigned().unique()
+            table.boolean("Complete")
+            table.big_integer("LastLabel").nullable()
+            table.string("Owner").nullable()
+            table.datetime("Heartbeat").nullable()
+            table.datetime("Created")
+            table.datetime("Completed").nullable()
+            table.foreign("DatasetId") \
+                 .references("DatasetId") \
+                 .on("Dataset")
+
+
 def create_Annotation(schema: orator.Schema):
     # enforce types
     checks.check_types(schema, orator.Schema)
@@ -130,6 +210,7 @@ def create_AnnotationDataset(schema: orator.Schema):
             table.integer("AnnotationId").unsigned()
             table.integer("DatasetId").unsigned()
             table.datetime("Created")
+            table.index("DatasetId")
             table.foreign("AnnotationId") \
                  .references("AnnotationId") \
                  .on("Annotation")
@@ -168,6 +249,7 @@ def create_Run(schema: orator.Schema):
             table.integer("AlgorithmParameters").unsigned()
             table.datetime("Begin")
             table.datetime("End")
+            table.index("End")
             table.foreign("AlgorithmId") \
                  .references("AlgorithmId") \
                  .on("Algorithm")
@@ -190,6 +272,7 @@ def create_RunInput(schema: orator.Schema):
             table.integer("RunId").unsigned()
             table.integer("DatasetId").unsigned()
             table.datetime("Created")
+            table.index("DatasetId")
             table.foreign("RunId") \
                  .references("RunId") \
                  .on("Run")
@@ -209,6 +292,7 @@ def create_RunOutput(schema: orator.Schema):
             table.integer("RunId").unsigned()
             table.integer("DatasetId").unsigned()
             table.datetime("Created")
+            table.index("DatasetId")
             table.foreign("RunId") \
                  .references("RunId") \
                  .on("Run")
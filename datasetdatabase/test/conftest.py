@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+
+# installed
+from typing import Union
+import pathlib
+import pytest
+import orator
+
+# self
+from datasetdatabase.core import DatabaseConfig, DatabaseConstructor
+from datasetdatabase.schema import FMSInterface
+from datasetdatabase.utils import tools
+from datasetdatabase import DatasetDatabase
+
+
+class LocalFMS(FMSInterface):
+    # FMS without a File table that pickles objects to a local directory so
+    # the test databases do not need quilt
+    def __init__(self, storage_location: pathlib.Path):
+        self.storage_location = storage_location
+
+    @property
+    def table_name(self):
+        return None
+
+    def create_File(self, schema: orator.Schema):
+        return
+
+    def get_or_create_file(self, filepath: Union[str, pathlib.Path], metadata: Union[dict, None] = None):
+        raise NotImplementedError
+
+    def get_or_create_object(self, db: orator.DatabaseManager, obj: object) -> dict:
+        read_path = self.storage_location / "{}.pkl".format(tools.get_object_hash(obj))
+        tools.write_pickle(obj, read_path)
+
+        return {"ReadPath": str(read_path)}
+
+
+@pytest.fixture
+def fms(tmp_path):
+    return LocalFMS(tmp_path)
+
+
+@pytest.fixture
+def database(tmp_path, fms):
+    config = DatabaseConfig({"driver": "sqlite", "database": str(tmp_path / "test.db")})
+    constructor = DatabaseConstructor(config, fms=fms)
+
+    return DatasetDatabase(config=config, user="tester", constructor=constructor, build=True)
+
+
+@pytest.fixture
+def count_queries():
+    # start recording every statement a database's sqlite connection runs,
+    # each call returns a new list of the statements run from then on
+    connections = []
+
+    def count(database: DatasetDatabase) -> list:
+        queries = []
+        connection = database.db.connection().get_connection()
+        connection.set_trace_callback(queries.append)
+        connections.append(connection)
+
+        return queries
+
+    yield count
+
+    # stop recording
+    for connection in connections:
+        connection.set_trace_callback(None)
@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+
+# installed
+import pandas as pd
+import pytest
+import os
+
+# self
+from datasetdatabase.core import DatabaseConfig, DatabaseConstructor
+from datasetdatabase.utils import DatasetCache, MemoryCache
+from datasetdatabase.utils import cache as cache_module
+from datasetdatabase import Dataset, DatasetDatabase
+
+
+def test_cache_round_trip(tmp_path):
+    cache = DatasetCache(tmp_path / "cache")
+    cache.put(1, "abc", {"a": [1, 2]})
+
+    assert cache.get(1, "abc") == {"a": [1, 2]}
+    assert cache.get(1, "def") is None
+    assert cache.get(2, "abc") is None
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = DatasetCache(tmp_path / "cache", max_bytes=1000)
+    for i in range(3):
+        cache.put(i, "sha", b"x" * 300)
+        os.utime(cache.path(i, "sha"), (i, i))
+
+    # reading marks as recently used
+    cache.get(0, "sha")
+    cache.put(3, "sha", b"x" * 300)
+
+    assert cache.get(1, "sha") is None
+    assert all(cache.get(i, "sha") is not None for i in [0, 2, 3])
+    assert cache.size <= 1000
+
+
+def test_get_dataset_reads_cache(tmp_path, fms, count_queries):
+    config = DatabaseConfig({"driver": "sqlite",
+                             "database": str(tmp_path / "test.db"),
+                             "cache_dir": str(tmp_path / "cache")})
+    constructor = DatabaseConstructor(config, fms=fms)
+    database = DatasetDatabase(config=config, user="tester", constructor=constructor, build=True,
+                               memory_cache_size=None)
+
+    data = pd.DataFrame({"a": range(10), "b": list("abcdefghij")})
+    ds = Dataset(data, name="frame")
+    ds.upload_to(database)
+    first = database.get_dataset(id=ds.info.id)
+
+    # a cached pull never joins the iota
+    queries = count_queries(database)
+    second = database.get_dataset(id=ds.info.id)
+
+    assert "cache_dir" not in config.config
+    assert not any("Iota" in query for query in queries)
+    pd.testing.assert_frame_equal(first.ds, second.ds)
+
+
+def test_memory_cache_hands_out_copies():
+    cache = MemoryCache()
+    data = pd.DataFrame({"a": [1, 2, 3]})
+    cache.put(1, data)
+
+    # neither the stored nor the returned object leak changes
+    data.loc[0, "a"] = 100
+    pulled = cache.get(1)
+    pulled.loc[1, "a"] = 200
+
+    assert cache.get(1)["a"].tolist() == [1, 2, 3]
+
+
+def test_memory_cache_is_bounded_by_bytes():
+    cache = MemoryCache(max_bytes=2500)
+    for i in range(3):
+        cache.put(i, b"x" * 1000)
+    cache.put(3, b"x" * 10000)
+
+    assert 0 not in cache
+    assert all(i in cache for i in [1, 2])
+    assert 3 not in cache
+    assert cache.size <= 2500
+
+
+def test_get_dataset_reads_memory_cache(database, count_queries):
+    data = pd.DataFrame({"a": range(10), "b": list("abcdefghij")})
+    ds = Dataset(data, name="frame")
+    ds.upload_to(database)
+    first = database.get_dataset(id=ds.info.id)
+    first.ds.loc[0, "a"] = 100
+
+    # a repeated pull neither looks up nor joins the dataset
+    queries = count_queries(database)
+    second = database.get_dataset(id=ds.info.id)
+
+    assert not any('"Iota"' in query or 'FROM "Dataset"' in query for query in queries)
+    pd.testing.assert_frame_equal(second.ds, data)
+
+
+def test_purge_forgets_cached_dataset(database):
+    ds = Dataset(pd.DataFrame({"a": range(10)}), name="frame")
+    ds.upload_to(database)
+    database.get_dataset(id=ds.info.id)
+
+    database._purge_dataset(id=ds.info.id)
+
+    assert ds.info.id not in database.memory_cache
+    with pytest.raises(ValueError):
+        database.get_dataset(id=ds.info.id)
+
+
+def test_memory_cache_sizes_without_pickling(monkeypatch):
+    monkeypatch.setattr(cache_module.pickle, "dumps", None)
+    cache = MemoryCache(max_bytes=10000)
+    cache.put(1, {"values": list(range(100)), "nested": {"a": b"x" * 1000}})
+
+    assert 1000 < cache.size < 10000
+
+
+@pytest.mark.parametrize("cow, expected", [(True, cache_module.DEFAULT_MEMORY_CACHE_SIZE), (False, None)])
+def test_memory_cache_defaults_to_copy_on_write(monkeypatch, cow, expected):
+    monkeypatch.setattr(cache_module, "copy_on_write", lambda: cow)
+
+    assert cache_module.resolve_memory_cache_size("auto") == expected
+    assert cache_module.resolve_memory_cache_size(100) == 100
+    assert cache_module.resolve_memory_cache_size(None) is None
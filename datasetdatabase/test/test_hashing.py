@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+
+# installed
+import pandas as pd
+import pytest
+
+# self
+from datasetdatabase.introspect import DataFrameIntrospector
+from datasetdatabase import Dataset, core
+
+
+def count_hashes(monkeypatch):
+    # wrap both dataframe hashing entry points with a shared counter
+    calls = []
+
+    def counted(original):
+        def wrapper(self, *args, **kwargs):
+            calls.append(original.__name__)
+            return original(self, *args, **kwargs)
+
+        return wrapper
+
+    for name in ["get_object_hash", "get_object_hashes"]:
+        monkeypatch.setattr(DataFrameIntrospector, name, counted(getattr(DataFrameIntrospector, name)))
+
+    return calls
+
+
+def test_upload_hashes_once(database, monkeypatch):
+    ds = Dataset(pd.DataFrame({"a": [1, 2, 3], "b": ["x", "y", "z"]}), name="hashed")
+
+    calls = count_hashes(monkeypatch)
+    ds.upload_to(database)
+
+    assert len(calls) == 1
+    assert ds.info is not None
+    assert (ds.info.md5, ds.info.sha256) == (ds.md5, ds.sha256)
+
+
+def test_legacy_rows_do_not_rehash_uploads(database, monkeypatch):
+    legacy = Dataset(pd.DataFrame({"a": [4, 5, 6]}), name="legacy")
+    legacy.upload_to(database)
+    database.db.table("Dataset").where("DatasetId", "=", legacy.info.id).update(HashVersion=None)
+
+    # a new dataset under a new name is hashed once
+    ds = Dataset(pd.DataFrame({"a": [1, 2, 3], "b": ["x", "y", "z"]}), name="hashed")
+    calls = count_hashes(monkeypatch)
+    ds.upload_to(database)
+
+    assert len(calls) == 1
+    assert ds.info.id != legacy.info.id
+
+
+def test_get_dataset_trusts_stored_hashes(database, monkeypatch):
+    ds = Dataset(pd.DataFrame({"a": [1, 2, 3], "b": ["x", "y", "z"]}), name="stored")
+    ds.upload_to(database)
+
+    calls = count_hashes(monkeypatch)
+    pulled = database.get_dataset(id=ds.info.id)
+
+    assert len(calls) == 0
+    assert (pulled.md5, pulled.sha256) == (ds.md5, ds.sha256)
+
+
+@pytest.mark.parametrize("first, second", [
+    (pd.Series([0, 0], dtype="int64"), pd.Series([0.0, 0.0], dtype="float64")),
+    (pd.Series([True, False], dtype="bool"), pd.Series([1, 0], dtype="uint8")),
+    (pd.Series(pd.to_datetime(["2018-01-01", "2018-01-02"])),
+     pd.Series(pd.to_datetime(["2018-01-01", "2018-01-02"]).tz_localize("UTC"))),
+    (pd.Series(["a", "b"], dtype=pd.CategoricalDtype(["a", "b"])),
+     pd.Series(["a", "b"], dtype=pd.CategoricalDtype(["a", "b", "c"])))
+])
+def test_dtypes_are_hashed(first, second):
+    hashes = [DataFrameIntrospector(pd.DataFrame({"a": column})).get_object_hashes()
+              for column in [first, second]]
+
+    assert hashes[0] != hashes[1]
+
+
+def test_same_buffer_is_new_dataset(database):
+    ints = Dataset(pd.DataFrame({"a": [0, 0]}), name="ints")
+    ints.upload_to(database)
+
+    floats = Dataset(pd.DataFrame({"a": [0.0, 0.0]}), name="floats")
+    floats.upload_to(database)
+
+    assert floats.info.id != ints.info.id
+    assert database.get_dataset(id=floats.info.id).ds["a"].tolist() == [0.0, 0.0]
+
+
+def corrupt_stored_hash(database, ds):
+    # store a digest that no longer matches the uploaded data
+    database.db.table("Dataset").where("DatasetId", "=", ds.info.id).update(MD5="0" * 32)
+    database._uncache_dataset(ds.info.id, ds.sha256)
+
+
+@pytest.mark.parametrize("hash_policy", ["lazy", "background"])
+def test_deferred_policies_verify_stored_hashes(database, hash_policy):
+    ds = Dataset(pd.DataFrame({"a": [1, 2, 3], "b": ["x", "y", "z"]}), name="deferred")
+    ds.upload_to(database)
+
+    # intact hashes pass
+    pulled = database.get_dataset(id=ds.info.id, hash_policy=hash_policy)
+    pulled.validate()
+    assert (pulled.md5, pulled.sha256) == (ds.md5, ds.sha256)
+
+    # corrupted hashes raise before the first change
+    corrupt_stored_hash(database, ds)
+    with pytest.raises(ValueError):
+        pulled = database.get_dataset(id=ds.info.id, hash_policy=hash_policy)
+        pulled.validate()
+
+
+@pytest.mark.parametrize("hash_policy", ["lazy", "background"])
+def test_deferred_policies_hash_a_private_copy(database, hash_policy):
+    ds = Dataset(pd.DataFrame({"a": [1, 2, 3]}), name="private")
+    ds.upload_to(database)
+
+    # changes made by the caller after the pull are not verified
+    pulled = database.get_dataset(id=ds.info.id, hash_policy=hash_policy)
+    pulled.ds["a"] = [4, 5, 6]
+    pulled.validate()
+
+
+def test_rehash_policy(database, monkeypatch):
+    ds = Dataset(pd.DataFrame({"a": [1, 2, 3]}), name="rehashed")
+    ds.upload_to(database)
+    corrupt_stored_hash(database, ds)
+
+    # the pulled object is hashed right away and the stored digest is ignored
+    calls = count_hashes(monkeypatch)
+    pulled = database.get_dataset(id=ds.info.id, hash_policy="rehash")
+    assert calls == ["get_object_hashes"]
+    assert pulled.md5 == ds.md5
+    assert pulled.info.md5 == "0" * 32
+
+    # trusted hashes are taken as stored
+    pulled = database.get_dataset(id=ds.info.id, hash_policy="trust")
+    assert pulled.md5 == "0" * 32
+
+
+def test_deferred_policies_without_copy_on_write(database, monkeypatch):
+    ds = Dataset(pd.DataFrame({"a": [1, 2, 3]}), name="eager")
+    ds.upload_to(database)
+    corrupt_stored_hash(database, ds)
+
+    # without a free private copy the stored hashes are verified on pull
+    monkeypatch.setattr(core, "snapshot", lambda obj: None)
+    with pytest.raises(ValueError):
+        database.get_dataset(id=ds.info.id, hash_policy="lazy")
@@ -0,0 +1,332 @@
+#!/usr/bin/env python
+
+# installed
+from datetime import datetime, timedelta
+from contextlib import contextmanager
+import pandas as pd
+import multiprocessing
+import threading
+import pytest
+import socket
+import os
+
+# self
+from datasetdatabase.introspect import dataframe
+from datasetdatabase.core import DatabaseConfig, DatabaseConstructor
+from datasetdatabase import Dataset, DatasetDatabase
+
+
+def fail_after(monkeypatch, n_blocks):
+    # let the first blocks through then crash the ingest
+    calls = []
+    original = dataframe._write_Block
+
+    def failing(block, *args, **kwargs):
+        calls.append(len(block[1]))
+        if len(calls) > n_blocks:
+            raise RuntimeError("ingest crashed")
+
+        return original(block, *args, **kwargs)
+
+    monkeypatch.setattr(dataframe, "_write_Block", failing)
+    return calls
+
+
+def record_writes(monkeypatch, name):
+    # count the rows handed to a dataframe write function
+    calls = []
+    original = getattr(dataframe, name)
+
+    def recording(rows, **kwargs):
+        calls.append(len(rows))
+        return original(rows, **kwargs)
+
+    monkeypatch.setattr(dataframe, name, recording)
+    return calls
+
+
+@pytest.mark.parametrize("n_rows, block_size, blocks", [
+    (1200, 500, [500, 500, 200]),
+    (1000, 500, [500, 500]),
+    (7, 3, [3, 3, 1]),
+    (7, None, None)
+])
+def test_block_round_trip(database, monkeypatch, n_rows, block_size, blocks):
+    # write with the requested block size
+    deconstruct = dataframe.DataFrameIntrospector.deconstruct
+    monkeypatch.setattr(dataframe.DataFrameIntrospector, "deconstruct",
+                        lambda self, *args, **kwargs: deconstruct(self, *args, block_size=block_size, **kwargs))
+    block_calls = record_writes(monkeypatch, "_deconstruct_Block")
+    group_calls = record_writes(monkeypatch, "_deconstruct_Group")
+
+    data = pd.DataFrame({"a": range(n_rows),
+                         "b": ["cell_{}".format(i % 4) for i in range(n_rows)],
+                         "c": [[i, i] for i in range(n_rows)]})
+    ds = Dataset(data, name="frame")
+    ds.upload_to(database)
+
+    # blocks are full but the last, without a block size rows are written alone
+    if blocks is None:
+        assert block_calls == []
+        assert len(group_calls) == n_rows
+    else:
+        assert sorted(block_calls, reverse=True) == blocks
+        assert group_calls == []
+
+    database.iota_cache.clear()
+    pulled = dataframe.reconstruct(database.db, ds.info, database.constructor.fms)
+    pd.testing.assert_frame_equal(pulled, data, check_index_type=False)
+    assert database.db.table("GroupDataset").where("DatasetId", "=", ds.info.id).count() == n_rows
+
+
+def test_failed_ingest_is_removed(database, monkeypatch):
+    data = pd.DataFrame({"a": range(1200), "b": ["cell_{}".format(i) for i in range(1200)]})
+
+    fail_after(monkeypatch, 1)
+    with pytest.raises(RuntimeError):
+        Dataset(data, name="frame").upload_to(database)
+
+    # nothing of the dataset is left behind
+    assert database.get_items_from_table("Dataset", ["Name", "=", "frame"]) == []
+    assert database.db.table("DatasetIngest").count() == 1
+    assert database.db.table("GroupDataset").count() == 1
+
+    # so it can be uploaded again
+    monkeypatch.undo()
+    ds = Dataset(data, name="frame")
+    ds.upload_to(database)
+
+    pd.testing.assert_frame_equal(database.get_dataset(id=ds.info.id).ds, data, check_index_type=False)
+
+
+def test_incomplete_ingest_is_replaced(database):
+    data = pd.DataFrame({"a": range(10)})
+    ds = Dataset(data, name="frame")
+    ds.upload_to(database)
+
+    # a process killed mid ingest
+    database.db.table("DatasetIngest").where("DatasetId", "=", ds.info.id).update(Complete=False)
+
+    again = Dataset(data, name="frame")
+    again.upload_to(database)
+
+    assert again.info.id != ds.info.id
+    assert database.db.table("DatasetIngest").where("DatasetId", "=", again.info.id).first()["Complete"]
+
+
+@pytest.mark.parametrize("owner, minutes, alive", [
+    ("other-host:1", 0, True),
+    ("other-host:1", 60, False),
+    ("{}:{}".format(socket.gethostname(), os.getppid()), 60, True)
+])
+def test_running_ingest_is_not_replaced(database, owner, minutes, alive):
+    data = pd.DataFrame({"a": range(10)})
+    ds = Dataset(data, name="frame")
+    ds.upload_to(database)
+
+    # an ingest of another process that last checkpointed minutes ago
+    heartbeat = datetime.utcnow() - timedelta(minutes=minutes)
+    database.db.table("DatasetIngest").where("DatasetId", "=", ds.info.id)\
+        .update(Complete=False, Owner=owner, Heartbeat=heartbeat)
+
+    if alive:
+        with pytest.raises(ValueError):
+            Dataset(data, name="frame").upload_to(database)
+
+        # nothing was removed
+        assert database.db.table("GroupDataset").where("DatasetId", "=", ds.info.id).count() == 10
+    else:
+        again = Dataset(data, name="frame")
+        again.upload_to(database)
+        assert again.info.id != ds.info.id
+
+
+def test_resume_ingest(database, monkeypatch):
+    data = pd.DataFrame({"a": range(1200), "b": ["cell_{}".format(i) for i in range(1200)]})
+
+    calls = fail_after(monkeypatch, 2)
+    with pytest.raises(RuntimeError):
+        Dataset(data, name="frame").upload_to(database, resume=True)
+
+    # the committed blocks and their checkpoint are kept
+    dataset_id = database.get_items_from_table("Dataset", ["Name", "=", "frame"])[0]["DatasetId"]
+    ingest = database.db.table("DatasetIngest").where("DatasetId", "=", dataset_id).first()
+    assert not ingest["Complete"]
+    assert ingest["LastLabel"] == 999
+
+    # only the remaining block is written
+    calls.clear()
+    ds = Dataset(data, name="frame")
+    ds.upload_to(database, resume=True)
+
+    assert calls == [200]
+    assert ds.info.id == dataset_id
+    pd.testing.assert_frame_equal(database.get_dataset(id=ds.info.id).ds, data, check_index_type=False)
+
+
+def test_pooled_ingest(database, monkeypatch):
+    data = pd.DataFrame({"a": range(2500), "b": ["cell_{}".format(i) for i in range(2500)]})
+
+    # sqlite opts in to blocks written from two threads on their own connections
+    database.processing_limit = 2
+    assert database.connections is None
+    database.pooled_ingest = True
+    assert database.connections.size == 2
+
+    # rows are prepared before the write transaction is taken
+    writing = threading.local()
+    transaction = database.connections.transaction
+
+    @contextmanager
+    def flagged():
+        with transaction() as db:
+            writing.active = True
+            try:
+                yield db
+            finally:
+                writing.active = False
+
+    prepare_block = dataframe._prepare_Block
+
+    def unlocked(rows, created):
+        assert not getattr(writing, "active", False)
+        return prepare_block(rows, created)
+
+    monkeypatch.setattr(database.connections, "transaction", flagged)
+    monkeypatch.setattr(dataframe, "_prepare_Block", unlocked)
+
+    calls = fail_after(monkeypatch, 2)
+    with pytest.raises(RuntimeError):
+        Dataset(data, name="frame").upload_to(database, resume=True)
+
+    # the checkpoint never passes a block that was not committed
+    dataset_id = database.get_items_from_table("Dataset", ["Name", "=", "frame"])[0]["DatasetId"]
+    ingest = database.db.table("DatasetIngest").where("DatasetId", "=", dataset_id).first()
+    assert ingest["LastLabel"] in (None, 499, 999)
+
+    monkeypatch.undo()
+    ds = Dataset(data, name="frame")
+    ds.upload_to(database, resume=True)
+
+    assert ds.info.id == dataset_id
+    pd.testing.assert_frame_equal(database.get_dataset(id=ds.info.id).ds, data, check_index_type=False)
+
+
+@pytest.mark.parametrize("pooled", [True, False])
+def test_pipelined_ingest(database, monkeypatch, pooled):
+    # without a pool a single thread writes
+    database.pooled_ingest = pooled
+
+    # workers are forked before any writer thread and get no dataset copy
+    pools = []
+    Pool = multiprocessing.Pool
+
+    def recording(*args, **kwargs):
+        pools.append((kwargs, [t.name for t in threading.enumerate() if "consume" in t.name]))
+        return Pool(*args, **kwargs)
+
+    monkeypatch.setattr(multiprocessing, "Pool", recording)
+
+    data = pd.DataFrame({"a": range(1200), "values": [[i, i] for i in range(1200)]})
+    database.processing_limit = 2
+    database.pipeline_ingest = True
+    assert database.ingest_processes == 2
+
+    ds = Dataset(data, name="frame")
+    ds.upload_to(database)
+    assert pools == [({}, [])]
+
+    ingest = database.db.table("DatasetIngest").where("DatasetId", "=", ds.info.id).first()
+    assert ingest["Complete"]
+    assert ingest["LastLabel"] == 1199
+    pd.testing.assert_frame_equal(database.get_dataset(id=ds.info.id).ds, data, check_index_type=False)
+
+
+def test_upload_file(database, tmp_path, monkeypatch):
+    monkeypatch.setattr(dataframe, "HASH_SEGMENT_ROWS", 300)
+    data = pd.DataFrame({"b": ["cell_{}".format(i) for i in range(2500)], "a": range(2500)})
+    path = tmp_path / "manifest.csv"
+    data.to_csv(path, index=False)
+
+    ds = database.upload_file(path, name="manifest", chunksize=1000)
+
+    # labels continue across chunks
+    pulled = database.get_dataset(id=ds.info.id)
+    pd.testing.assert_frame_equal(pulled.ds, data[["a", "b"]], check_index_type=False)
+    assert ds.info.hash_version == dataframe.CHUNKED_HASH_VERSION
+
+    # the digest matches the whole dataframe and does not depend on the chunksize
+    introspector = dataframe.DataFrameIntrospector(pd.read_csv(path))
+    introspector.hash_version = dataframe.CHUNKED_HASH_VERSION
+    assert introspector.get_object_hashes() == [ds.md5, ds.sha256]
+    assert database.upload_file(path, chunksize=700).info.id == ds.info.id
+
+
+def test_resume_upload_file(database, tmp_path, monkeypatch):
+    # small segments so that the file is read as chunks of 1000, 1000, and 500 rows
+    monkeypatch.setattr(dataframe, "HASH_SEGMENT_ROWS", 250)
+    data = pd.DataFrame({"a": range(2500)})
+    path = tmp_path / "manifest.csv"
+    data.to_csv(path, index=False)
+
+    # record the labels each chunk is written from
+    chunks = []
+    deconstruct_rows = dataframe._deconstruct_rows
+
+    def recording(db, ds_info, rows, bar, **kwargs):
+        chunks.append((rows[0]["__DSDB_GROUP_LABEL__"], rows[-1]["__DSDB_GROUP_LABEL__"]))
+        return deconstruct_rows(db, ds_info, rows, bar, **kwargs)
+
+    monkeypatch.setattr(dataframe, "_deconstruct_rows", recording)
+
+    calls = fail_after(monkeypatch, 3)
+    with pytest.raises(RuntimeError):
+        database.upload_file(path, chunksize=1000, resume=True)
+
+    # the second chunk was interrupted after its first block
+    assert chunks == [(0, 999), (1000, 1999)]
+    ingest = database.db.table("DatasetIngest").where("Complete", "=", False).first()
+    assert ingest["LastLabel"] == 1499
+
+    # resuming finishes the second chunk then writes the last one
+    calls.clear()
+    chunks.clear()
+    ds = database.upload_file(path, chunksize=1000, resume=True)
+
+    assert chunks == [(1500, 1999), (2000, 2499)]
+    assert calls == [500, 500]
+    pd.testing.assert_frame_equal(database.get_dataset(id=ds.info.id).ds, data, check_index_type=False)
+
+
+@pytest.mark.parametrize("block_size", [500, None])
+def test_integer_column_names(database, monkeypatch, block_size):
+    deconstruct = dataframe.DataFrameIntrospector.deconstruct
+    monkeypatch.setattr(dataframe.DataFrameIntrospector, "deconstruct",
+                        lambda self, *args, **kwargs: deconstruct(self, *args, block_size=block_size, **kwargs))
+
+    # keys are stored as strings
+    ds = Dataset(pd.DataFrame({0: [1, 2], 1: ["a", "b"]}), name="frame")
+    ds.upload_to(database)
+
+    pulled = dataframe.reconstruct(database.db, ds.info, database.constructor.fms)
+    pd.testing.assert_frame_equal(pulled, pd.DataFrame({"0": [1, 2], "1": ["a", "b"]}), check_index_type=False)
+
+
+def test_processing_limit_default(tmp_path, fms, monkeypatch):
+    def connect(**kwargs):
+        config = DatabaseConfig({"driver": "sqlite", "database": str(tmp_path / "test.db")})
+        constructor = DatabaseConstructor(config, fms=fms)
+        return DatasetDatabase(config=config, user="tester", constructor=constructor, build=True, **kwargs)
+
+    # the environment sets the default and is never written
+    monkeypatch.setenv("DSDB_PROCESS_LIMIT", "3")
+    database = connect(pipeline_ingest=True)
+    assert database.processing_limit == 3
+    assert database.ingest_processes == 3
+
+    assert connect(processing_limit=2).processing_limit == 2
+    assert os.environ["DSDB_PROCESS_LIMIT"] == "3"
+
+    monkeypatch.delenv("DSDB_PROCESS_LIMIT")
+    assert connect().processing_limit == os.cpu_count()
+    assert "DSDB_PROCESS_LIMIT" not in os.environ
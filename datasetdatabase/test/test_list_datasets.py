@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+
+# installed
+import pytest
+
+# self
+from datasetdatabase import Dataset
+
+
+@pytest.fixture
+def catalog(database):
+    for name in ["c", "a", "e", "b", "d"]:
+        Dataset({"name": name}, name="cell_" + name).upload_to(database)
+
+    return database
+
+
+def collect(database, **kwargs):
+    # walk every page
+    pages = []
+    cursor = None
+    while True:
+        records, cursor = database.list_datasets(cursor=cursor, page_size=2, **kwargs)
+        pages.append([record.name[len("cell_"):] for record in records])
+        if cursor is None:
+            return pages
+
+
+def test_list_datasets(catalog):
+    records = catalog.list_datasets(page_size=100)[0]
+
+    # uploads also store their algorithm parameters
+    assert [r.name for r in records if r.name.startswith("cell_")] == ["cell_" + n for n in "caebd"]
+    assert len(sum(collect(catalog), [])) == len(records)
+
+
+def test_list_datasets_order_and_filters(catalog):
+    # skip the algorithm parameter datasets
+    named = [["Name", "like", "cell_%"]]
+
+    assert collect(catalog, filters=named + [["Name", "<", "cell_d"]], order="Name") == [["a", "b"], ["c"]]
+    assert sum(collect(catalog, filters=named, order="-Name"), []) == ["e", "d", "c", "b", "a"]
+    assert sum(collect(catalog, filters=named, order="Created"), []) == ["c", "a", "e", "b", "d"]
+
+    with pytest.raises(AssertionError):
+        catalog.list_datasets(order="MD5")
+
+
+def test_created_pages_use_index(catalog, count_queries):
+    records, cursor = catalog.list_datasets(order="-Created", page_size=2)
+    queries = count_queries(catalog)
+    catalog.list_datasets(order="-Created", page_size=2, cursor=cursor)
+
+    # the page is read from the created index instead of a scan and sort
+    page = [query for query in queries if 'FROM "Dataset"' in query][-1]
+    plan = " ".join(row["detail"] for row in catalog.db.select("EXPLAIN QUERY PLAN " + page))
+    assert "dataset_created_datasetid_index" in plan
+    assert "TEMP B-TREE" not in plan
@@ -1 +1,153 @@
 #!/usr/bin/env python
+
+# installed
+from datetime import datetime
+import pandas as pd
+import pickle
+import pytest
+import orator
+
+# self
+from datasetdatabase.core import DatabaseConstructor
+from datasetdatabase.introspect import DataFrameIntrospector
+from datasetdatabase.schema.tables import INDEXES, index_name
+from datasetdatabase.schema import migrations
+from datasetdatabase.utils import tools
+from datasetdatabase import Dataset, DatasetDatabase
+
+
+def get_indexes(database):
+    rows = database.db.select("SELECT name FROM sqlite_master WHERE type = 'index'")
+    return {row["name"] for row in rows}
+
+
+def test_build_creates_indexes(database):
+    expected = {index_name(table, columns) for table, indexes in INDEXES.items() for columns in indexes}
+    assert expected <= get_indexes(database)
+
+
+def test_migrate_adds_indexes(database, fms):
+    # an existing database created before the indexes
+    for table, indexes in INDEXES.items():
+        for columns in indexes:
+            database.db.statement("DROP INDEX {}".format(index_name(table, columns)))
+
+    constructor = DatabaseConstructor(database.config, fms=fms)
+    constructor.build()
+    constructor.build()
+
+    expected = {index_name(table, columns) for table, indexes in INDEXES.items() for columns in indexes}
+    assert expected <= get_indexes(database)
+
+
+def test_iota_deduplicated_on_value_hash(database, monkeypatch):
+    items = [{"Key": "a", "Value": pickle.dumps(i), "Created": datetime.utcnow()} for i in [1, 2, 1]]
+    rows = tools.insert_many_to_db_table(database.db, "Iota", items)
+
+    assert rows[0]["IotaId"] == rows[2]["IotaId"]
+    assert rows[0]["ValueHash"] == tools.hash_value(pickle.dumps(1))
+    assert database.db.table("Iota").count() == 2
+
+    # a matching hash with a different value is never treated as the same row
+    monkeypatch.setattr(tools, "hash_value", lambda value: rows[0]["ValueHash"])
+    with pytest.raises(ValueError):
+        tools.insert_to_db_table(database.db, "Iota", {"Key": "a", "Value": pickle.dumps(3),
+                                                        "Created": datetime.utcnow()})
+
+
+def test_migrate_fills_value_hash(tmp_path):
+    # an iota table from before the hash column existed
+    db = orator.DatabaseManager({"default": {"driver": "sqlite", "database": str(tmp_path / "old.db")}})
+    schema = orator.Schema(db)
+    with schema.create("Iota") as table:
+        table.big_increments("IotaId")
+        table.string("Key")
+        table.binary("Value")
+        table.datetime("Created")
+        table.unique(["Key", "Value"])
+    db.table("Iota").insert({"Key": "a", "Value": pickle.dumps(1), "Created": datetime.utcnow()})
+    with schema.create("IotaGroup") as table:
+        table.big_integer("IotaId")
+        table.foreign("IotaId").references("IotaId").on("Iota")
+    db.table("IotaGroup").insert({"IotaId": 1})
+
+    migrations.add_Iota_ValueHash(schema)
+    migrations.add_Iota_ValueHash(schema)
+
+    assert db.table("Iota").first()["ValueHash"] == tools.hash_value(pickle.dumps(1))
+
+    # the unique key on the raw value is gone and the hash is required
+    indexes = {row["name"] for row in db.select("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert "iota_key_value_unique" not in indexes
+    assert "iota_key_valuehash_unique" in indexes
+    columns = {row["name"]: row for row in db.select('PRAGMA table_info("Iota")')}
+    assert columns["ValueHash"]["notnull"]
+
+    # ids keep counting past the copied rows
+    db.table("Iota").insert({"Key": "a", "Value": pickle.dumps(2), "ValueHash": tools.hash_value(pickle.dumps(2)),
+                             "Created": datetime.utcnow()})
+    assert [row["IotaId"] for row in db.table("Iota").order_by("IotaId").get()] == [1, 2]
+    assert db.select("PRAGMA foreign_key_check") == []
+
+
+def test_find_dataset_stored_with_legacy_hash(database):
+    data = pd.DataFrame({"a": [1, 2, 3], "b": ["x", "y", "z"]})
+    ds = Dataset(data, name="legacy")
+    ds.upload_to(database)
+
+    # stored before hash versions existed
+    introspector = DataFrameIntrospector(data)
+    introspector.hash_version = 1
+    md5, sha256 = introspector.get_object_hashes()
+    database.db.table("Dataset").where("DatasetId", "=", ds.info.id)\
+        .update(MD5=md5, SHA256=sha256, HashVersion=None)
+
+    again = Dataset(data, name="legacy")
+    again.upload_to(database)
+
+    assert again.info.id == ds.info.id
+    assert again.info.hash_version == 1
+
+
+def test_connect_to_outdated_schema(database, fms):
+    database.db.statement('ALTER TABLE "DatasetIngest" DROP COLUMN "LastLabel"')
+
+    def connect(build):
+        constructor = DatabaseConstructor(database.config, fms=fms)
+        return DatasetDatabase(config=database.config, user="tester", constructor=constructor, build=build)
+
+    with pytest.raises(AssertionError, match="DatasetIngest.LastLabel"):
+        connect(build=False)
+
+    # building migrates it
+    connect(build=True)
+    connect(build=False)
+
+
+@pytest.mark.parametrize("driver", ["sqlite", "pgsql"])
+def test_insert_or_get_existing_row(database, monkeypatch, driver):
+    # sqlite understands the postgres on conflict returning statement
+    connection = database.db.connection()
+    monkeypatch.setattr(connection, "name", driver)
+
+    user = {"Name": "inserted", "Description": None, "Created": datetime.utcnow()}
+    created = tools.insert_to_db_table(database.db, "User", user)
+    assert database.db.table("User").where("Name", "=", "inserted").first()["UserId"] == created["UserId"]
+
+    # a repeated insert hits the existing row
+    repeated = {**user, "Created": datetime.utcnow()}
+    found = tools.insert_to_db_table(database.db, "User", repeated)
+    assert found["UserId"] == created["UserId"]
+    assert database.db.table("User").where("Name", "=", "inserted").count() == 1
+
+    # a new row gets its own id, never the id of another statement
+    database.db.table("User").count()
+    other = tools.insert_to_db_table(database.db, "User", {**user, "Name": "other"})
+    assert other["UserId"] == database.db.table("User").where("Name", "=", "other").first()["UserId"]
+    assert other["UserId"] != created["UserId"]
+
+    # many rows mixing existing and new
+    rows = tools.insert_many_to_db_table(database.db, "User", [repeated, {**user, "Name": "third"}])
+    assert rows[0]["UserId"] == created["UserId"]
+    assert rows[1]["UserId"] == database.db.table("User").where("Name", "=", "third").first()["UserId"]
+    assert database.db.table("User").where_in("Name", ["inserted", "other", "third"]).count() == 3
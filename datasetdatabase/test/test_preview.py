@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+
+# installed
+import pandas as pd
+import pytest
+
+# self
+from datasetdatabase import Dataset
+
+
+@pytest.mark.parametrize("with_stats", [True, False])
+def test_preview(database, with_stats, count_queries):
+    data = pd.DataFrame({"b": list("abcdefghij"), "a": range(10)})
+    ds = Dataset(data, name="frame")
+    ds.upload_to(database)
+    ds.add_annotation("checked")
+
+    # datasets ingested before the stats table existed
+    if not with_stats:
+        database.db.table("DatasetStats").delete()
+
+    queries = count_queries(database)
+    preview = database.preview(id=ds.info.id)
+
+    assert preview["shape"] == (10, 2)
+    assert preview["keys"] == ["a", "b"]
+    assert [a["Value"] for a in preview["annotations"]] == ["checked"]
+    assert (preview["byte_size"] is not None) == with_stats
+    assert len(queries) == (3 if with_stats else 6)
+
+
+def test_preview_dictionary(database):
+    ds = Dataset({"x": 1, "y": [1, 2]}, name="params")
+    ds.upload_to(database)
+
+    preview = database.preview(name="params")
+
+    assert preview["shape"] == (1, 2)
+    assert sorted(preview["keys"]) == ["x", "y"]
+    assert preview["byte_size"] > 0
+
+
+def test_annotations_are_lazy(database, count_queries):
+    ds = Dataset({"x": 1}, name="params")
+    ds.upload_to(database)
+    ds.add_annotation("first")
+    ds.add_annotation("second")
+
+    # pulling does not touch annotations
+    queries = count_queries(database)
+    database.memory_cache.clear()
+    pulled = database.get_dataset(id=ds.info.id)
+    assert not any("Annotation" in query for query in queries)
+
+    # first access is a single join
+    queries.clear()
+    assert [a["Value"] for a in pulled.annotations] == ["first", "second"]
+    assert len(queries) == 1
+
+    # annotations are only written once
+    pulled.update_annotations()
+    assert len(database.db.table("AnnotationDataset").get()) == 2
@@ -0,0 +1,187 @@
+#!/usr/bin/env python
+
+# installed
+import pandas as pd
+import pytest
+
+# self
+from datasetdatabase.introspect import dataframe, dictionary, object as object_introspect
+from datasetdatabase.introspect import ObjectIntrospector
+from datasetdatabase.utils import tools
+from datasetdatabase import Dataset
+
+
+@pytest.mark.parametrize("size", [1, 500])
+def test_dictionary_reconstruct_is_single_query(database, size, count_queries):
+    data = {"key_{}".format(i): i for i in range(size)}
+    ds = Dataset(data, name="params")
+    ds.upload_to(database)
+
+    queries = count_queries(database)
+    obj = dictionary.reconstruct(database.db, ds.info, database.constructor.fms)
+
+    assert obj == data
+    assert len(queries) == 1
+
+
+def test_object_reconstruct_is_single_query(database, count_queries):
+    data = {"nested": [1, 2, 3]}
+    ds = Dataset(data, name="object", introspector=ObjectIntrospector(data))
+    ds.upload_to(database)
+
+    queries = count_queries(database)
+    obj = object_introspect.reconstruct(database.db, ds.info, database.constructor.fms)
+
+    assert obj == data
+    assert len(queries) == 1
+
+
+@pytest.mark.parametrize("rows", [None, range(3, 7), [8, 2, 5], [1, 100]])
+def test_dataframe_subset(database, rows):
+    data = pd.DataFrame({"a": range(10), "b": list("abcdefghij"), "c": [i / 2 for i in range(10)]})
+    ds = Dataset(data, name="frame")
+    ds.upload_to(database)
+
+    obj = dataframe.reconstruct(database.db, ds.info, database.constructor.fms, columns=["c", "a"], rows=rows)
+
+    expected = data[["c", "a"]]
+    if rows is not None:
+        expected = expected.loc[[label for label in rows if label in data.index]]
+
+    pd.testing.assert_frame_equal(obj, expected, check_index_type=False)
+
+
+def test_get_dataset_subset(database):
+    data = pd.DataFrame({"a": range(10), "b": list("abcdefghij")})
+    ds = Dataset(data, name="frame")
+    ds.upload_to(database)
+
+    pulled = database.get_dataset(id=ds.info.id, columns=["b"], rows=range(2, 4))
+
+    assert pulled.ds["b"].tolist() == ["c", "d"]
+    assert pulled.ds.index.tolist() == [2, 3]
+    assert pulled.md5 != ds.md5
+
+    # labels are kept for stepped ranges and lists
+    pulled = database.get_dataset(id=ds.info.id, rows=range(0, 10, 3))
+    assert pulled.ds.index.tolist() == [0, 3, 6, 9]
+    assert pulled.ds["a"].tolist() == [0, 3, 6, 9]
+
+    pulled = database.get_dataset(id=ds.info.id, rows=[7, 1])
+    assert pulled.ds.index.tolist() == [7, 1]
+
+    with pytest.raises(ValueError):
+        params = Dataset({"key": 1}, name="params")
+        params.upload_to(database)
+        database.get_dataset(id=params.info.id, rows=[0])
+
+
+def test_iter_dataset(database):
+    data = pd.DataFrame({"a": range(25), "b": ["cell_{}".format(i) for i in range(25)]})
+    ds = Dataset(data, name="frame")
+    ds.upload_to(database)
+
+    chunks = list(database.iter_dataset(id=ds.info.id, chunksize=10))
+
+    assert [len(chunk) for chunk in chunks] == [10, 10, 5]
+    pd.testing.assert_frame_equal(pd.concat(chunks), data, check_index_type=False)
+
+
+def test_reconstruct_fetches_only_missing_iota(database, count_queries):
+    data = pd.DataFrame({"a": range(10), "path": ["/data/file.tiff"] * 10, "values": [[1, 2]] * 10})
+    ds = Dataset(data, name="v1")
+    ds.upload_to(database)
+    dataframe.reconstruct(database.db, ds.info, database.constructor.fms)
+
+    # a new version shares all but one iota
+    changed = data.copy()
+    changed.loc[0, "a"] = 100
+    ds = Dataset(changed, name="v2")
+    ds.upload_to(database)
+
+    queries = count_queries(database)
+    obj = dataframe.reconstruct(database.db, ds.info, database.constructor.fms)
+
+    # only the changed value and the uncached mutable value are fetched
+    value_queries = [query for query in queries if query.startswith('SELECT "IotaId", "Value"')]
+    assert len(value_queries) == 1
+    assert value_queries[0].split(" IN ")[1].count(",") == 1
+
+    pd.testing.assert_frame_equal(obj, changed[sorted(changed.columns)])
+
+    # repeated mutable values are not shared between cells
+    obj.loc[0, "values"].append(3)
+    assert obj.loc[1, "values"] == [1, 2]
+
+
+def test_parallel_unpickle(database, monkeypatch):
+    data = pd.DataFrame({"a": range(20), "values": [[i] * 3 for i in range(20)]})
+    ds = Dataset(data, name="frame")
+    ds.upload_to(database)
+
+    # force the pool for a small dataset
+    monkeypatch.setattr(tools, "PARALLEL_UNPICKLE_MIN_BYTES", 0)
+    database.parallel_unpickle = True
+    database.processing_limit = 2
+    database.iota_cache.clear()
+
+    obj = dataframe.reconstruct(database.db, ds.info, database.constructor.fms)
+    pd.testing.assert_frame_equal(obj, data, check_index_type=False)
+
+    chunks = list(dataframe.iter_reconstruct(database.db, ds.info, database.constructor.fms, chunksize=7))
+    pd.testing.assert_frame_equal(pd.concat(chunks), data, check_index_type=False)
+
+
+def test_unpickle_chunks_are_bounded(database, monkeypatch):
+    data = pd.DataFrame({"a": range(20), "values": [[i] * 3 for i in range(20)]})
+    ds = Dataset(data, name="frame")
+    ds.upload_to(database)
+
+    # record every batch handed to unpickle_many
+    batches = []
+    unpickle_many = tools.unpickle_many
+
+    def record(blobs, processes=None):
+        batches.append(len(blobs))
+        return unpickle_many(blobs, processes)
+
+    monkeypatch.setattr(tools, "unpickle_many", record)
+
+    # serial reconstruct unpickles values as they stream in
+    database.iota_cache.clear()
+    obj = dataframe.reconstruct(database.db, ds.info, database.constructor.fms)
+    pd.testing.assert_frame_equal(obj, data, check_index_type=False)
+    assert sum(batches) == 0
+
+    # parallel reconstruct never holds more than a chunk of blobs
+    monkeypatch.setattr(tools, "PARALLEL_UNPICKLE_CHUNK_BYTES", 1)
+    database.parallel_unpickle = True
+    database.processing_limit = 2
+    database.iota_cache.clear()
+    obj = dataframe.reconstruct(database.db, ds.info, database.constructor.fms)
+    pd.testing.assert_frame_equal(obj, data, check_index_type=False)
+    assert max(batches) == 1
+
+
+def test_unrelated_cached_values_keep_streaming(database, count_queries):
+    # cache the values of another dataset
+    other = Dataset(pd.DataFrame({"a": ["other_{}".format(i) for i in range(10)]}), name="other")
+    other.upload_to(database)
+    dataframe.reconstruct(database.db, other.info, database.constructor.fms)
+    assert len(database.iota_cache) > 0
+
+    data = pd.DataFrame({"a": range(10), "b": ["cell_{}".format(i) for i in range(10)]})
+    ds = Dataset(data, name="frame")
+    ds.upload_to(database)
+
+    # none of this dataset is cached so its values are streamed with the iota
+    queries = count_queries(database)
+    obj = dataframe.reconstruct(database.db, ds.info, database.constructor.fms)
+    pd.testing.assert_frame_equal(obj, data, check_index_type=False)
+    assert any('"Iota"."Value"' in query for query in queries)
+    assert not any(query.startswith('SELECT "IotaId", "Value"') for query in queries)
+
+    # once cached only the missing values are fetched
+    queries = count_queries(database)
+    dataframe.reconstruct(database.db, ds.info, database.constructor.fms)
+    assert not any('"Iota"."Value"' in query for query in queries)
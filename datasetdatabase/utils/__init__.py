@@ -1,3 +1,5 @@
 #!/usr/bin/env python
 
 from .progressbar import ProgressBar
+from .cache import DatasetCache, IotaCache, MemoryCache
+from .connections import ConnectionPool
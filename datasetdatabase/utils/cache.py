@@ -0,0 +1,526 @@
+#!/usr/bin/env python
+
+# installed
+from collections import OrderedDict
+from typing import Dict, Hashable, Iterable, Union
+import _pickle as pickle
+import pandas as pd
+import numpy as np
+import threading
+import datetime
+import pathlib
+import copy
+import uuid
+import sys
+import os
+
+# self
+from . import checks
+
+# globals
+DEFAULT_CACHE_SIZE = 10 * 1024 ** 3
+CACHE_SUFFIX = ".dsdbcache"
+# negative protocols select the highest, fastest, protocol available
+PICKLE_PROTOCOL = -1
+INVALID_CACHE_SIZE = "Cache size must be a positive number of bytes."
+DEFAULT_MEMORY_CACHE_SIZE = 1024 ** 3
+# the session cache is only on by default when handing out copies is free
+AUTO_MEMORY_CACHE_SIZE = "auto"
+DEFAULT_IOTA_CACHE_SIZE = 256 * 1024 ** 2
+
+# values of these types can be shared between datasets without copies
+IMMUTABLE_TYPES = (str, bytes, int, float, complex, bool, type(None),
+                   datetime.date, datetime.time, datetime.timedelta,
+                   np.generic)
+# approximate cost of the cache entry around each value
+IOTA_ENTRY_OVERHEAD = 100
+
+
+class DatasetCache(object):
+    """
+    On-disk cache of reconstructed datasets.
+
+    Dataset rows are immutable once their hashes are stored, so a rebuilt
+    object is stored under its DatasetId and SHA256 and read back instead of
+    reconstructing it again. Files are written atomically so the same
+    directory can be shared by many processes or users. When the total size
+    of the cache passes the size cap, the least recently used files are
+    evicted.
+
+
+    #### Example
+    ```
+    >>> cache = DatasetCache("~/.dsdb_cache", max_bytes=2 * 1024 ** 3)
+    >>> cache.put(1, "9f86d08...", data)
+    >>> cache.get(1, "9f86d08...")
+    {...}
+
+    ```
+
+
+    #### Parameters
+    ##### cache_dir: str, pathlib.Path
+    The directory to store cached datasets in. It is created if it does not
+    exist.
+
+    ##### max_bytes: int = DEFAULT_CACHE_SIZE
+    The size cap of the cache directory in bytes.
+
+
+    #### Returns
+    ##### self
+
+
+    #### Errors
+    ##### AssertionError
+    The size cap is not a positive number of bytes.
+
+    """
+
+    def __init__(self,
+                 cache_dir: Union[str, pathlib.Path],
+                 max_bytes: int = DEFAULT_CACHE_SIZE):
+        # enforce types
+        checks.check_types(cache_dir, [str, pathlib.Path])
+        checks.check_types(max_bytes, int)
+
+        # enforce size
+        assert max_bytes > 0, INVALID_CACHE_SIZE
+
+        # create dir
+        self.cache_dir = pathlib.Path(cache_dir).expanduser().resolve()
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+
+    def path(self, dataset_id: int, sha256: str) -> pathlib.Path:
+        return self.cache_dir / "{}_{}{}".format(dataset_id, sha256, CACHE_SUFFIX)
+
+    def get(self, dataset_id: int, sha256: str) -> Union[object, None]:
+        """
+        Read a cached dataset object. Returns None if the dataset is not
+        cached or the cached file could not be read.
+        """
+        path = self.path(dataset_id, sha256)
+        try:
+            with open(path, "rb") as read_in:
+                obj = pickle.load(read_in)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # unreadable files are dropped and rebuilt
+            self._remove(path)
+            return None
+
+        # mark as recently used
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+
+        return obj
+
+    def put(self, dataset_id: int, sha256: str, obj: object) -> pathlib.Path:
+        """
+        Store a dataset object in the cache and evict the least recently used
+        files if the cache is over its size cap.
+        """
+        path = self.path(dataset_id, sha256)
+
+        # write to a temporary file first so readers never see partial files
+        tmp_path = path.with_name("{}.{}.tmp".format(path.name, uuid.uuid4().hex))
+        try:
+            with open(tmp_path, "wb") as write_out:
+                pickle.dump(obj, write_out, protocol=PICKLE_PROTOCOL)
+            os.replace(tmp_path, path)
+        finally:
+            self._remove(tmp_path)
+
+        # enforce size cap
+        self.evict()
+
+        return path
+
+    def evict(self):
+        """
+        Remove the least recently used files until the cache is under its size
+        cap.
+        """
+        # collect cached files, other processes may remove them meanwhile
+        entries = []
+        for path in self.cache_dir.glob("*" + CACHE_SUFFIX):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        # remove oldest first
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries, key=lambda entry: entry[0]):
+            if total <= self.max_bytes:
+                break
+
+            self._remove(path)
+            total -= size
+
+    def remove(self, dataset_id: int, sha256: str):
+        """
+        Remove a single cached dataset if it is cached.
+        """
+        self._remove(self.path(dataset_id, sha256))
+
+    def clear(self):
+        """
+        Remove every cached file.
+        """
+        for path in self.cache_dir.glob("*" + CACHE_SUFFIX):
+            self._remove(path)
+
+    @property
+    def size(self) -> int:
+        total = 0
+        for path in self.cache_dir.glob("*" + CACHE_SUFFIX):
+            try:
+                total += path.stat().st_size
+            except FileNotFoundError:
+                continue
+
+        return total
+
+    @staticmethod
+    def _remove(path: pathlib.Path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def __str__(self):
+        return "<DatasetCache [{}, {} / {} bytes]>".format(self.cache_dir, self.size, self.max_bytes)
+
+    def __repr__(self):
+        return str(self)
+
+
+def copy_on_write() -> bool:
+    # pandas 3 always copies on write, earlier versions may opt in
+    if int(pd.__version__.split(".")[0]) >= 3:
+        return True
+
+    return getattr(pd.options.mode, "copy_on_write", False) is True
+
+
+def snapshot(obj: object) -> Union[object, None]:
+    """
+    Return a copy of obj that later changes to obj can not reach, when one
+    can be made without copying any data. Under pandas copy on write this is
+    a shallow copy of a DataFrame or Series, otherwise None is returned.
+    """
+    if copy_on_write() and isinstance(obj, (pd.DataFrame, pd.Series)):
+        return obj.copy(deep=False)
+
+    return None
+
+
+def _copy(obj: object) -> object:
+    # with copy on write a shallow pandas copy is independent of the original
+    # and costs no data copy, everything else is deep copied
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        return obj.copy(deep=not copy_on_write())
+
+    return copy.deepcopy(obj)
+
+
+def _sizeof(obj: object) -> int:
+    # approximate size of an object and everything it holds, without
+    # serializing it
+    size = 0
+    seen = set()
+    stack = [obj]
+    while len(stack) > 0:
+        item = stack.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+
+        if isinstance(item, (pd.DataFrame, pd.Series, pd.Index)):
+            size += int(np.sum(item.memory_usage(deep=True)))
+        elif isinstance(item, np.ndarray):
+            size += item.nbytes
+            if item.dtype == object:
+                stack.extend(item.ravel())
+        else:
+            size += sys.getsizeof(item)
+            if isinstance(item, dict):
+                stack.extend(item.keys())
+                stack.extend(item.values())
+            elif isinstance(item, (list, tuple, set, frozenset)):
+                stack.extend(item)
+            elif hasattr(item, "__dict__"):
+                stack.append(item.__dict__)
+
+    return size
+
+
+def resolve_memory_cache_size(
+    max_bytes: Union[int, str, None]
+) -> Union[int, None]:
+    """
+    Resolve the AUTO_MEMORY_CACHE_SIZE setting. Without pandas copy on write
+    every get and put of the session cache copies the whole object, so the
+    cache is only on by default when pandas copies on write.
+    """
+    if max_bytes == AUTO_MEMORY_CACHE_SIZE:
+        if copy_on_write():
+            return DEFAULT_MEMORY_CACHE_SIZE
+
+        return None
+
+    return max_bytes
+
+
+class MemoryCache(object):
+    """
+    In-process cache of dataset objects bounded by their size in bytes.
+
+    Objects are copied when stored and when handed out so that changes made
+    by the caller never reach the cache. Pandas objects are handed out as
+    copy on write shallow copies when pandas supports it. When the total size
+    passes the size cap, the least recently used objects are evicted.
+
+
+    #### Example
+    ```
+    >>> cache = MemoryCache(max_bytes=512 * 1024 ** 2)
+    >>> cache.put(1, data)
+    >>> cache.get(1)
+    {...}
+
+    ```
+
+
+    #### Parameters
+    ##### max_bytes: int = DEFAULT_MEMORY_CACHE_SIZE
+    The size cap of the cache in bytes.
+
+
+    #### Returns
+    ##### self
+
+
+    #### Errors
+    ##### AssertionError
+    The size cap is not a positive number of bytes.
+
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MEMORY_CACHE_SIZE):
+        # enforce types
+        checks.check_types(max_bytes, int)
+
+        # enforce size
+        assert max_bytes > 0, INVALID_CACHE_SIZE
+
+        # ordered from least to most recently used
+        self.max_bytes = max_bytes
+        self._items = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Union[object, None]:
+        """
+        Return a copy of a cached object or None if it is not cached.
+        """
+        with self._lock:
+            if key not in self._items:
+                return None
+
+            self._items.move_to_end(key)
+            obj, _ = self._items[key]
+
+        return _copy(obj)
+
+    def put(self, key: Hashable, obj: object):
+        """
+        Store a copy of an object and evict the least recently used objects if
+        the cache is over its size cap. Objects larger than the cap are not
+        stored.
+        """
+        size = _sizeof(obj)
+        if size > self.max_bytes:
+            return
+
+        obj = _copy(obj)
+        with self._lock:
+            # replace
+            if key in self._items:
+                self._size -= self._items.pop(key)[1]
+
+            self._items[key] = (obj, size)
+            self._size += size
+
+            # remove oldest first
+            while self._size > self.max_bytes:
+                _, (_, evicted) = self._items.popitem(last=False)
+                self._size -= evicted
+
+    def remove(self, key: Hashable):
+        """
+        Remove a single cached object if it is cached.
+        """
+        with self._lock:
+            if key in self._items:
+                self._size -= self._items.pop(key)[1]
+
+    def clear(self):
+        """
+        Remove every cached object.
+        """
+        with self._lock:
+            self._items.clear()
+            self._size = 0
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._items
+
+    def __len__(self):
+        return len(self._items)
+
+    def __str__(self):
+        return "<MemoryCache [{} items, {} / {} bytes]>".format(len(self), self.size, self.max_bytes)
+
+    def __repr__(self):
+        return str(self)
+
+
+def is_immutable(value: object) -> bool:
+    if isinstance(value, IMMUTABLE_TYPES):
+        return True
+    if isinstance(value, (tuple, frozenset)):
+        return all(is_immutable(item) for item in value)
+
+    return False
+
+
+class IotaCache(object):
+    """
+    In-process cache of unpickled Iota values keyed by IotaId.
+
+    Iota rows are unique on their key and value, so versions of a dataset
+    share most of their IotaIds. Reconstructs look values up here first and
+    only fetch and unpickle the IotaIds that are missing. Only immutable
+    values are stored as they are shared by every dataset that reads them.
+    When the approximate total size passes the size cap, the least recently
+    used values are evicted.
+
+
+    #### Example
+    ```
+    >>> cache = IotaCache()
+    >>> cache.put_many({1: "/path/to/file.tiff", 2: [1, 2]})
+    >>> cache.get_many([1, 2, 3])
+    {1: "/path/to/file.tiff"}
+
+    ```
+
+
+    #### Parameters
+    ##### max_bytes: int = DEFAULT_IOTA_CACHE_SIZE
+    The approximate size cap of the cache in bytes.
+
+
+    #### Returns
+    ##### self
+
+
+    #### Errors
+    ##### AssertionError
+    The size cap is not a positive number of bytes.
+
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_IOTA_CACHE_SIZE):
+        # enforce types
+        checks.check_types(max_bytes, int)
+
+        # enforce size
+        assert max_bytes > 0, INVALID_CACHE_SIZE
+
+        # ordered from least to most recently used
+        self.max_bytes = max_bytes
+        self._items = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get_many(self, iota_ids: Iterable[int]) -> Dict[int, object]:
+        """
+        Return a dictionary of the cached values for the passed iota ids.
+        """
+        found = {}
+        with self._lock:
+            for iota_id in iota_ids:
+                if iota_id in self._items:
+                    self._items.move_to_end(iota_id)
+                    found[iota_id] = self._items[iota_id][0]
+
+        return found
+
+    def put_many(self, values: Dict[int, object]):
+        """
+        Store the immutable values of a dictionary of iota id to value and
+        evict the least recently used values if the cache is over its size cap.
+        """
+        with self._lock:
+            for iota_id, value in values.items():
+                if iota_id in self._items or not is_immutable(value):
+                    continue
+
+                size = sys.getsizeof(value) + IOTA_ENTRY_OVERHEAD
+                self._items[iota_id] = (value, size)
+                self._size += size
+
+            # remove oldest first
+            while self._size > self.max_bytes:
+                _, (_, evicted) = self._items.popitem(last=False)
+                self._size -= evicted
+
+    def coverage(self, iota_ids: Iterable[int]) -> float:
+        """
+        Return the fraction of the passed iota ids that have a cached value,
+        zero when no ids are passed. Cached values are not marked as used.
+        """
+        iota_ids = list(iota_ids)
+        if len(iota_ids) == 0:
+            return 0.0
+
+        with self._lock:
+            cached = sum(iota_id in self._items for iota_id in iota_ids)
+
+        return cached / len(iota_ids)
+
+    def clear(self):
+        """
+        Remove every cached value.
+        """
+        with self._lock:
+            self._items.clear()
+            self._size = 0
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def __contains__(self, iota_id: int) -> bool:
+        return iota_id in self._items
+
+    def __len__(self):
+        return len(self._items)
+
+    def __str__(self):
+        return "<IotaCache [{} values, {} / {} bytes]>".format(len(self), self.size, self.max_bytes)
+
+    def __repr__(self):
+        return str(self)
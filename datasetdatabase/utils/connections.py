@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+
+# installed
+from contextlib import contextmanager
+from typing import Dict
+import threading
+import orator
+import queue
+
+# self
+from . import checks
+
+# globals
+# seconds a sqlite connection waits on a database locked by another writer
+SQLITE_BUSY_TIMEOUT = 60
+IN_MEMORY_DATABASE = ":memory:"
+INVALID_POOL_SIZE = "Connection pool size must be a positive integer."
+
+
+def orator_config(name: str, config: Dict[str, str]) -> Dict[str, dict]:
+    """
+    Return the orator.DatabaseManager config for a connection config. SQLite
+    connections wait for other writers to finish instead of failing straight
+    away with a locked database error.
+    """
+    config = dict(config)
+    if config["driver"] == "sqlite":
+        config.setdefault("timeout", SQLITE_BUSY_TIMEOUT)
+
+    return {name: config}
+
+
+def is_shareable(config: Dict[str, str]) -> bool:
+    # in memory sqlite databases only exist on the connection that made them
+    return not (config["driver"] == "sqlite" and
+                config["database"] == IN_MEMORY_DATABASE)
+
+
+class ConnectionPool(object):
+    """
+    Fixed size pool of database connections for worker threads.
+
+    Every connection is its own orator.DatabaseManager so a worker that holds
+    one can run statements and transactions without racing other workers.
+    SQLite only allows a single writer, so transactions on SQLite pools are
+    taken one at a time and every connection waits on writers from other
+    processes for SQLITE_BUSY_TIMEOUT seconds. Connections are opened lazily
+    the first time a worker uses them.
+
+
+    #### Example
+    ```
+    >>> pool = ConnectionPool("local", {"driver": "sqlite", "database": "local.db"}, 4)
+    >>> with pool.transaction() as db:
+    >>>     db.table("Iota").insert(rows)
+
+    ```
+
+
+    #### Parameters
+    ##### name: str
+    The name of the connection.
+
+    ##### config: Dict[str, str]
+    The connection config of a DatabaseConfig.
+
+    ##### size: int
+    How many connections to hold, usually the number of worker threads.
+
+
+    #### Returns
+    ##### self
+
+
+    #### Errors
+    ##### AssertionError
+    The size is not a positive integer.
+
+    """
+
+    def __init__(self, name: str, config: Dict[str, str], size: int):
+        # enforce types
+        checks.check_types(name, str)
+        checks.check_types(config, dict)
+        checks.check_types(size, int)
+
+        # enforce size
+        assert size > 0, INVALID_POOL_SIZE
+
+        # pooled connections are handed between threads
+        config = dict(config)
+        if config["driver"] == "sqlite":
+            config["check_same_thread"] = False
+
+        # create managers
+        self.size = size
+        self.driver = config["driver"]
+        self._managers = queue.Queue()
+        for i in range(size):
+            self._managers.put(
+                orator.DatabaseManager(orator_config(name, config)))
+
+        # sqlite has a single writer
+        self._write_lock = threading.Lock()
+
+    @contextmanager
+    def connection(self):
+        """
+        Check out a connection for the duration of the context.
+        """
+        db = self._managers.get()
+        try:
+            yield db
+        finally:
+            self._managers.put(db)
+
+    @contextmanager
+    def transaction(self):
+        """
+        Check out a connection and run the context in a transaction on it.
+        """
+        with self.connection() as db:
+            if self.driver == "sqlite":
+                with self._write_lock:
+                    with db.transaction():
+                        yield db
+            else:
+                with db.transaction():
+                    yield db
+
+    def disconnect(self):
+        """
+        Close every connection in the pool.
+        """
+        for i in range(self.size):
+            with self.connection() as db:
+                db.disconnect()
+
+    def __str__(self):
+        return "<ConnectionPool [{}, {} connections]>".format(self.driver, self.size)
+
+    def __repr__(self):
+        return str(self)
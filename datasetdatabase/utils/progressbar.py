@@ -30,8 +30,8 @@ class ProgressBar(object):
         self.update_time_str()
 
 
-    def increment(self):
-        self.current += self.increment_by
+    def increment(self, times: int = 1):
+        self.current += self.increment_by * times
         self.draw()
 
 
@@ -3,17 +3,23 @@
 # installed
 from orator.exceptions.query import QueryException
 from contextlib import contextmanager
-from typing import Union
+import multiprocessing
+from collections import OrderedDict
+from typing import List, Tuple, Union
 import _pickle as pickle
 import pathlib
 import hashlib
+import sqlite3
 import types
 import math
+import uuid
 import sys
 import os
 
 # self
 from ..utils import checks
+from ..schema.tables import UNIQUE_COLUMNS, HASHED_COLUMNS
+from ..schema.tables import STRING_UNIQUE_COLUMNS
 
 # globals
 BYTE_SIZES = ("B", "KB", "MB", "GB", "TB", "PB", "EB", "ZB", "YB")
@@ -21,6 +27,27 @@ ALLOWED_YES = ["y", "yes"]
 ALLOWED_NO = ["n", "no"]
 TOO_MANY_RETURN_VALUES = "Too many values returned from query expecting {n}."
 
+CONFLICTING_INSERT = "Insert to {t} conflicted with a row that could not be found."
+HASH_COLLISION = "Insert to {t} matched the hash of a row with a different {c}."
+
+# sqlite is compiled with a default limit of 999 bound parameters per statement
+MAX_QUERY_PARAMETERS = 999
+UPSERT_DRIVERS = ("sqlite", "pgsql")
+
+# every dataset and file is identified by both of these digests
+DEFAULT_HASH_ALGS = (hashlib.md5, hashlib.sha256)
+FILE_READ_BLOCKSIZE = 65536
+
+# rows pulled from the cursor per round trip when reading a dataset back
+DATASET_FETCH_SIZE = 10000
+# parallel unpickling only pays for the pool past this many blob bytes
+PARALLEL_UNPICKLE_MIN_BYTES = 16 * 1024 ** 2
+UNPICKLE_BATCHES_PER_PROCESS = 4
+# streamed blobs are held for the pool at most this many bytes at a time
+PARALLEL_UNPICKLE_CHUNK_BYTES = 4 * PARALLEL_UNPICKLE_MIN_BYTES
+# iota ids read to estimate how much of a dataset is already cached
+IOTA_SAMPLE_SIZE = 1000
+
 
 @contextmanager
 def suppress_prints():
@@ -80,28 +107,100 @@ def read_pickle(path: Union[str, pathlib.Path]) -> object:
     return obj
 
 
-def get_file_hash(path: Union[str, pathlib.Path],
-    alg: types.BuiltinMethodType = hashlib.md5) -> str:
+class MultiHash(object):
+    """
+    Feed a single stream of bytes to several hashlib algorithms at once so
+    that an object only has to be serialized, or a file read, a single time
+    no matter how many digests are needed.
+
+
+    #### Example
+    ```
+    >>> hasher = MultiHash()
+    >>> hasher.update(b"hello world")
+    >>> hasher.hexdigests()
+    ["5eb63bbbe01eeed093cb22bb8f5acdc3",
+     "b94d27b9934d3e08a52e52d7da7dabfac484efe37a5380ee9088f7ace2efcde9"]
+
+    ```
+
+
+    #### Parameters
+    ##### algs: List[types.BuiltinMethodType], Tuple[...] = DEFAULT_HASH_ALGS
+    The hashlib algorithms to feed, in the order their digests are returned.
+
+
+    #### Returns
+    ##### self
+
+
+    #### Errors
+
+    """
+
+    def __init__(self, algs: Union[List[types.BuiltinMethodType],
+                                   Tuple[types.BuiltinMethodType]] = DEFAULT_HASH_ALGS):
+        # enforce types
+        checks.check_types(algs, [list, tuple])
+
+        self._hashers = [alg() for alg in algs]
+
+    @property
+    def hashers(self):
+        return self._hashers
+
+    def update(self, data: bytes):
+        for hasher in self.hashers:
+            hasher.update(data)
+
+    def digests(self) -> List[bytes]:
+        return [hasher.digest() for hasher in self.hashers]
+
+    def hexdigests(self) -> List[str]:
+        return [hasher.hexdigest() for hasher in self.hashers]
+
+
+def get_file_hashes(path: Union[str, pathlib.Path],
+    algs: Union[List[types.BuiltinMethodType],
+                Tuple[types.BuiltinMethodType]] = DEFAULT_HASH_ALGS) -> List[str]:
     # enforce types
     checks.check_types(path, [str, pathlib.Path])
-    checks.check_types(alg, types.BuiltinMethodType)
+    checks.check_types(algs, [list, tuple])
 
     # convert types
     path = pathlib.Path(path)
 
-    # block size
-    BLOCKSIZE = 65536
-
     # block read
-    alg = alg()
+    hasher = MultiHash(algs)
     with open(path, "rb") as read_in:
-        file_buffer = read_in.read(BLOCKSIZE)
+        file_buffer = read_in.read(FILE_READ_BLOCKSIZE)
         while len(file_buffer) > 0:
-            alg.update(file_buffer)
-            file_buffer = read_in.read(BLOCKSIZE)
+            hasher.update(file_buffer)
+            file_buffer = read_in.read(FILE_READ_BLOCKSIZE)
 
-    # get hash
-    return alg.hexdigest()
+    # get hashes
+    return hasher.hexdigests()
+
+
+def get_file_hash(path: Union[str, pathlib.Path],
+    alg: types.BuiltinMethodType = hashlib.md5) -> str:
+    # enforce types
+    checks.check_types(alg, types.BuiltinMethodType)
+
+    return get_file_hashes(path, [alg])[0]
+
+
+def get_object_hashes(obj: object,
+    algs: Union[List[types.BuiltinMethodType],
+                Tuple[types.BuiltinMethodType]] = DEFAULT_HASH_ALGS) -> List[str]:
+    # enforce types
+    checks.check_types(obj, object)
+    checks.check_types(algs, [list, tuple])
+
+    # serialize once and hash
+    hasher = MultiHash(algs)
+    hasher.update(pickle.dumps(obj))
+    return hasher.hexdigests()
 
 
 def get_object_hash(obj: object,
@@ -131,17 +230,24 @@ def _assert_value(f, val, err):
     assert f(val), err
 
 
-def get_items_from_db_table(db, table, conditions):
-    # construct orator table
-    table = db.table(table)
-
+def where_conditions(query, conditions):
     # expand multiple conditions
     if all(isinstance(cond, list) for cond in conditions):
         for cond in conditions:
-            table = table.where(*cond)
+            query = query.where(*cond)
     # expand single condition
     else:
-        table = table.where(*conditions)
+        query = query.where(*conditions)
+
+    return query
+
+
+def get_items_from_db_table(db, table, conditions):
+    # construct orator table
+    table = db.table(table)
+
+    # expand conditions
+    table = where_conditions(table, conditions)
 
     # get table
     table = table.get()
@@ -150,7 +256,63 @@ def get_items_from_db_table(db, table, conditions):
     return [dict(item) for item in table]
 
 
-def insert_to_db_table(db, table, items):
+def _compile_insert_or_ignore(db, table, items):
+    # build a single or multi-row insert that skips any row violating a
+    # unique constraint instead of raising
+    builder = db.table(table)
+    rows = [OrderedDict(sorted(item.items())) for item in items]
+    sql = builder.get_grammar().compile_insert(builder, rows)
+    bindings = builder._clean_bindings([v for r in rows for v in r.values()])
+
+    # driver specific conflict handling
+    if db.connection().name == "sqlite":
+        sql = sql.replace("INSERT INTO", "INSERT OR IGNORE INTO", 1)
+    else:
+        sql += " ON CONFLICT DO NOTHING"
+
+    return sql, bindings
+
+
+def hash_value(value):
+    # fixed width hash of a large column value
+    return hashlib.sha256(bytes(value)).hexdigest()
+
+
+def _coerce_unique_strings(table, items):
+    # string unique columns come back from the database as str, so a key of
+    # any other type would never match its own row
+    columns = [c for c in STRING_UNIQUE_COLUMNS.get(table, [])
+               if c in items and items[c] is not None
+               and not isinstance(items[c], str)]
+    if len(columns) == 0:
+        return items
+
+    return {**items, **{c: str(items[c]) for c in columns}}
+
+
+def _add_value_hash(table, items):
+    # fill the hash column of tables that deduplicate on a hashed column
+    if table not in HASHED_COLUMNS:
+        return items
+
+    column, hash_column = HASHED_COLUMNS[table]
+    if hash_column in items:
+        return items
+
+    return {**items, hash_column: hash_value(items[column])}
+
+
+def _check_value_hash(table, items, row):
+    # rows are matched on the hash, the raw values must match as well
+    if table not in HASHED_COLUMNS:
+        return
+
+    column, _ = HASHED_COLUMNS[table]
+    if bytes(row[column]) != bytes(items[column]):
+        raise ValueError(HASH_COLLISION.format(t=table, c=column))
+
+
+def _select_insert_to_db_table(db, table, items):
     # create conditions
     conditions = [[k, "=", v] for k, v in items.items() if k != "Created"]
 
@@ -174,3 +336,398 @@ def insert_to_db_table(db, table, items):
 
     # database structure error
     raise ValueError(TOO_MANY_RETURN_VALUES.format(n=1))
+
+
+def insert_to_db_table(db, table, items):
+    # tables without a known unique key keep the select then insert behavior
+    items = _add_value_hash(table, _coerce_unique_strings(table, items))
+    connection = db.connection()
+    if table not in UNIQUE_COLUMNS or connection.name not in UPSERT_DRIVERS:
+        return _select_insert_to_db_table(db, table, items)
+
+    # insert or ignore in a single statement
+    id_column = table + "Id"
+    sql, bindings = _compile_insert_or_ignore(db, table, [items])
+    if connection.name == "sqlite":
+        # the id is read from the cursor that ran the insert, the shared
+        # cursor may have run another statement since
+        cursor = connection.get_connection().cursor()
+        try:
+            cursor.execute(sql, connection.prepare_bindings(bindings))
+            if cursor.rowcount == 1:
+                return {id_column: cursor.lastrowid, **items}
+        finally:
+            cursor.close()
+    else:
+        sql += " RETURNING " + db.table(table).get_grammar().wrap(id_column)
+        created = connection.select_from_write_connection(sql, bindings)
+        if len(created) == 1:
+            return {id_column: created[0][id_column], **items}
+
+    # already exists
+    conditions = [[c, "=", items[c]] for c in UNIQUE_COLUMNS[table]]
+    found_items = get_items_from_db_table(db, table, conditions)
+
+    # found
+    if len(found_items) == 1:
+        _check_value_hash(table, items, found_items[0])
+        return found_items[0]
+
+    # conflicted on a constraint other than the unique key
+    if len(found_items) == 0:
+        raise ValueError(CONFLICTING_INSERT.format(t=table))
+
+    # database structure error
+    raise ValueError(TOO_MANY_RETURN_VALUES.format(n=1))
+
+
+def _chunk(items, size):
+    # yield successive slices of items no larger than size
+    for i in range(0, len(items), size):
+        yield items[i: i + size]
+
+
+def _unique_key(row, unique_columns):
+    # binary columns may come back as memoryview from some drivers
+    return tuple(bytes(row[c]) if isinstance(row[c], memoryview) else row[c]
+                 for c in unique_columns)
+
+
+def get_many_from_db_table(db, table, keys, unique_columns):
+    # chunk so that the where in conditions never pass the parameter limit
+    chunk_size = max(1, MAX_QUERY_PARAMETERS // len(unique_columns))
+
+    # collect found rows keyed by their unique column values
+    found = {}
+    for chunk in _chunk(list(keys), chunk_size):
+        query = db.table(table)
+        for i, column in enumerate(unique_columns):
+            query = query.where_in(column, list({k[i] for k in chunk}))
+
+        # where in on every column returns a superset, filter to exact keys
+        requested = set(chunk)
+        for row in query.get():
+            row = dict(row)
+            key = _unique_key(row, unique_columns)
+            if key in requested:
+                found[key] = row
+
+    return found
+
+
+def insert_many_to_db_table(db, table, items, unique_columns=None):
+    """
+    Get or create many rows in a table using as few statements as possible.
+    Items are deduplicated on their unique columns, existing rows are found
+    with where in queries, and all missing rows are written with multi-row
+    inserts. Returns the found or created row for each item, in order.
+    """
+
+    # default to the known unique key of the table
+    if unique_columns is None:
+        unique_columns = UNIQUE_COLUMNS[table]
+    items = [_add_value_hash(table, _coerce_unique_strings(table, item))
+             for item in items]
+
+    # dedupe items on their unique key
+    keyed = OrderedDict()
+    for item in items:
+        keyed.setdefault(_unique_key(item, unique_columns), item)
+
+    # check exists
+    found = get_many_from_db_table(db, table, keyed, unique_columns)
+
+    # insert missing
+    missing = [key for key in keyed if key not in found]
+    if len(missing) > 0:
+        chunk_size = max(1, MAX_QUERY_PARAMETERS //
+                         len(keyed[missing[0]]))
+        for chunk in _chunk(missing, chunk_size):
+            # rows created by other writers in the meantime are skipped
+            sql, bindings = _compile_insert_or_ignore(
+                db, table, [keyed[key] for key in chunk])
+            db.connection().statement(sql, bindings)
+
+        # resolve ids of created rows
+        found.update(get_many_from_db_table(db, table, missing,
+                                            unique_columns))
+
+    # rule out hash collisions
+    rows = [found[_unique_key(item, unique_columns)] for item in items]
+    for item, row in zip(items, rows):
+        _check_value_hash(table, item, row)
+
+    return rows
+
+
+def _label_filters(db, labels, chunk_size):
+    # a label range is compared numerically so any size is a single filter,
+    # label lists are chunked under the parameter limit
+    if labels is None:
+        return [None]
+
+    if isinstance(labels, range) and labels.step == 1:
+        grammar = db.connection().get_query_grammar()
+        column = grammar.wrap("GroupDataset.Label")
+        return [("CAST({c} AS INTEGER) >= {m} AND CAST({c} AS INTEGER) < {m}"
+                 .format(c=column, m=grammar.get_marker()),
+                 [labels.start, labels.stop])]
+
+    # sorted so that ordered reads stay ordered across chunks
+    labels = [str(label) for label in sorted(set(labels))]
+    return [("in", chunk) for chunk in _chunk(labels, chunk_size)]
+
+
+def _select_stream(db, sql, bindings, fetch_size):
+    # postgres clients buffer the whole result unless a named, server side,
+    # cursor is used; sqlite cursors are already incremental
+    connection = db.connection()
+    if connection.name == "sqlite":
+        # the native row type is much cheaper than the orator dict rows
+        cursor = connection.get_connection().cursor()
+        try:
+            cursor.row_factory = sqlite3.Row
+            cursor.execute(sql, connection.prepare_bindings(bindings))
+            batch = cursor.fetchmany(fetch_size)
+            while batch:
+                for row in batch:
+                    yield row
+
+                batch = cursor.fetchmany(fetch_size)
+        finally:
+            cursor.close()
+
+        return
+
+    if connection.name != "pgsql":
+        for batch in connection.select_many(fetch_size, sql, bindings):
+            for row in batch:
+                yield row
+
+        return
+
+    # with hold keeps the cursor usable outside of a transaction block
+    cursor = connection.get_connection().cursor(
+        name="dsdb_{}".format(uuid.uuid4().hex), withhold=True)
+    try:
+        cursor.itersize = fetch_size
+        cursor.execute(sql, connection.prepare_bindings(bindings))
+        for row in cursor:
+            yield row
+    finally:
+        cursor.close()
+
+
+def iter_dataset_iota(db, dataset_id, keys=None, labels=None,
+                      ordered=False, with_values=True,
+                      fetch_size=DATASET_FETCH_SIZE):
+    """
+    Yield the IotaId, Key, Value, and Label of every iota attached to a
+    dataset. A single join query is run and the cursor is read in fetch_size
+    batches. Optionally only iota with the provided keys and group labels are
+    selected, iota are ordered by their numeric group label, and values are
+    left out so they can be resolved by get_iota_values.
+    """
+    # keys that do not fit in the statement are filtered after fetching
+    if keys is not None and len(keys) >= MAX_QUERY_PARAMETERS // 2:
+        wanted, keys = set(keys), None
+    else:
+        wanted = None
+
+    # label chunks share the parameter limit with the keys and dataset id
+    used = 1 if keys is None else len(keys) + 1
+    for label_filter in _label_filters(db, labels,
+                                       MAX_QUERY_PARAMETERS - used):
+        selected = ["Iota.IotaId", "Iota.Key", "GroupDataset.Label"]
+        if with_values:
+            selected.append("Iota.Value")
+
+        query = db.table("Iota")\
+            .select(*selected)\
+            .join("IotaGroup", "IotaGroup.IotaId", "=", "Iota.IotaId")\
+            .join("GroupDataset", "GroupDataset.GroupId", "=",
+                  "IotaGroup.GroupId")\
+            .where("GroupDataset.DatasetId", "=", dataset_id)
+
+        # push down projection
+        if keys is not None:
+            query = query.where_in("Iota.Key", list(keys))
+        if label_filter is not None:
+            if label_filter[0] == "in":
+                query = query.where_in("GroupDataset.Label", label_filter[1])
+            else:
+                query = query.where_raw(*label_filter)
+        if ordered:
+            column = db.connection().get_query_grammar()\
+                .wrap("GroupDataset.Label")
+            query = query.order_by_raw("CAST({c} AS INTEGER)".format(c=column))
+
+        for iota in _select_stream(db, query.to_sql(), query.get_bindings(),
+                                   fetch_size):
+            if wanted is None or iota["Key"] in wanted:
+                yield iota
+
+
+def sample_dataset_iota_ids(db, dataset_id, limit=IOTA_SAMPLE_SIZE):
+    """
+    Return up to limit distinct iota ids of a dataset. A single query is run
+    that never reads a value, so the sample is cheap enough to take before
+    deciding how to read the dataset.
+    """
+    rows = db.table("IotaGroup")\
+        .select("IotaGroup.IotaId")\
+        .join("GroupDataset", "GroupDataset.GroupId", "=",
+              "IotaGroup.GroupId")\
+        .where("GroupDataset.DatasetId", "=", dataset_id)\
+        .distinct()\
+        .limit(limit)\
+        .get()
+
+    return [row["IotaId"] for row in rows]
+
+
+def _unpickle_batch(blobs):
+    return [pickle.loads(blob) for blob in blobs]
+
+
+def unpickle_many(blobs, processes=None):
+    """
+    Return the unpickled values of a list of pickled blobs in the same order.
+    When processes is more than one and the blobs are large enough to pay for
+    the pool, batches of blobs are unpickled in a process pool and
+    reassembled in order, otherwise they are unpickled serially.
+    """
+    # small payloads are faster without the pool
+    if processes is None or processes <= 1 or \
+            sum(len(blob) for blob in blobs) < PARALLEL_UNPICKLE_MIN_BYTES:
+        return _unpickle_batch(blobs)
+
+    # some drivers return memoryview which can not be sent to workers
+    blobs = [bytes(blob) if isinstance(blob, memoryview) else blob
+             for blob in blobs]
+
+    # map ordered batches
+    n_batches = processes * UNPICKLE_BATCHES_PER_PROCESS
+    batch_size = max(1, math.ceil(len(blobs) / n_batches))
+    with multiprocessing.Pool(processes) as pool:
+        batches = pool.map(_unpickle_batch, _chunk(blobs, batch_size))
+
+    return [value for batch in batches for value in batch]
+
+
+def get_iota_values(db, iota_ids, cache=None, processes=None):
+    """
+    Return a dictionary of iota id to unpickled value for the passed iota
+    ids. Only ids missing from the optional IotaCache are fetched, each
+    distinct value blob is unpickled once, and immutable values are added to
+    the cache for later reconstructs. Fetched blobs are unpickled with
+    unpickle_many using the passed number of processes.
+    """
+    # shared values
+    values = {}
+    if cache is not None:
+        values = cache.get_many(iota_ids)
+
+    # fetch missing
+    missing = [iota_id for iota_id in iota_ids if iota_id not in values]
+    blobs = {}
+    for chunk in _chunk(missing, MAX_QUERY_PARAMETERS):
+        query = db.table("Iota")\
+            .select("IotaId", "Value")\
+            .where_in("IotaId", chunk)
+        for iota in _select_stream(db, query.to_sql(), query.get_bindings(),
+                                   DATASET_FETCH_SIZE):
+            blobs[iota["IotaId"]] = iota["Value"]
+
+    # unpickle
+    fetched = dict(zip(blobs, unpickle_many(list(blobs.values()), processes)))
+
+    # share immutable values
+    if cache is not None:
+        cache.put_many(fetched)
+
+    values.update(fetched)
+    return values
+
+
+def get_dataset_shape(db, dataset_id):
+    """
+    Return the number of rows and the ordered keys of a dataset using a count
+    query and a single join over the first group of the dataset.
+    """
+    # count rows
+    n_rows = db.table("GroupDataset")\
+        .where("DatasetId", "=", dataset_id)\
+        .count()
+    if n_rows == 0:
+        return 0, []
+
+    # keys of the first group in insert order
+    first = db.table("GroupDataset")\
+        .select("GroupId")\
+        .where("DatasetId", "=", dataset_id)\
+        .order_by("GroupDatasetId")\
+        .first()
+    keys = db.table("IotaGroup")\
+        .join("Iota", "IotaGroup.IotaId", "=", "Iota.IotaId")\
+        .where("IotaGroup.GroupId", "=", first["GroupId"])\
+        .order_by("IotaGroup.IotaGroupId")\
+        .get(["Iota.Key"])
+
+    return n_rows, [k["Key"] for k in keys]
+
+
+def get_dataset_byte_size(db, dataset_id):
+    """
+    Return the total stored size in bytes of the pickled values of every cell
+    of a dataset using a single aggregate join.
+    """
+    value = db.table("GroupDataset").get_grammar().wrap("Iota.Value")
+    found = db.table("GroupDataset")\
+        .join("IotaGroup", "GroupDataset.GroupId", "=", "IotaGroup.GroupId")\
+        .join("Iota", "IotaGroup.IotaId", "=", "Iota.IotaId")\
+        .where("GroupDataset.DatasetId", "=", dataset_id)\
+        .select(db.raw("SUM(LENGTH({})) AS size".format(value)))\
+        .first()
+
+    return int(found["size"] or 0)
+
+
+def get_dataset_annotations(db, dataset_id):
+    """
+    Return every annotation row of a dataset in the order they were attached
+    using a single join.
+    """
+    annotations = db.table("Annotation")\
+        .join("AnnotationDataset", "Annotation.AnnotationId", "=",
+              "AnnotationDataset.AnnotationId")\
+        .select("Annotation.*")\
+        .where("AnnotationDataset.DatasetId", "=", dataset_id)\
+        .order_by("AnnotationDataset.AnnotationDatasetId")\
+        .get()
+
+    return [dict(a) for a in annotations]
+
+
+def insert_annotations(db, dataset_id, annotations):
+    """
+    Insert annotation rows and attach them to a dataset in a single
+    transaction. The passed annotation dictionaries are updated in place with
+    their new AnnotationId.
+    """
+    with db.transaction():
+        # annotations are not unique so each needs its own id back
+        joins = []
+        for annotation in annotations:
+            annotation["AnnotationId"] = db.table("Annotation")\
+                .insert_get_id(annotation, sequence=("AnnotationId"))
+            joins.append({"AnnotationId": annotation["AnnotationId"],
+                          "DatasetId": dataset_id,
+                          "Created": annotation["Created"]})
+
+        # attach in as few statements as the parameter limit allows
+        chunk_size = MAX_QUERY_PARAMETERS // 3
+        for chunk in _chunk(joins, chunk_size):
+            db.table("AnnotationDataset").insert(chunk)
+
+    return annotations
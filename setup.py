@@ -29,7 +29,8 @@ opts = dict(name=NAME,
             packages=PACKAGES,
             entry_points={
                 "console_scripts": [
-                    "generate_dsdb_report=datasetdatabase.bin.generate_dsdb_report:main"
+                    "generate_dsdb_report=datasetdatabase.bin.generate_dsdb_report:main",
+                    "benchmark_dsdb_hash=datasetdatabase.bin.benchmark_dataframe_hash:main"
                 ]
             },
             install_requires=INSTALLS,